@@ -460,9 +460,29 @@ void GrpcClient::sendByeCommand() const
 
 }
 
+std::string GrpcClient::makeTarget(const std::string & host, int port)
+{
+    // A unix:<path> host is a unix domain socket, it has no port
+    if (host.rfind("unix:", 0) == 0)
+        return host;
+    return host + ":" + std::to_string(port);
+}
+
 bool GrpcClient::connectToGrpcServer()
 {
-    M_channel = grpc::CreateChannel(this->M_target, grpc::InsecureChannelCredentials());
+    // The same options as utils/transport.py of the playmaker server
+    grpc::ChannelArguments args;
+    args.SetMaxSendMessageSize(64 << 20);
+    args.SetMaxReceiveMessageSize(64 << 20);
+    args.SetCompressionAlgorithm(GRPC_COMPRESS_NONE);
+    args.SetInt(GRPC_ARG_HTTP2_WRITE_BUFFER_SIZE, 1 << 20);
+    args.SetInt(GRPC_ARG_HTTP2_BDP_PROBE, 0);
+    args.SetInt(GRPC_ARG_KEEPALIVE_TIME_MS, 10000);
+    args.SetInt(GRPC_ARG_KEEPALIVE_TIMEOUT_MS, 5000);
+    args.SetInt(GRPC_ARG_KEEPALIVE_PERMIT_WITHOUT_CALLS, 1);
+    args.SetInt(GRPC_ARG_HTTP2_MAX_PINGS_WITHOUT_DATA, 0);
+    args.SetString(GRPC_ARG_OPTIMIZATION_TARGET, "latency");
+    M_channel = grpc::CreateCustomChannel(this->M_target, grpc::InsecureChannelCredentials(), args);
     M_stub_ = Game::NewStub(M_channel);
 
     if (Register())
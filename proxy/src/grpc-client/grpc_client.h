@@ -42,6 +42,8 @@ public:
     void sendByeCommand() const override;
     bool connectToGrpcServer() override;
 
+    static std::string makeTarget(const std::string & host, int port);
+
     static rcsc::ViewWidth convertViewWidth(protos::ViewWidth view_width);
     static rcsc::SideID convertSideID(protos::Side side_id);
     static rcsc::Vector2D convertVector2D(protos::RpcVector2D vector2d);
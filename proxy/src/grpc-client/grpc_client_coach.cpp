@@ -46,7 +46,7 @@ void GrpcClientCoach::init(rcsc::SoccerAgent *agent,
         port += 13;
     }
 
-    this->M_target = target + ":" + std::to_string(port);
+    this->M_target = makeTarget(target, port);
 }
 
 void GrpcClientCoach::getActions()
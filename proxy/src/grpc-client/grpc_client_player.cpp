@@ -104,7 +104,7 @@ void GrpcClientPlayer::init(rcsc::SoccerAgent *agent,
         port += M_agent->world().self().unum();
     }
 
-    this->M_target = target + ":" + std::to_string(port);
+    this->M_target = makeTarget(target, port);
     sample_communication = Communication::Ptr(new SampleCommunication());
 }
 
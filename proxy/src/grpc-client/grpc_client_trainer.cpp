@@ -45,7 +45,7 @@ void GrpcClientTrainer::init(rcsc::SoccerAgent *agent,
         port += 13;
     }
 
-    this->M_target = target + ":" + std::to_string(port);
+    this->M_target = makeTarget(target, port);
 }
 
 void GrpcClientTrainer::getActions()
@@ -0,0 +1,79 @@
+import os
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import grpc
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('localhost', 0))
+        return s.getsockname()[1]
+
+
+def start_server(extra_args: list[str] = None, port: int = None, target: str = None, timeout: float = 15.0):
+    """
+    Start server.py in a child process with file logging disabled and wait until its port accepts channels.
+
+    :param extra_args: Extra server.py arguments.
+    :param port: RPC port, a free port is picked if not given.
+    :param target: gRPC target used to probe readiness, defaults to localhost:port.
+    :param timeout: Seconds to wait for the server.
+    :return: Tuple of the Popen object and the gRPC target.
+    """
+    port = port or free_port()
+    target = target or f'localhost:{port}'
+    process = subprocess.Popen([sys.executable, 'server.py', '--rpc-port', str(port), '--disable-log-file']
+                               + (extra_args or []),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+    with grpc.insecure_channel(target) as channel:
+        try:
+            grpc.channel_ready_future(channel).result(timeout=timeout)
+        except grpc.FutureTimeoutError:
+            process.kill()
+            raise RuntimeError(f'server.py {extra_args} did not start on {target}')
+    return process, target
+
+
+def stop_server(process: subprocess.Popen):
+    # server.py leaves its multiprocessing manager behind on SIGTERM, so the whole session is stopped
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def percentile(samples: list[float], q: float) -> float:
+    if not samples:
+        return float('nan')
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(q / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def summarize(samples_ms: list[float]) -> dict[str, float]:
+    return {
+        'n': len(samples_ms),
+        'mean': statistics.fmean(samples_ms) if samples_ms else float('nan'),
+        'p50': percentile(samples_ms, 50),
+        'p95': percentile(samples_ms, 95),
+        'p99': percentile(samples_ms, 99),
+        'max': max(samples_ms) if samples_ms else float('nan'),
+    }
+
+
+def print_table(rows: list[tuple[str, dict[str, float]]], unit: str = 'ms'):
+    width = max([28] + [len(name) + 2 for name, _ in rows])
+    print(f"{'case':<{width}}{'n':>8}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}  ({unit})")
+    for name, s in rows:
+        print(f"{name:<{width}}{s['n']:>8}{s['mean']:>10.3f}{s['p50']:>10.3f}{s['p95']:>10.3f}{s['p99']:>10.3f}{s['max']:>10.3f}")
+
+
+def now_ms() -> float:
+    return time.perf_counter() * 1000.0
@@ -0,0 +1,73 @@
+"""
+Startup time and decision throughput of the pure Python tree against the builds of scripts/build_binary.py.
+
+- startup: wall time of `start.py --help` (or `start.bin --help`), which exits right after start.py imported the
+  server and all its modules, so it is the startup cost of an agent process without the simulator. A --onefile
+  binary also pays its self-extraction here.
+- throughput: cycles per second of replay.py over the same records, in the pure tree and in the accelerated tree
+  whose hot modules are compiled extension modules.
+
+Run from the py2d directory:
+    python3 -m benchmarks.binary_comparison logs/.../records --accelerated build/accelerated --binary scripts/binary/start.bin
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+
+
+TREE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+THROUGHPUT = re.compile(r'^throughput: (\d+) cycles/sec', re.MULTILINE)
+
+
+def startup_ms(command: list[str], cwd: str, repeat: int) -> float:
+    """
+    Fastest wall time of `command --help` in ms.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command + ['--help'], cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        times.append((time.perf_counter() - start) * 1000.0)
+    return min(times)
+
+
+def replay_throughput(tree: str, records: list[str], cycles: int) -> int:
+    result = subprocess.run([sys.executable, 'replay.py', '--cycles', str(cycles)] + records, cwd=tree,
+                            capture_output=True, text=True, check=True)
+    return int(THROUGHPUT.search(result.stdout).group(1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the pure Python tree with the compiled builds')
+    parser.add_argument('records', nargs='+', help='Record directories or .rec files to replay')
+    parser.add_argument('--accelerated', default=os.path.join(TREE, 'build', 'accelerated'), help='Accelerated tree of scripts/build_binary.py')
+    parser.add_argument('--binary', action='append', default=[], help='start.bin of a binary build (can be repeated, e.g. a --onefile and a standalone build)')
+    parser.add_argument('--cycles', type=int, default=500, help='States replayed per agent')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per startup measurement, the fastest one is reported')
+    args = parser.parse_args()
+    records = [os.path.abspath(path) for path in args.records]
+
+    trees = [('pure python', TREE)]
+    if os.path.isdir(args.accelerated):
+        trees.append(('accelerated modules', os.path.abspath(args.accelerated)))
+    else:
+        print(f"{args.accelerated} does not exist, build it with scripts/build_binary.py")
+
+    rows = []
+    for name, tree in trees:
+        rows.append((name, startup_ms([sys.executable, 'start.py'], tree, args.repeat),
+                     replay_throughput(tree, records, args.cycles)))
+    for binary in args.binary:
+        binary = os.path.abspath(binary)
+        rows.append((os.path.relpath(binary), startup_ms([binary], os.path.dirname(binary), args.repeat), None))
+
+    print(f"{'build':<40}{'startup ms':>12}{'cycles/sec':>12}")
+    for name, startup, throughput in rows:
+        print(f"{name:<40}{startup:>12.1f}{throughput if throughput is not None else '-':>12}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""
+Startup time and memory of the rpc servers of one team started with --use-different-rpc-port, in three ways:
+
+- fresh interpreters: every server is a new `python3 server.py` process that imports everything itself,
+  like a spawn start method would.
+- fork: a launcher imports server.py and forks the servers, which load the formations on the first Register
+  (start.py --no-preload).
+- fork + preload: the launcher also loads the formations and freezes the gc before it forks (start.py).
+
+The launcher of the fork modes is a separate process, like start.py, and its import time is part of the
+startup time. For every server the time from the launch to the first actions of its agent (Register, the params
+messages and the first GetPlayerActions) is measured. After the agents played --cycles cycles, the RSS and PSS
+(resident memory with every shared page divided between the processes sharing it) of the servers and the
+launcher are read from /proc. The multiprocessing manager process of every server is not counted.
+
+Run from the py2d directory:
+    python3 -m benchmarks.fork_server --servers 4 --cycles 50
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from utils.proxy_standin import StandInProxy
+from benchmarks.bench_utils import free_port, summarize, print_table
+
+
+def launcher_main(preload: bool, ports: list[int]):
+    """
+    Fork one server.py per port like start.py and print the pids, then wait to be killed.
+    """
+    import multiprocessing
+    import server
+    if preload:
+        server.preload()
+
+    def server_main(port: int):
+        os.setsid()
+        sys.argv = ['server.py', '--rpc-port', str(port), '--disable-log-file']
+        server.main()
+
+    context = multiprocessing.get_context('fork')
+    processes = [context.Process(target=server_main, args=(port,)) for port in ports]
+    for process in processes:
+        process.start()
+    signal.pthread_sigmask(signal.SIG_BLOCK, [signal.SIGTERM])
+    print(' '.join(str(process.pid) for process in processes), flush=True)
+    signal.sigwait([signal.SIGTERM])
+    for process in processes:
+        _kill_session(process.pid)
+
+
+def _kill_session(pid: int):
+    # server.py leaves its multiprocessing manager behind on SIGTERM, so the whole session is stopped
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def memory_kb(pid: int) -> tuple[int, int]:
+    """
+    RSS and PSS of a process in kB.
+    """
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            name, _, rest = line.partition(':')
+            if name in ('Rss', 'Pss'):
+                values[name] = int(rest.split()[0])
+    return values['Rss'], values['Pss']
+
+
+def first_actions(port: int, launched: float, cycles: int, results: dict, index: int):
+    proxy = StandInProxy(f'localhost:{port}', 'BENCH', index + 1)
+    proxy.wait_for_server(timeout=30.0)
+    proxy.register()
+    proxy.send_params()
+    proxy.get_actions(proxy.make_state(1))
+    results[index] = (time.perf_counter() - launched) * 1000.0
+    for cycle in range(2, cycles + 1):
+        proxy.get_actions(proxy.make_state(cycle))
+    proxy.close()
+
+
+def run_mode(mode: str, servers: int, cycles: int):
+    ports = [free_port() for _ in range(servers)]
+    launched = time.perf_counter()
+    launcher = None
+    if mode == 'fresh':
+        processes = [subprocess.Popen([sys.executable, 'server.py', '--rpc-port', str(port), '--disable-log-file'],
+                                      stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+                     for port in ports]
+        pids = [process.pid for process in processes]
+    else:
+        launcher = subprocess.Popen([sys.executable, '-m', 'benchmarks.fork_server', '--launcher', mode]
+                                    + [str(port) for port in ports],
+                                    stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, start_new_session=True)
+        pids = [int(pid) for pid in launcher.stdout.readline().split()]
+    try:
+        results = {}
+        threads = [threading.Thread(target=first_actions, args=(port, launched, cycles, results, i))
+                   for i, port in enumerate(ports)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        memory = [memory_kb(pid) for pid in pids]
+        launcher_memory = memory_kb(launcher.pid) if launcher is not None else (0, 0)
+    finally:
+        for pid in pids:
+            _kill_session(pid)
+        if launcher is not None:
+            launcher.terminate()
+            launcher.wait()
+    return [results[i] for i in range(servers)], memory, launcher_memory
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the startup time and memory of fresh and forked rpc servers')
+    parser.add_argument('--servers', type=int, default=4, help='Number of rpc servers, start.py starts 4')
+    parser.add_argument('--cycles', type=int, default=50, help='Cycles every agent plays before the memory is read')
+    parser.add_argument('--launcher', default=None, choices=['fork', 'fork-preload'], help=argparse.SUPPRESS)
+    parser.add_argument('ports', nargs='*', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.launcher:
+        launcher_main(args.launcher == 'fork-preload', args.ports)
+        return
+
+    rows = []
+    memory_rows = []
+    for mode, name in [('fresh', 'fresh interpreters'), ('fork', 'fork'), ('fork-preload', 'fork + preload')]:
+        times, memory, launcher_memory = run_mode(mode, args.servers, args.cycles)
+        rows.append((name, summarize(times)))
+        memory_rows.append((name, memory, launcher_memory))
+
+    print('time to first action')
+    print_table(rows)
+    print()
+    print(f"{'memory (MB)':<28}{'RSS/server':>12}{'PSS/server':>12}{'PSS launcher':>14}{'PSS team':>10}")
+    for name, memory, launcher_memory in memory_rows:
+        rss = sum(m[0] for m in memory) / len(memory) / 1024.0
+        pss = sum(m[1] for m in memory) / len(memory) / 1024.0
+        team = (sum(m[1] for m in memory) + launcher_memory[1]) / 1024.0
+        print(f"{name:<28}{rss:>12.1f}{pss:>12.1f}{launcher_memory[1] / 1024.0:>14.1f}{team:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
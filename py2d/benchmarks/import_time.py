@@ -0,0 +1,83 @@
+"""
+Import time of server.py, with a per-module breakdown from `python3 -X importtime`.
+
+Every case is imported in a fresh interpreter --repeat times and the fastest run is reported, so the numbers do
+not depend on a cold page cache or on compiling the .pyc files. The command fails if `import server` takes longer
+than --budget-ms or if it imports one of the modules that must only be loaded on demand (scipy, numpy and the
+agent decision code and the http server of --metrics-port), so a change that makes the server start slower is noticed.
+
+Run from the py2d directory:
+    python3 -m benchmarks.import_time --repeat 5 --top 15
+"""
+import argparse
+import subprocess
+import sys
+
+
+CASES = [
+    ('import server', 'import server'),
+    ('coach agent', 'import server, service_pb2 as pb2; server.agent_class(pb2.AgentType.CoachT)'),
+    ('player agent', 'import server, service_pb2 as pb2; server.agent_class(pb2.AgentType.PlayerT)'),
+    ('player agent + formations', 'import server; server.preload()'),
+]
+# Modules `import server` must not import, they are imported when an agent or a formation needs them
+LAZY_MODULES = ['scipy', 'numpy', 'src.sample_player_agent', 'src.sample_coach_agent', 'src.sample_trainer_agent',
+                'http.server']
+
+
+def import_times(code: str) -> tuple[float, dict[str, tuple[int, int]]]:
+    """
+    Run `code` in a fresh interpreter with -X importtime.
+
+    :return: Total import time in ms and the self and cumulative time in us of every imported module.
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], capture_output=True, text=True,
+                            check=True)
+    modules = {}
+    total_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+        # Nested imports are indented, the cumulative times of the top level ones add up to the total
+        if not name[1:].startswith(' '):
+            total_us += int(cumulative_us)
+    return total_us / 1000.0, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import time of the rpc server')
+    parser.add_argument('--repeat', type=int, default=5, help='Fresh interpreters per case, the fastest one is reported')
+    parser.add_argument('--top', type=int, default=15, help='Number of modules of the breakdown of `import server`')
+    parser.add_argument('--budget-ms', type=float, default=350.0, help='Fail if `import server` takes longer')
+    args = parser.parse_args()
+
+    server_modules = {}
+    server_ms = 0.0
+    print(f"{'case':<28}{'import ms':>10}")
+    for name, code in CASES:
+        runs = [import_times(code) for _ in range(args.repeat)]
+        total_ms, modules = min(runs, key=lambda run: run[0])
+        if name == 'import server':
+            server_ms, server_modules = total_ms, modules
+        print(f"{name:<28}{total_ms:>10.1f}")
+
+    print("\nslowest modules of `import server`")
+    print(f"{'module':<48}{'self ms':>10}{'cumulative ms':>15}")
+    for module, (self_us, cumulative_us) in sorted(server_modules.items(), key=lambda item: -item[1][1])[:args.top]:
+        print(f"{module:<48}{self_us / 1000.0:>10.1f}{cumulative_us / 1000.0:>15.1f}")
+
+    failures = []
+    eager = [module for module in LAZY_MODULES if module in server_modules]
+    if eager:
+        failures.append(f"`import server` imports {', '.join(eager)}, which must be imported on demand")
+    if server_ms > args.budget_ms:
+        failures.append(f"`import server` took {server_ms:.1f}ms, over the budget of {args.budget_ms:.0f}ms")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+End-to-end load generator that emulates many proxies against one playmaker server.
+
+For every load level, N synthetic teams register through Register, send the params messages and then send the
+State of every agent at the start of each simulator step, like rcssserver drives the proxies. Each agent has its
+own channel and all of them run on one asyncio loop, so the generator itself stays cheap. A cycle is counted as
+missed when its actions arrive after the end of its simulator step.
+
+The generator and the server compete for the CPU if they run on the same cores, pin them apart for clean numbers:
+    taskset -c 0 python3 server.py --rpc-port 50051 &
+    taskset -c 1-3 python3 -m benchmarks.load_generator --target localhost:50051 --teams 1 2 4 8
+
+Run from the py2d directory, without --target a server.py is started for every load level:
+    python3 -m benchmarks.load_generator --teams 1 2 4 8 --cycles 200 --server-args="--shards 4"
+"""
+import argparse
+import asyncio
+import shlex
+import time
+import grpc
+import service_pb2 as pb2
+import service_pb2_grpc as pb2_grpc
+from utils.proxy_standin import StandInProxy
+from utils import recorder as rec
+from benchmarks.bench_utils import start_server, stop_server, summarize
+
+
+class EmulatedAgent:
+    """
+    One proxy of the load: it registers with a StandInProxy and drives the cycles on an asyncio channel.
+    """
+    def __init__(self, target: str, team_name: str, uniform_number: int, agent_type: pb2.AgentType) -> None:
+        self.proxy = StandInProxy(target, team_name, uniform_number, agent_type)
+        self.target = target
+        self.agent_type = agent_type
+        self.states: list[pb2.State] = []
+        self.latencies_ms: list[float] = []
+        self.missed = 0
+
+    def prepare(self, cycles: int, recorded_states: list[pb2.State] = None):
+        self.proxy.wait_for_server()
+        self.proxy.register()
+        self.proxy.send_params()
+        if recorded_states:
+            for i in range(cycles):
+                state = pb2.State()
+                state.CopyFrom(recorded_states[i % len(recorded_states)])
+                state.register_response.CopyFrom(self.proxy.register_response)
+                self.states.append(state)
+        else:
+            self.states = [self.proxy.make_state(cycle) for cycle in range(1, cycles + 1)]
+
+    async def run(self, start: float, step: float):
+        async with grpc.aio.insecure_channel(self.target) as channel:
+            stub = pb2_grpc.GameStub(channel)
+            if self.agent_type == pb2.AgentType.PlayerT:
+                call = stub.GetPlayerActions
+            elif self.agent_type == pb2.AgentType.CoachT:
+                call = stub.GetCoachActions
+            else:
+                call = stub.GetTrainerActions
+            await channel.channel_ready()
+            for i, state in enumerate(self.states):
+                cycle_start = start + i * step
+                delay = cycle_start - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                sent = time.perf_counter()
+                await call(state)
+                done = time.perf_counter()
+                self.latencies_ms.append((done - sent) * 1000.0)
+                if done > cycle_start + step:
+                    self.missed += 1
+
+    def close(self):
+        self.proxy.bye()
+        self.proxy.close()
+
+
+def load_recorded_states(directory: str) -> list[list[pb2.State]]:
+    """
+    States of the recorded players of server.py --record, one list per recorded agent.
+    """
+    recorded = []
+    for paths in rec.find_record_files([directory], []).values():
+        records = rec.read_parts(paths)
+        if records and records[0].kind == rec.REGISTER and records[0].message.agent_type == pb2.AgentType.PlayerT:
+            recorded.append([record.message for record in records if record.kind == rec.STATE])
+    return recorded
+
+
+def run_level(target: str, teams: int, players: int, with_coach: bool, cycles: int, step: float,
+              recorded: list[list[pb2.State]]) -> list[EmulatedAgent]:
+    agents = []
+    for team in range(teams):
+        team_name = f'LOAD{team}'
+        for unum in range(1, players + 1):
+            agents.append(EmulatedAgent(target, team_name, unum, pb2.AgentType.PlayerT))
+        if with_coach:
+            agents.append(EmulatedAgent(target, team_name, 0, pb2.AgentType.CoachT))
+    for i, agent in enumerate(agents):
+        states = recorded[i % len(recorded)] if recorded and agent.agent_type == pb2.AgentType.PlayerT else None
+        agent.prepare(cycles, states)
+
+    async def run_all():
+        start = time.perf_counter() + 0.5
+        await asyncio.gather(*(agent.run(start, step) for agent in agents))
+
+    asyncio.run(run_all())
+    for agent in agents:
+        agent.close()
+    return agents
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Find the load one playmaker server can sustain')
+    parser.add_argument('--teams', type=int, nargs='+', default=[1, 2, 4, 8], help='Numbers of teams of the load levels')
+    parser.add_argument('--players', type=int, default=4, help='Players per team')
+    parser.add_argument('--no-coach', default=False, action='store_true', help='Do not emulate a coach per team')
+    parser.add_argument('--cycles', type=int, default=200, help='Cycles per load level')
+    parser.add_argument('--step', type=float, default=100.0, help='Simulator step in milliseconds')
+    parser.add_argument('--records', default=None, help='Drive the players with the states of this record directory instead of synthetic states')
+    parser.add_argument('--target', default=None, help='Use a running server instead of starting server.py for every level')
+    parser.add_argument('--server-args', default='', help='Extra server.py arguments, e.g. "--shards 4"')
+    args = parser.parse_args()
+
+    recorded = load_recorded_states(args.records) if args.records else None
+    if args.records and not recorded:
+        parser.error(f"No recorded players in {args.records}")
+
+    print(f"{'teams':>6}{'agents':>8}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}{'missed':>10}  (ms, % of cycles)")
+    for teams in args.teams:
+        process = None
+        target = args.target
+        if target is None:
+            process, target = start_server(shlex.split(args.server_args))
+        try:
+            agents = run_level(target, teams, args.players, not args.no_coach, args.cycles, args.step / 1000.0, recorded)
+        finally:
+            if process is not None:
+                stop_server(process)
+        s = summarize([latency for agent in agents for latency in agent.latencies_ms])
+        missed = 100.0 * sum(agent.missed for agent in agents) / max(s['n'], 1)
+        print(f"{teams:>6}{len(agents):>8}{s['mean']:>10.3f}{s['p50']:>10.3f}{s['p95']:>10.3f}{s['p99']:>10.3f}"
+              f"{s['max']:>10.3f}{missed:>9.2f}%")
+
+
+if __name__ == '__main__':
+    main()
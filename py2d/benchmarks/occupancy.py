@@ -0,0 +1,73 @@
+"""
+Cost of checking many candidate sectors for opponents, one Sector2D and Tools.exist_opponent_in per candidate
+against one SpatialIndex.sectors_occupancy call for all of them.
+
+The candidates are pass sectors from the ball to random points like BhvStarterPass builds them, the world model
+has 11 players per team around the ball. The batched case includes building the index once per cycle.
+
+Run from the py2d directory:
+    python3 -m benchmarks.occupancy --candidates 10 100 500
+"""
+import argparse
+import logging
+import random
+from pyrusgeom.geom_2d import Sector2D, Vector2D
+from service_pb2 import WorldModel
+from src.sample_player_agent import SamplePlayerAgent
+from src.utils.tools import Tools
+from benchmarks.bench_utils import summarize, print_table, now_ms
+
+
+def make_world_model(rng: random.Random) -> WorldModel:
+    wm = WorldModel()
+    wm.self.uniform_number = 1
+    wm.ball.position.x, wm.ball.position.y = rng.uniform(-30.0, 30.0), rng.uniform(-20.0, 20.0)
+    for team in (wm.teammates, wm.opponents):
+        for unum in range(1, 12):
+            player = team.add()
+            player.uniform_number = unum
+            player.position.x = wm.ball.position.x + rng.uniform(-25.0, 25.0)
+            player.position.y = wm.ball.position.y + rng.uniform(-25.0, 25.0)
+    return wm
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare per-candidate and batched sector occupancy checks')
+    parser.add_argument('--candidates', type=int, nargs='+', default=[10, 100, 500], help='Sectors checked per cycle')
+    parser.add_argument('--cycles', type=int, default=200, help='Cycles per case')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    agent = SamplePlayerAgent(logging.getLogger('benchmark'))
+    rows = []
+    for count in args.candidates:
+        loop, batched = [], []
+        for cycle in range(1, args.cycles + 1):
+            agent.wm = make_world_model(rng)
+            agent.wm.cycle = cycle
+            ball = Vector2D(agent.wm.ball.position.x, agent.wm.ball.position.y)
+            targets = [ball + Vector2D.polar2vector(rng.uniform(3.0, 30.0), rng.uniform(-180.0, 180.0))
+                       for _ in range(count)]
+            dists = [target.dist(ball) for target in targets]
+            angles = [(target - ball).th().degree() for target in targets]
+
+            start = now_ms()
+            expected = [Tools.exist_opponent_in(agent, Sector2D(ball, 0.0, dist + 3.0, angle - 15.0, angle + 15.0))
+                        for dist, angle in zip(dists, angles)]
+            loop.append(now_ms() - start)
+
+            # A new cycle, so the spatial index is built again
+            agent.wm.stoped_cycle = 1
+            start = now_ms()
+            occupied = Tools.exist_opponents_in_sectors(agent, ball, 0.0, [dist + 3.0 for dist in dists],
+                                                        [angle - 15.0 for angle in angles],
+                                                        [angle + 15.0 for angle in angles])
+            batched.append(now_ms() - start)
+            assert occupied.tolist() == expected
+        rows.append((f'{count} sectors one by one', summarize(loop)))
+        rows.append((f'{count} sectors batched', summarize(batched)))
+    print_table(rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Side-by-side per-cycle latency of the thread-pool server and the process-sharded server (--shards), optionally with the players on PlayerSession streams (--session).
+
+Every agent of one team (players, coach and trainer) is emulated by a stand-in proxy in its own thread. All agents
+send their state at the same moment of each cycle, which is the worst case for the server because every decision
+of the cycle competes for the interpreter at once.
+
+Run from the py2d directory:
+    python3 -m benchmarks.server_latency --cycles 300 --players 4 --session
+"""
+import argparse
+import threading
+import service_pb2 as pb2
+from utils.proxy_standin import StandInProxy
+from benchmarks.bench_utils import start_server, stop_server, summarize, print_table, now_ms
+
+
+def run_team(target: str, players: int, cycles: int, with_coach: bool, with_trainer: bool,
+             session: bool = False) -> list[float]:
+    proxies = [StandInProxy(target, 'BENCH', unum) for unum in range(1, players + 1)]
+    if with_coach:
+        proxies.append(StandInProxy(target, 'BENCH', 0, pb2.AgentType.CoachT))
+    if with_trainer:
+        proxies.append(StandInProxy(target, 'BENCH', 0, pb2.AgentType.TrainerT))
+    for proxy in proxies:
+        proxy.wait_for_server()
+        proxy.register()
+        proxy.send_params()
+        if session:
+            proxy.open_session()
+    states = {id(proxy): [proxy.make_state(cycle) for cycle in range(1, cycles + 1)] for proxy in proxies}
+
+    barrier = threading.Barrier(len(proxies))
+    samples: list[float] = []
+    samples_lock = threading.Lock()
+
+    def agent_loop(proxy: StandInProxy):
+        local = []
+        for state in states[id(proxy)]:
+            barrier.wait()
+            start = now_ms()
+            proxy.get_actions(state)
+            local.append(now_ms() - start)
+        with samples_lock:
+            samples.extend(local)
+
+    threads = [threading.Thread(target=agent_loop, args=(proxy,)) for proxy in proxies]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for proxy in proxies:
+        proxy.bye()
+        proxy.close()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the latency of the rpc server modes')
+    parser.add_argument('--cycles', type=int, default=300, help='Number of cycles to run per mode')
+    parser.add_argument('--players', type=int, default=4, help='Number of player agents')
+    parser.add_argument('--no-coach', default=False, action='store_true', help='Do not emulate the coach')
+    parser.add_argument('--no-trainer', default=False, action='store_true', help='Do not emulate the trainer')
+    parser.add_argument('--shards', type=int, default=3, help='Number of worker processes of the sharded server, 0 to skip it')
+    parser.add_argument('--session', default=False, action='store_true',
+                        help='Also run every mode with the players on PlayerSession streams instead of unary calls')
+    args = parser.parse_args()
+
+    modes = [('thread-pool', [])]
+    if args.shards:
+        modes.append((f'sharded (--shards {args.shards})', ['--shards', str(args.shards)]))
+    rows = []
+    for name, server_args in modes:
+        for session in ([False, True] if args.session else [False]):
+            process, target = start_server(server_args)
+            try:
+                samples = run_team(target, args.players, args.cycles, not args.no_coach, not args.no_trainer, session)
+            finally:
+                stop_server(process)
+            rows.append((f'{name} PlayerSession' if session else name, summarize(samples)))
+    print_table(rows)
+
+
+if __name__ == '__main__':
+    main()
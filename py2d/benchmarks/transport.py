@@ -0,0 +1,64 @@
+"""
+Round-trip latency of the rpc server over TCP loopback and over a unix domain socket, with the default gRPC channel
+options and with the tuned options of utils/transport.py.
+
+One stand-in player sends its calls one after the other, so the latency is the time of one proxy round-trip.
+GetPlayerActions includes the decision of the agent, SendPlayerType does almost nothing in the server and shows
+the transport cost alone.
+
+Run from the py2d directory:
+    python3 -m benchmarks.transport --calls 500
+"""
+import argparse
+import os
+import tempfile
+from utils.proxy_standin import StandInProxy, default_player_type
+from utils.transport import CHANNEL_OPTIONS, remove_unix_socket
+from benchmarks.bench_utils import start_server, stop_server, summarize, print_table, now_ms, free_port
+
+
+def measure(target: str, channel_options: list, calls: int) -> tuple[list[float], list[float]]:
+    proxy = StandInProxy(target, 'BENCH', 1, channel_options=channel_options)
+    proxy.wait_for_server()
+    proxy.register()
+    proxy.send_params()
+    states = [proxy.make_state(cycle) for cycle in range(1, calls + 1)]
+    player_type = default_player_type(0)
+    player_type.register_response.CopyFrom(proxy.register_response)
+    actions, player_types = [], []
+    for state in states:
+        start = now_ms()
+        proxy.get_actions(state)
+        actions.append(now_ms() - start)
+        start = now_ms()
+        proxy.stub.SendPlayerType(player_type)
+        player_types.append(now_ms() - start)
+    proxy.bye()
+    proxy.close()
+    return actions, player_types
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the rpc round-trip latency over TCP and a unix domain socket')
+    parser.add_argument('--calls', type=int, default=500, help='Calls of each rpc per case')
+    args = parser.parse_args()
+
+    socket_path = os.path.join(tempfile.gettempdir(), f'py2d_transport_{os.getpid()}.sock')
+    port = free_port()
+    transports = [('tcp', str(port), f'localhost:{port}'), ('uds', f'unix:{socket_path}', f'unix:{socket_path}')]
+    rows = []
+    for transport, endpoint, target in transports:
+        process, target = start_server(port=endpoint, target=target)
+        try:
+            for options_name, channel_options in (('default options', None), ('tuned options', CHANNEL_OPTIONS)):
+                actions, player_types = measure(target, channel_options, args.calls)
+                rows.append((f'{transport} {options_name} GetPlayerActions', summarize(actions)))
+                rows.append((f'{transport} {options_name} SendPlayerType', summarize(player_types)))
+        finally:
+            stop_server(process)
+            remove_unix_socket(endpoint)
+    print_table(rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Query the structured traces of server.py --trace.
+
+Every agent has its own memory mapped trace file with records in cycle order, so a cycle range is found with a
+binary search and only the records of that range are read.
+
+Examples:
+    # all pass decisions of unum 3 between cycles 1000 and 2000
+    python3 query_trace.py logs/2024-01-01_10-00-00/traces --unum 3 --event pass --from 1000 --to 2000
+    # number of records per event and agent
+    python3 query_trace.py logs/2024-01-01_10-00-00/traces --count
+"""
+import argparse
+from collections import Counter
+from src.utils.trace_events import TraceEvent
+from utils.tracing import TraceReader, find_trace_files
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Query structured trace files')
+    parser.add_argument('traces', nargs='+', help='Trace directories or .trace files')
+    parser.add_argument('-u', '--unum', type=int, action='append', default=[], help='Only agents with this uniform number (can be repeated)')
+    parser.add_argument('-t', '--team', default=None, help='Only agents of this team')
+    parser.add_argument('-e', '--event', action='append', default=[],
+                        help=f'Only this event (can be repeated): {", ".join(e.name.lower() for e in TraceEvent)}')
+    parser.add_argument('--from', dest='first_cycle', type=int, default=0, help='First cycle')
+    parser.add_argument('--to', dest='last_cycle', type=int, default=None, help='Last cycle (inclusive)')
+    parser.add_argument('--count', default=False, action='store_true', help='Print the number of records per agent and event instead of the records')
+    args = parser.parse_args()
+
+    events = None
+    if args.event:
+        try:
+            events = {TraceEvent[name.upper()].value for name in args.event}
+        except KeyError as e:
+            parser.error(f"Unknown event {e}")
+
+    paths = find_trace_files(args.traces)
+    if not paths:
+        parser.error("No trace files found")
+
+    for path in paths:
+        reader = TraceReader(path)
+        if (args.unum and reader.uniform_number not in args.unum) or (args.team and reader.team_name != args.team):
+            reader.close()
+            continue
+        records = reader.query(args.first_cycle, args.last_cycle, events)
+        if args.count:
+            counts = Counter(record.event_name for record in records)
+            for name, count in sorted(counts.items()):
+                print(f"{reader.team_name} {reader.uniform_number:>2} {name:<14}{count:>8}")
+        else:
+            for record in records:
+                fields = ' '.join(f'{name}={value:.2f}' for name, value in record.fields().items())
+                print(f"{record.cycle:>5}.{record.stoped_cycle:<3} {reader.team_name} {record.uniform_number:>2} "
+                      f"{record.event_name:<14}{fields}")
+        reader.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+Replay recorded agents without rcssserver, the proxy or gRPC.
+
+The records of server.py --record are fed to the same GrpcAgent objects the rpc server builds: first the register
+and params records, then every state as fast as possible. The throughput and the per-cycle latency of each agent
+are reported, and with --diff the produced actions are compared with the recorded ones.
+
+Examples:
+    python3 replay.py logs/2024-01-01_10-00-00/records
+    python3 replay.py logs/2024-01-01_10-00-00/records --agent agent2_2 --diff --repeat 3
+"""
+import argparse
+import logging
+import time
+from dataclasses import dataclass, field
+import service_pb2 as pb2
+from utils.logger_utils import setup_logger
+from utils import recorder as rec
+from server import GrpcAgent
+from benchmarks.bench_utils import summarize, print_table
+
+
+@dataclass
+class ReplayResult:
+    name: str
+    latencies_ms: list[float] = field(default_factory=list)
+    elapsed: float = 0.0
+    compared: int = 0
+    mismatches: list[tuple[int, int]] = field(default_factory=list)
+
+
+def replay_agent(name: str, records: list[rec.Record], logger: logging.Logger, diff: bool,
+                 cycles: int = 0) -> ReplayResult:
+    """
+    Build an agent from the records and feed it every recorded state.
+
+    :param name: Name of the recorded agent.
+    :param records: Records of the agent in recorded order.
+    :param logger: Logger of the agent.
+    :param diff: Compare the produced actions with the recorded ones.
+    :param cycles: Stop after this number of states, 0 replays all of them.
+    :return: Latencies and differences of the replay.
+    """
+    result = ReplayResult(name)
+    agent: GrpcAgent = None
+    produced = None
+    states = 0
+    start = time.perf_counter()
+    for record in records:
+        if record.kind == rec.REGISTER:
+            register_response: pb2.RegisterResponse = record.message
+            agent = GrpcAgent(register_response.agent_type, register_response.uniform_number, logger, False)
+        elif agent is None:
+            continue
+        elif record.kind == rec.STATE:
+            if cycles and states >= cycles:
+                break
+            states += 1
+            state = record.message
+            cycle_start = time.perf_counter()
+            produced = agent.GetAction(state)
+            result.latencies_ms.append((time.perf_counter() - cycle_start) * 1000.0)
+        elif record.kind in (rec.PLAYER_ACTIONS, rec.COACH_ACTIONS, rec.TRAINER_ACTIONS):
+            if diff and produced is not None:
+                result.compared += 1
+                if produced != record.message:
+                    result.mismatches.append((record.cycle, record.stoped_cycle))
+            produced = None
+        elif record.kind == rec.SERVER_PARAM:
+            agent.SetServerParams(record.message)
+        elif record.kind == rec.PLAYER_PARAM:
+            agent.SetPlayerParams(record.message)
+        elif record.kind == rec.PLAYER_TYPE:
+            agent.SetPlayerType(record.message)
+        elif record.kind == rec.INIT_MESSAGE:
+            agent.debug_mode = record.message.debug_mode
+    result.elapsed = time.perf_counter() - start
+    if agent is not None:
+        agent.Close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay recorded agents without the simulator')
+    parser.add_argument('records', nargs='+', help='Record directories or .rec files')
+    parser.add_argument('-a', '--agent', action='append', default=[], help='Only replay this agent, e.g. agent2_2 (can be repeated)')
+    parser.add_argument('--diff', required=False, help='Compare the produced actions with the recorded ones', default=False, action='store_true')
+    parser.add_argument('--repeat', required=False, type=int, help='Replay every agent this number of times', default=1)
+    parser.add_argument('--cycles', required=False, type=int, help='Replay only this number of states per agent (0 replays all of them)', default=0)
+    parser.add_argument('--show-mismatches', required=False, type=int, help='Number of different cycles to print per agent', default=5)
+    args = parser.parse_args()
+
+    grouped = rec.find_record_files(args.records, args.agent)
+    if not grouped:
+        parser.error("No record files found")
+
+    rows = []
+    all_latencies = []
+    total_states = 0
+    total_elapsed = 0.0
+    for name, paths in grouped.items():
+        records = rec.read_parts(paths)
+        logger = setup_logger(f"replay_{name}", ".", console_level=logging.WARNING, file_level=None)
+        for run in range(args.repeat):
+            result = replay_agent(name, records, logger, args.diff, args.cycles)
+            label = name if args.repeat == 1 else f'{name} #{run + 1}'
+            rows.append((label, summarize(result.latencies_ms)))
+            all_latencies += result.latencies_ms
+            total_states += len(result.latencies_ms)
+            total_elapsed += result.elapsed
+            print(f"{label}: {len(result.latencies_ms)} cycles in {result.elapsed:.2f}s "
+                  f"({len(result.latencies_ms) / max(result.elapsed, 1e-9):.0f} cycles/sec)")
+            if args.diff:
+                print(f"{label}: {len(result.mismatches)} of {result.compared} actions differ from the recording")
+                for cycle, stoped_cycle in result.mismatches[:args.show_mismatches]:
+                    print(f"    cycle {cycle}.{stoped_cycle}")
+
+    rows.append(('all', summarize(all_latencies)))
+    print()
+    print_table(rows)
+    print(f"\nthroughput: {total_states / max(total_elapsed, 1e-9):.0f} cycles/sec")
+
+
+if __name__ == '__main__':
+    main()
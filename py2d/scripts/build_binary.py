@@ -0,0 +1,198 @@
+"""
+Build the production binary of the team with a profile of a recorded match.
+
+1. profile: the records of server.py --record are replayed with cProfile like replay.py does. The modules of this
+   tree that the replay imported are the used modules, and the modules that take --coverage of the time spent in
+   the code of this tree are the hot modules.
+2. accelerated tree: a copy of the tree in <build-dir>/accelerated where every hot module is compiled with
+   `nuitka --module` next to its .py file. Python imports the extension module instead of the source, so this
+   tree runs like the pure Python one, only faster. benchmarks/binary_comparison.py compares both.
+3. standalone: start.py is compiled with `nuitka --standalone` into an unpacked directory, so an agent starts
+   without the self-extraction of a --onefile binary. The used modules are included explicitly, which covers
+   the agent classes that server.py imports by name, and the scripts of this tree that were not used (the
+   benchmarks and the tools) are left out. The directory is assembled like scripts/create_binary.sh does.
+
+Run from the py2d directory:
+    python3 scripts/build_binary.py logs/2024-01-01_10-00-00/records
+"""
+import argparse
+import cProfile
+import json
+import os
+import pstats
+import shutil
+import subprocess
+import sys
+
+
+TREE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Not part of the team, never copied to the accelerated tree
+IGNORED = shutil.ignore_patterns('__pycache__', '*.pyc', 'logs', 'build', 'binary', '.venv', 'proxy', 'rcssserver')
+# The programs of the binary, never compiled as hot modules
+ENTRY_POINTS = ('start', 'server')
+# Imported by the profile, not by the team
+PROFILE_MODULES = ('scripts.build_binary', 'replay', 'benchmarks', 'benchmarks.bench_utils')
+# The team code, always followed by the standalone build even if the profile did not use a module
+TEAM_PACKAGES = ('src', 'utils')
+
+
+def module_name(path: str) -> str:
+    """
+    Module name of a .py file of this tree, None for files outside of it.
+    """
+    path = os.path.abspath(path)
+    if not path.startswith(TREE + os.sep) or not path.endswith('.py'):
+        return None
+    name = os.path.relpath(path, TREE)[:-len('.py')].replace(os.sep, '.')
+    return name[:-len('.__init__')] if name.endswith('.__init__') else name
+
+
+def tree_modules() -> list[str]:
+    modules = []
+    for directory, directories, files in os.walk(TREE):
+        directories[:] = [d for d in directories if d not in ('__pycache__', 'logs', 'build', 'scripts', '.venv')]
+        modules += [module_name(os.path.join(directory, f)) for f in files if f.endswith('.py')]
+    return sorted(modules)
+
+
+def profile_child(records: list[str], cycles: int, output: str):
+    """
+    Replay the records with cProfile and write the used modules and the time per module of this tree to output.
+    """
+    sys.path.insert(0, TREE)
+    os.chdir(TREE)
+    import logging
+    from replay import replay_agent
+    from utils import recorder as rec
+    from utils.logger_utils import setup_logger
+    profiler = cProfile.Profile()
+    for name, paths in rec.find_record_files(records, []).items():
+        records_of_agent = rec.read_parts(paths)
+        logger = setup_logger(f"build_{name}", ".", console_level=logging.WARNING, file_level=None)
+        profiler.enable()
+        replay_agent(name, records_of_agent, logger, False, cycles)
+        profiler.disable()
+    times: dict[str, float] = {}
+    for (path, _, _), (_, _, self_time, _, _) in pstats.Stats(profiler).stats.items():
+        name = module_name(path)
+        if name is not None:
+            times[name] = times.get(name, 0.0) + self_time
+    used = sorted({module_name(module.__file__) for module in list(sys.modules.values())
+                   if getattr(module, '__file__', None) and module_name(module.__file__)} - set(PROFILE_MODULES))
+    with open(output, 'w') as f:
+        json.dump(dict(used=used, times=times), f, indent=1)
+
+
+def profile(records: list[str], cycles: int, build_dir: str) -> tuple[list[str], dict[str, float]]:
+    # A fresh interpreter, so sys.modules only holds what the replay imported
+    output = os.path.join(build_dir, 'profile.json')
+    subprocess.run([sys.executable, os.path.abspath(__file__), '--profile-child', '--cycles', str(cycles),
+                    '--output', output] + records, check=True)
+    with open(output) as f:
+        data = json.load(f)
+    return data['used'], data['times']
+
+
+def select_hot_modules(times: dict[str, float], coverage: float) -> list[str]:
+    """
+    The slowest modules that together take `coverage` of the time, without the entry points.
+    """
+    candidates = sorted(((t, name) for name, t in times.items() if name not in ENTRY_POINTS + PROFILE_MODULES),
+                        reverse=True)
+    total = sum(t for t, _ in candidates)
+    hot, covered = [], 0.0
+    for t, name in candidates:
+        if covered >= coverage * total:
+            break
+        hot.append(name)
+        covered += t
+    return hot
+
+
+def nuitka(arguments: list[str], cwd: str):
+    command = [sys.executable, '-m', 'nuitka', '--assume-yes-for-downloads'] + arguments
+    print(' '.join(command))
+    subprocess.run(command, cwd=cwd, check=True)
+
+
+def build_accelerated(hot: list[str], build_dir: str) -> str:
+    tree = os.path.join(build_dir, 'accelerated')
+    shutil.rmtree(tree, ignore_errors=True)
+    shutil.copytree(TREE, tree, ignore=IGNORED)
+    for name in hot:
+        path = name.replace('.', os.sep) + '.py'
+        nuitka(['--module', path, f'--output-dir={os.path.dirname(path) or "."}', '--remove-output'], cwd=tree)
+    return tree
+
+
+def build_standalone(used: list[str], output_dir: str):
+    if os.path.exists(output_dir):
+        raise SystemExit(f"{output_dir} already exists. Please remove it before building.")
+    os.makedirs(output_dir)
+    sys.path.insert(0, TREE)
+    from server import AGENT_CLASSES
+    # server.py imports the agent classes by name, nuitka only follows the import statements
+    included = set(used) | {module for module, _ in AGENT_CLASSES.values()}
+    unused = [name for name in tree_modules()
+              if name not in included and name not in ENTRY_POINTS and name.split('.')[0] not in TEAM_PACKAGES]
+    arguments = ['--standalone', f'--output-dir={output_dir}', '--remove-output']
+    arguments += [f'--include-module={name}' for name in sorted(included) if name not in ENTRY_POINTS]
+    arguments += [f'--nofollow-import-to={name}' for name in unused]
+    nuitka(arguments + ['start.py'], cwd=TREE)
+    # The same layout as scripts/create_binary.sh, start.bin runs the unpacked binary
+    scripts = os.path.join(TREE, 'scripts')
+    os.makedirs(os.path.join(output_dir, 'scripts'))
+    shutil.copytree(os.path.join(scripts, 'proxy'), os.path.join(output_dir, 'scripts', 'proxy'))
+    shutil.copytree(os.path.join(TREE, 'src', 'formations'), os.path.join(output_dir, 'src', 'formations'))
+    for name in ('start', 'startAll'):
+        shutil.copy(os.path.join(scripts, name), os.path.join(output_dir, name))
+    start_bin = os.path.join(output_dir, 'start.bin')
+    with open(start_bin, 'w') as f:
+        f.write('#!/bin/sh\nexec "$(dirname "$0")/start.dist/start.bin" "$@"\n')
+    os.chmod(start_bin, 0o755)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the team binary with a profile of recorded matches')
+    parser.add_argument('records', nargs='+', help='Record directories or .rec files of server.py --record')
+    parser.add_argument('--cycles', type=int, default=1000, help='States replayed per agent for the profile (0 replays all of them)')
+    parser.add_argument('--coverage', type=float, default=0.9, help='Compile the slowest modules that take this ratio of the time')
+    parser.add_argument('--build-dir', default=os.path.join(TREE, 'build'), help='Directory of the profile and the accelerated tree')
+    parser.add_argument('--output-dir', default=os.path.join(TREE, 'scripts', 'binary'), help='Directory of the standalone binary')
+    parser.add_argument('--profile-only', default=False, action='store_true', help='Only print the used and hot modules')
+    parser.add_argument('--skip-accelerated', default=False, action='store_true', help='Do not build the accelerated tree')
+    parser.add_argument('--skip-standalone', default=False, action='store_true', help='Do not build the standalone binary')
+    parser.add_argument('--profile-child', default=False, action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--output', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    records = [os.path.abspath(path) for path in args.records]
+    if args.profile_child:
+        profile_child(records, args.cycles, args.output)
+        return
+
+    os.makedirs(args.build_dir, exist_ok=True)
+    used, times = profile(records, args.cycles, args.build_dir)
+    hot = select_hot_modules(times, args.coverage)
+    total = sum(times.values())
+    print(f"{len(used)} modules of the tree are used, {len(hot)} hot modules take "
+          f"{sum(times[name] for name in hot) / max(total, 1e-9):.0%} of the time:")
+    for name in hot:
+        print(f"    {name:<60}{times[name]:>8.2f}s")
+    with open(os.path.join(args.build_dir, 'modules.json'), 'w') as f:
+        json.dump(dict(used=used, hot=hot), f, indent=1)
+    if args.profile_only:
+        return
+
+    try:
+        import nuitka  # noqa: F401
+    except ImportError:
+        raise SystemExit("nuitka is not installed: pip install nuitka")
+    if not args.skip_accelerated:
+        print(f"accelerated tree: {build_accelerated(hot, args.build_dir)}")
+    if not args.skip_standalone:
+        build_standalone(used, os.path.abspath(args.output_dir))
+        print(f"standalone binary: {args.output_dir}")
+
+
+if __name__ == '__main__':
+    main()
@@ -5,62 +5,182 @@ import service_pb2 as pb2
 from typing import Union
 from multiprocessing import Manager, Lock
 from utils.logger_utils import setup_logger
+from utils.sharding import ShardPool
+from utils.cycle_watchdog import CycleWatchdog
+from utils.metrics import registry as metrics, timed_rpc
+from utils import recorder as rec
+from utils.flight_recorder import FlightRecorder
+from utils.tracing import Tracer, flush_tracers
+from utils.matches import MatchRegistry, MatchQuotaError
+from utils.transport import SERVER_OPTIONS, server_address
+from functools import partial
 import logging
 import grpc
 import argparse
 import datetime
+import os
+import time
 from src.interfaces.IAgent import IAgent
-from src.sample_coach_agent import SampleCoachAgent
-from src.sample_player_agent import SamplePlayerAgent
-from src.sample_trainer_agent import SampleTrainerAgent
+from src.strategy.formation import preload_formations
 import traceback
+import gc
+import atexit
+import signal
+import importlib
 
 
 console_logging_level = logging.INFO
 file_logging_level = logging.INFO
 player_console_logging_level = logging.INFO
 player_file_logging_level = logging.DEBUG
+player_log_rate_limit = 0.0
+log_max_bytes = 0
+ready_fd = None
 
 main_logger = None
 log_dir = None
 
+# Module and class of the agent of every AgentType, imported when the first agent of the type is created, so a
+# server that only serves a coach never imports the player decision code
+AGENT_CLASSES = {
+    pb2.AgentType.PlayerT: ('src.sample_player_agent', 'SamplePlayerAgent'),
+    pb2.AgentType.CoachT: ('src.sample_coach_agent', 'SampleCoachAgent'),
+    pb2.AgentType.TrainerT: ('src.sample_trainer_agent', 'SampleTrainerAgent'),
+}
+_agent_classes: dict[int, type] = {}
+
+
+def agent_class(agent_type: pb2.AgentType) -> type:
+    cls = _agent_classes.get(agent_type)
+    if cls is None:
+        module_name, class_name = AGENT_CLASSES[agent_type]
+        cls = _agent_classes[agent_type] = getattr(importlib.import_module(module_name), class_name)
+    return cls
+
+
+def notify_ready(message: str):
+    """
+    Write a readiness line (`listening` or `registered`) to the --ready-fd pipe of the launcher, if there is one.
+    """
+    if ready_fd is None:
+        return
+    try:
+        os.write(ready_fd, f'{message}\n'.encode())
+    except OSError:
+        pass  # the launcher does not wait any more
+
+
+def flush_and_terminate(signum, frame):
+    """
+    SIGTERM handler with --trace: write the buffered traces of the agents that did not send Bye, then terminate
+    like without the handler.
+    """
+    flush_tracers()
+    signal.signal(signum, signal.SIG_DFL)
+    os.kill(os.getpid(), signum)
+
+
+def preload():
+    """
+    Load what every agent of every server needs before server processes are forked from this one, so the
+    children share it copy-on-write instead of building their own copy: the agent modules, and the formations,
+    which also import scipy. The loaded objects are frozen out of the garbage collector, otherwise its collections in the children would
+    write to their headers and copy the shared pages.
+    """
+    start = time.monotonic()
+    for agent_type in AGENT_CLASSES:
+        agent_class(agent_type)
+    preload_formations('src/formations', logging.getLogger('preload'))
+    gc.collect()
+    gc.freeze()
+    return time.monotonic() - start
+
 
 class GrpcAgent:
-    def __init__(self, agent_type, uniform_number, logger, debug) -> None:
+    def __init__(self, agent_type, uniform_number, logger, debug, cycle_deadline_ratio=0.0, 
+                 recorder: Union[rec.ClientRecorder, None] = None, flight_recorder: Union[FlightRecorder, None] = None,
+                 tracer: Union[Tracer, None] = None) -> None:
         self.agent_type: pb2.AgentType = agent_type
         self.uniform_number: int = uniform_number
         self.agent: IAgent = None
         self.logger: logging.Logger = logger
-        if self.agent_type == pb2.AgentType.PlayerT:
-            self.agent = SamplePlayerAgent(self.logger)
-        elif self.agent_type == pb2.AgentType.CoachT:
-            self.agent = SampleCoachAgent(self.logger)
-        elif self.agent_type == pb2.AgentType.TrainerT:
-            self.agent = SampleTrainerAgent(self.logger)
+        self.agent = agent_class(self.agent_type)(self.logger)
         self.agent.set_debug_mode(debug)
+        self.agent.tracer = tracer
         self.debug_mode: bool = False
+        self.watchdog: Union[CycleWatchdog, None] = None
+        if cycle_deadline_ratio > 0:
+            self.watchdog = CycleWatchdog(cycle_deadline_ratio, self.logger)
+        self.recorder = recorder
+        self.flight_recorder = flight_recorder
     
     def GetAction(self, state: pb2.State):
-        self.logger.debug(f"================================= cycle={state.world_model.cycle}.{state.world_model.stoped_cycle} =================================")
+        self.logger.debug("================================= cycle=%d.%d =================================",
+                          state.world_model.cycle, state.world_model.stoped_cycle)
         # self.logger.debug(f"State: {state}")
+        if self.flight_recorder is not None:
+            self.flight_recorder.record_state(state)
+            start = time.perf_counter()
         try:
-            if self.agent_type == pb2.AgentType.PlayerT:
-                return self.GetPlayerActions(state)
-            elif self.agent_type == pb2.AgentType.CoachT:
-                return self.GetCoachActions(state)
-            elif self.agent_type == pb2.AgentType.TrainerT:
-                return self.GetTrainerActions(state)
+            if self.recorder is not None:
+                self.recorder.record(rec.STATE, state, state.world_model.cycle, state.world_model.stoped_cycle)
+            if self.watchdog is not None:
+                res = self.watchdog.run(lambda: self.Decide(state),
+                                        lambda: self.GetFallbackActions(state),
+                                        self.agent.get_running_decision_maker_name)
+            else:
+                res = self.Decide(state)
+            if self.recorder is not None:
+                self.recorder.record(rec.ACTIONS_KINDS[self.agent_type], res, state.world_model.cycle, state.world_model.stoped_cycle)
+            if self.flight_recorder is not None:
+                self.flight_recorder.record_result(rec.ACTIONS_KINDS[self.agent_type], res,
+                                                   (time.perf_counter() - start) * 1000.0)
+                if self.watchdog is not None and self.watchdog.expired:
+                    self.flight_recorder.dump('overrun')
+            return res
         except Exception as e:
             self.logger.error(f"Error in GetAction: {e}")
             self.logger.error(traceback.format_exc())
+            if self.flight_recorder is not None:
+                self.flight_recorder.record_result(rec.ACTIONS_KINDS[self.agent_type], None,
+                                                   (time.perf_counter() - start) * 1000.0)
+                self.flight_recorder.dump('exception')
             return pb2.PlayerActions()
+    
+    def Decide(self, state: pb2.State):
+        if metrics.enabled:
+            start = time.perf_counter()
+            res = self.DecideByType(state)
+            metrics.observe('decision_latency_ms', self.agent.get_running_decision_maker_name(),
+                            (time.perf_counter() - start) * 1000.0)
+            return res
+        return self.DecideByType(state)
+    
+    def DecideByType(self, state: pb2.State):
+        if self.agent_type == pb2.AgentType.PlayerT:
+            return self.GetPlayerActions(state)
+        elif self.agent_type == pb2.AgentType.CoachT:
+            return self.GetCoachActions(state)
+        elif self.agent_type == pb2.AgentType.TrainerT:
+            return self.GetTrainerActions(state)
+    
+    def GetFallbackActions(self, state: pb2.State):
+        res = self.agent.get_fallback_actions(state.world_model)
+        if res is not None:
+            return res
+        if self.agent_type == pb2.AgentType.CoachT:
+            return pb2.CoachActions()
+        elif self.agent_type == pb2.AgentType.TrainerT:
+            return pb2.TrainerActions()
+        return pb2.PlayerActions()
         
     def GetPlayerActions(self, state: pb2.State):
         self.agent.update_actions(state.world_model)
         return self.agent.get_actions()
     
     def GetBestPlannerAction(self, request: pb2.BestPlannerActionRequest) -> int:
-        self.logger.debug(f"GetBestPlannerAction cycle:{request.state.world_model.cycle} pairs:{len(request.pairs)} unum:{request.state.register_response.uniform_number}")
+        self.logger.debug("GetBestPlannerAction cycle:%d pairs:%d unum:%d", request.state.world_model.cycle, len(request.pairs),
+                          request.state.register_response.uniform_number)
         best_index = max(request.pairs.items(), key=lambda x: x[1].evaluation)[0]
         best_action = request.pairs[best_index].action
         
@@ -80,8 +200,14 @@ class GrpcAgent:
     
     def SetServerParams(self, server_params: pb2.ServerParam):
         try:
+            if self.recorder is not None:
+                self.recorder.record(rec.SERVER_PARAM, server_params)
+            if self.flight_recorder is not None:
+                self.flight_recorder.record_header(rec.SERVER_PARAM, server_params)
             self.logger.debug(f"Server params received unum {server_params.register_response.uniform_number}")
             self.agent.set_server_params(server_params)
+            if self.watchdog is not None:
+                self.watchdog.set_simulator_step(server_params.simulator_step)
         except Exception as e:
             self.logger.error(f"Error in GetAction: {e}")
             self.logger.error(traceback.format_exc())
@@ -89,6 +215,10 @@ class GrpcAgent:
         
     def SetPlayerParams(self, player_params: pb2.PlayerParam):
         try:
+            if self.recorder is not None:
+                self.recorder.record(rec.PLAYER_PARAM, player_params)
+            if self.flight_recorder is not None:
+                self.flight_recorder.record_header(rec.PLAYER_PARAM, player_params)
             self.logger.debug(f"Player params received unum {player_params.register_response.uniform_number}")
             self.agent.set_player_params(player_params)
         except Exception as e:
@@ -98,65 +228,124 @@ class GrpcAgent:
         
     def SetPlayerType(self, player_type: pb2.PlayerType):
         try:
+            if self.recorder is not None:
+                self.recorder.record(rec.PLAYER_TYPE, player_type)
+            if self.flight_recorder is not None:
+                self.flight_recorder.record_header(rec.PLAYER_TYPE, player_type)
             self.logger.debug(f"Player type received unum {player_type.register_response.uniform_number}")
             self.agent.set_player_types(player_type)
         except Exception as e:
             self.logger.error(f"Error in GetAction: {e}")
             self.logger.error(traceback.format_exc())
             return pb2.PlayerActions()
+    
+    def Close(self):
+        if self.watchdog is not None:
+            self.logger.info(f"Cycle deadline {self.watchdog.report()}")
+            self.watchdog.close()
+        self.logger.info(f"Query cache {self.agent.query_cache.report()}")
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.flight_recorder is not None:
+            self.flight_recorder.dump('bye', force=True)
+        if self.agent.tracer is not None:
+            self.agent.tracer.close()
         
 class GameHandler(pb2_grpc.GameServicer):
-    def __init__(self, shared_lock, shared_number_of_connections, debug) -> None:
+    def __init__(self, shared_lock, shared_number_of_connections, debug, cycle_deadline_ratio=0.0, metrics_interval=0.0,
+                 record_options: Union[dict, None] = None, max_matches=0, max_agents_per_match=0, flight_cycles=0,
+                 trace=False) -> None:
         self.agents: dict[int, GrpcAgent] = {}
+        self.matches = MatchRegistry(main_logger, max_matches, max_agents_per_match)
         self.shared_lock = shared_lock
         self.shared_number_of_connections = shared_number_of_connections
         self.debug = debug
+        self.cycle_deadline_ratio = cycle_deadline_ratio
+        self.flight_cycles = flight_cycles
+        self.trace = trace
+        self.registered = False
+        self.recorder: Union[rec.Recorder, None] = None
+        if record_options is not None:
+            # Created here and not in main, so every sharded worker runs its own writer thread
+            self.recorder = rec.Recorder(os.path.join(log_dir, 'records'), logger=main_logger, **record_options)
+        if metrics_interval > 0:
+            # One file per process, sharded servers run a GameHandler in every worker
+            metrics.start_snapshot_writer(os.path.join(log_dir, f'metrics_{os.getpid()}.txt'), metrics_interval)
 
+    @timed_rpc
     def GetPlayerActions(self, state: pb2.State, context):
-        main_logger.debug(f"GetPlayerActions unum {state.register_response.uniform_number} at {state.world_model.cycle}")
+        main_logger.debug("GetPlayerActions unum %d at %d", state.register_response.uniform_number, state.world_model.cycle)
+        if metrics.enabled:
+            metrics.observe_cycle(state.register_response.client_id, state.world_model.cycle)
         res = self.agents[state.register_response.client_id].GetAction(state)
         return res
 
+    @timed_rpc
     def GetCoachActions(self, state: pb2.State, context):
-        main_logger.debug(f"GetCoachActions coach at {state.world_model.cycle}")
+        main_logger.debug("GetCoachActions coach at %d", state.world_model.cycle)
+        if metrics.enabled:
+            metrics.observe_cycle(state.register_response.client_id, state.world_model.cycle)
         res = self.agents[state.register_response.client_id].GetAction(state)
         return res
 
+    @timed_rpc
     def GetTrainerActions(self, state: pb2.State, context):
-        main_logger.debug(f"GetTrainerActions trainer at {state.world_model.cycle}")
+        main_logger.debug("GetTrainerActions trainer at %d", state.world_model.cycle)
+        if metrics.enabled:
+            metrics.observe_cycle(state.register_response.client_id, state.world_model.cycle)
         res = self.agents[state.register_response.client_id].GetAction(state)
         return res
 
+    @timed_rpc
     def SendServerParams(self, serverParams: pb2.ServerParam, context):
         main_logger.debug(f"Server params received unum {serverParams.register_response.uniform_number}")
         self.agents[serverParams.register_response.client_id].SetServerParams(serverParams)
         res = pb2.Empty()
         return res
 
+    @timed_rpc
     def SendPlayerParams(self, playerParams: pb2.PlayerParam, context):
         main_logger.debug(f"Player params received unum {playerParams.register_response.uniform_number}")
         self.agents[playerParams.register_response.client_id].SetPlayerParams(playerParams)
         res = pb2.Empty()
         return res
 
+    @timed_rpc
     def SendPlayerType(self, playerType: pb2.PlayerType, context):
         main_logger.debug(f"Player type received unum {playerType.register_response.uniform_number}")
         self.agents[playerType.register_response.client_id].SetPlayerType(playerType)
         res = pb2.Empty()
         return res
 
+    @timed_rpc
     def SendInitMessage(self, initMessage: pb2.InitMessage, context):
         main_logger.debug(f"Init message received unum {initMessage.register_response.uniform_number}")
-        self.agents[initMessage.register_response.client_id].debug_mode = initMessage.debug_mode
+        agent = self.agents[initMessage.register_response.client_id]
+        agent.debug_mode = initMessage.debug_mode
+        if agent.recorder is not None:
+            agent.recorder.record(rec.INIT_MESSAGE, initMessage)
+        if agent.flight_recorder is not None:
+            agent.flight_recorder.record_header(rec.INIT_MESSAGE, initMessage)
         res = pb2.Empty()
         return res
 
+    @timed_rpc
     def Register(self, register_request: pb2.RegisterRequest, context):
+        try:
+            return self.RegisterAgent(register_request)
+        except MatchQuotaError as e:
+            main_logger.warning(f"Register rejected: {e}")
+            if context is not None:
+                context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, str(e))
+            return pb2.RegisterResponse()
+
+    def RegisterAgent(self, register_request: pb2.RegisterRequest):
         try:
             with self.shared_lock:
                 main_logger.info(f"received register request from team_name: {register_request.team_name} "
                     f"unum: {register_request.uniform_number} "
                     f"agent_type: {register_request.agent_type}")
+                match = self.matches.reserve(register_request)
                 self.shared_number_of_connections.value += 1
                 main_logger.info(f"Number of connections {self.shared_number_of_connections.value}")
                 team_name = register_request.team_name
@@ -166,63 +355,208 @@ class GameHandler(pb2_grpc.GameServicer):
                                         team_name=team_name,
                                         uniform_number=uniform_number,
                                         agent_type=agent_type)
-                logger = setup_logger(f"agent{register_response.uniform_number}_{register_response.client_id}", log_dir, 
-                                      console_level=player_console_logging_level, file_level=player_file_logging_level)
-                self.agents[self.shared_number_of_connections.value] = GrpcAgent(agent_type, uniform_number, logger, self.debug)
+                agent_name = f"agent{register_response.uniform_number}_{register_response.client_id}"
+                logger = setup_logger(agent_name, log_dir, 
+                                      console_level=player_console_logging_level, file_level=player_file_logging_level,
+                                      rate_limit=player_log_rate_limit, max_bytes=log_max_bytes)
+                recorder = None
+                if self.recorder is not None:
+                    recorder = self.recorder.open(register_response.client_id, agent_name)
+                    recorder.record(rec.REGISTER, register_response)
+                flight_recorder = None
+                if self.flight_cycles > 0:
+                    flight_recorder = FlightRecorder(os.path.join(log_dir, 'flight'), agent_name, self.flight_cycles,
+                                                     logger=main_logger)
+                    flight_recorder.record_header(rec.REGISTER, register_response)
+                tracer = None
+                if self.trace:
+                    tracer = Tracer(os.path.join(log_dir, 'traces'), agent_name, uniform_number, team_name)
+                agent = GrpcAgent(agent_type, uniform_number, logger, self.debug, self.cycle_deadline_ratio, recorder,
+                                  flight_recorder, tracer)
+                self.agents[register_response.client_id] = agent
+                self.matches.add(match, register_response.client_id, register_request, agent)
+                main_logger.info(f"agent {register_response.client_id} joined {match}")
+                if not self.registered:
+                    self.registered = True
+                    notify_ready('registered')
             return register_response
+        except MatchQuotaError:
+            raise
         except Exception as e:
             main_logger.error(f"Error in Register: {e}")
             main_logger.error(traceback.format_exc())
             return pb2.RegisterResponse()
 
+    @timed_rpc
     def SendByeCommand(self, register_response: pb2.RegisterResponse, context):
         main_logger.debug(f"Bye command received unum {register_response.uniform_number}")
         # with shared_lock:
-        self.agents.pop(register_response.client_id)
+        agent = self.agents.pop(register_response.client_id)
+        agent.Close()
+        metrics.forget_client(register_response.client_id)
+        with self.shared_lock:
+            self.matches.remove(register_response.client_id)
             
         res = pb2.Empty()
         return res
     
+    @timed_rpc
     def GetBestPlannerAction(self, pairs: pb2.BestPlannerActionRequest, context):
-        main_logger.debug(f"GetBestPlannerAction cycle:{pairs.state.world_model.cycle} pairs:{len(pairs.pairs)} unum:{pairs.register_response.uniform_number}")
+        main_logger.debug("GetBestPlannerAction cycle:%d pairs:%d unum:%d", pairs.state.world_model.cycle, len(pairs.pairs),
+                          pairs.register_response.uniform_number)
         res = self.agents[pairs.register_response.client_id].GetBestPlannerAction(pairs)
         return res
+
+    def PlayerSession(self, state_iterator, context):
+        agent = None
+        for state in state_iterator:
+            if agent is None:
+                agent = self.BindSession(state)
+                if agent is None:
+                    context.abort(grpc.StatusCode.NOT_FOUND, f"player {state.register_response.client_id} is not registered")
+            yield self.SessionStep(agent, state)
+
+    def BindSession(self, state: pb2.State) -> Union[GrpcAgent, None]:
+        """
+        Find the agent of a PlayerSession stream from its first State, later States of the stream skip the lookup.
+        """
+        agent = self.agents.get(state.register_response.client_id)
+        if agent is None or agent.agent_type != pb2.AgentType.PlayerT:
+            main_logger.error(f"PlayerSession for unknown player {state.register_response.client_id}")
+            return None
+        main_logger.info(f"PlayerSession started unum {state.register_response.uniform_number}")
+        return agent
+
+    def SessionStep(self, agent: GrpcAgent, state: pb2.State):
+        main_logger.debug("PlayerSession unum %d at %d", state.register_response.uniform_number, state.world_model.cycle)
+        if not metrics.enabled:
+            return agent.GetAction(state)
+        metrics.observe_cycle(state.register_response.client_id, state.world_model.cycle)
+        start = time.perf_counter()
+        res = agent.GetAction(state)
+        elapsed_ms = (time.perf_counter() - start) * 1000.0
+        metrics.observe('rpc_latency_ms', 'PlayerSession', elapsed_ms)
+        metrics.observe('client_rpc_latency_ms', state.register_response.client_id, elapsed_ms)
+        return res
     
 
-def serve(port, shared_lock, shared_number_of_connections, debug):
-    server = grpc.server(futures.ThreadPoolExecutor(max_workers=22))
-    game_service = GameHandler(shared_lock, shared_number_of_connections, debug)
+def serve(port, handler_factory):
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=22), options=SERVER_OPTIONS)
+    game_service = handler_factory()
     pb2_grpc.add_GameServicer_to_server(game_service, server)
-    server.add_insecure_port(f'[::]:{port}')
+    server.add_insecure_port(server_address(port))
     server.start()
     main_logger.info(f"Starting server on port {port}")
+    notify_ready('listening')
     
     server.wait_for_termination()
-    
+
+
+def serve_sharded(port, handler_factory, shards):
+    # Workers are forked before gRPC starts any thread, each one runs its own GameHandler
+    main_logger.info(f"Preloaded the shared data for the workers in {preload() * 1000.0:.0f}ms")
+    shard_pool = ShardPool(shards, handler_factory, main_logger)
+    server = grpc.server(futures.ThreadPoolExecutor(max_workers=22), options=SERVER_OPTIONS)
+    server.add_generic_rpc_handlers((shard_pool.generic_handler(),))
+    server.add_insecure_port(server_address(port))
+    server.start()
+    main_logger.info(f"Starting sharded server with {shards} worker processes on port {port}")
+    notify_ready('listening')
+
+    try:
+        server.wait_for_termination()
+    finally:
+        shard_pool.close()
+
 
 def main():
-    global main_logger, log_dir, file_logging_level, player_file_logging_level
+    global main_logger, log_dir, file_logging_level, player_file_logging_level, player_log_rate_limit, log_max_bytes, ready_fd
     parser = argparse.ArgumentParser(description='Run play maker server')
-    parser.add_argument('-p', '--rpc-port', required=False, help='The port of the server', default=50051)
+    parser.add_argument('-p', '--rpc-port', required=False, help='The port of the server, or unix:<path> to listen on a unix domain socket', default=50051)
     parser.add_argument('-l', '--log-dir', required=False, help='The directory of the log file', 
                         default=f'logs/{datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")}')
     parser.add_argument('--disable-log-file', required=False, help='Disable logging to a file', default=False, action='store_true')
+    parser.add_argument('--log-rate-limit', required=False, type=float, help='Maximum debug and info log records per second of each agent (0 is unlimited)', 
+                        default=0.0)
+    parser.add_argument('--log-max-size', required=False, type=int, help='Rotate a log file after this many megabytes (0 never rotates)', 
+                        default=0)
     parser.add_argument('-d', '--debug', required=False, help='Enable debug mode for agents', default=False, action='store_true')
+    parser.add_argument('--shards', required=False, type=int, help='Run agents in this number of worker processes behind one rpc port', 
+                        default=0)
+    parser.add_argument('--cycle-deadline-ratio', required=False, type=float, 
+                        help='Send fallback actions if a decision takes longer than this ratio of the simulator step (0 disables it)', 
+                        default=0.0)
+    parser.add_argument('--metrics-interval', required=False, type=float, 
+                        help='Write a snapshot of the latency metrics to the log directory every this many seconds (0 disables it)', 
+                        default=0.0)
+    parser.add_argument('--max-matches', required=False, type=int, help='Reject agents of new matches when the server hosts this number of matches (0 is unlimited)', 
+                        default=0)
+    parser.add_argument('--max-agents-per-match', required=False, type=int, help='Reject new agents of a match that has this number of agents (0 is unlimited)', 
+                        default=0)
+    parser.add_argument('--record', required=False, help='Record the states, actions and params of every agent to the records directory of the log directory', 
+                        default=False, action='store_true')
+    parser.add_argument('--record-compression', required=False, choices=['none', 'zlib', 'zstd'], help='Compression of the record blocks', 
+                        default='none')
+    parser.add_argument('--record-max-file-size', required=False, type=int, help='Start a new record file of an agent after this many megabytes', 
+                        default=64)
+    parser.add_argument('--record-max-files', required=False, type=int, help='Keep only this number of record files per agent (0 keeps all of them)', 
+                        default=4)
+    parser.add_argument('--flight-recorder', required=False, type=int, 
+                        help='Keep the last this many cycles of every agent in memory and write them to the flight directory of the log directory on an error, a deadline overrun or bye (0 disables it)', 
+                        default=0)
+    parser.add_argument('--trace', required=False, help='Write the structured trace of the behaviors of every agent to the traces directory of the log directory', 
+                        default=False, action='store_true')
+    parser.add_argument('--ready-fd', required=False, type=int, 
+                        help='Write "listening" to this inherited file descriptor when the server accepts connections and "registered" when the first agent registered', 
+                        default=None)
+    parser.add_argument('--metrics-port', required=False, type=int, help='Serve the latency metrics as text on this local http port (0 disables it)', 
+                        default=0)
     
     args = parser.parse_args()
+    if args.metrics_port and args.shards:
+        parser.error("--metrics-port is not supported with --shards, use --metrics-interval to get a snapshot file per worker")
     
     log_dir = args.log_dir
+    ready_fd = args.ready_fd
     if args.disable_log_file:
         file_logging_level = None
         player_file_logging_level = None
+    player_log_rate_limit = args.log_rate_limit
+    log_max_bytes = args.log_max_size * 1024 * 1024
         
-    main_logger = setup_logger("pmservice", log_dir, console_level=console_logging_level, file_level=file_logging_level)
+    main_logger = setup_logger("pmservice", log_dir, console_level=console_logging_level, file_level=file_logging_level,
+                               max_bytes=log_max_bytes)
     main_logger.info("Starting server")
     manager = Manager()
     shared_lock = Lock()  # Create a Lock for synchronization
     shared_number_of_connections = manager.Value('i', 0)
     
-    serve(args.rpc_port, shared_lock, shared_number_of_connections, args.debug)
+    metrics.enabled = args.metrics_interval > 0 or args.metrics_port > 0
+    if args.metrics_port:
+        metrics.start_http_endpoint(args.metrics_port)
+        main_logger.info(f"Serving metrics on http://127.0.0.1:{args.metrics_port}")
+    
+    record_options = None
+    if args.record:
+        record_options = dict(compression=args.record_compression, max_file_size=args.record_max_file_size << 20,
+                              max_files=args.record_max_files)
+        main_logger.info(f"Recording agents to {os.path.join(log_dir, 'records')}")
+    
+    handler_factory = partial(GameHandler, shared_lock, shared_number_of_connections, args.debug, 
+                              cycle_deadline_ratio=args.cycle_deadline_ratio, metrics_interval=args.metrics_interval,
+                              record_options=record_options, max_matches=args.max_matches, 
+                              max_agents_per_match=args.max_agents_per_match, flight_cycles=args.flight_recorder,
+                              trace=args.trace)
+    
+    if args.trace:
+        # Installed before the shards are forked, so they inherit it
+        atexit.register(flush_tracers)
+        signal.signal(signal.SIGTERM, flush_and_terminate)
+    
+    if args.shards:
+        serve_sharded(args.rpc_port, handler_factory, args.shards)
+    else:
+        serve(args.rpc_port, handler_factory)
     
 if __name__ == '__main__':
     main()
@@ -1,10 +1,13 @@
 from typing import TYPE_CHECKING
+import math
 from src.interfaces.IAgent import IAgent
 from src.utils.tools import Tools
+from src.utils.geom import Vec2
 from pyrusgeom.geom_2d import *
 from pyrusgeom.soccer_math import *
 from service_pb2 import *
 from src.interfaces.IBehavior import IBehavior
+from src.utils.trace_events import TraceEvent
 
 if TYPE_CHECKING:
     from src.sample_player_agent import SamplePlayerAgent
@@ -40,16 +43,16 @@ class Bhv_Block(IBehavior):
                 - Calculate the first cycle that the agent or a teammate can block the ball.
                 - If the agent can block the ball, add a Body_GoToPoint action to the agent.
         """
-        agent.logger.debug(f'------ Bhv_Block ------')
+        agent.logger.debug('------ Bhv_Block ------')
         wm = agent.wm
         sp = agent.server_params
         
         opp_min = wm.intercept_table.first_opponent_reach_steps
         current_ball_pos = Tools.convert_rpc_vector2d_to_vector2d(wm.ball.position)
         current_ball_vel = Tools.convert_rpc_vector2d_to_vector2d(wm.ball.velocity)
-        intercept_pos: Vector2D = inertia_n_step_point(current_ball_pos, current_ball_vel, opp_min, sp.ball_decay)
+        intercept_pos = Vec2.from_vector2d(inertia_n_step_point(current_ball_pos, current_ball_vel, opp_min, sp.ball_decay))
         target_pos = self._get_final_target(agent)
-        dribble_vel = Vector2D.from_polar(self._get_average_dribble_speed(agent), (target_pos - intercept_pos).th())
+        dribble_vel = Vec2.from_polar(self._get_average_dribble_speed(agent), (Vec2.from_vector2d(target_pos) - intercept_pos).th())
         home_pos_offside_line_x = agent.strategy.get_offside_line()
         
         future_ball_pos = intercept_pos
@@ -58,11 +61,11 @@ class Bhv_Block(IBehavior):
             future_ball_pos += dribble_vel
             
             if future_ball_pos.abs_x() > sp.pitch_half_length:
-                agent.logger.debug(f'Bhv_Block: False: future_ball_pos.abs_x() > sp.pitch_half_length')
+                agent.logger.debug('Bhv_Block: False: future_ball_pos.abs_x() > sp.pitch_half_length')
                 return False
             
             if future_ball_pos.abs_y() > sp.pitch_half_width:
-                agent.logger.debug(f'Bhv_Block: False: future_ball_pos.abs_y() > sp.pitch_half_width')
+                agent.logger.debug('Bhv_Block: False: future_ball_pos.abs_y() > sp.pitch_half_width')
                 return False
             
             if wm.self.uniform_number <= 5:
@@ -76,7 +79,8 @@ class Bhv_Block(IBehavior):
                 block_cycles = self._calculate_block_cycles(future_ball_pos, our_player)
                 if block_cycles <= cycle:
                     if wm.self.uniform_number == our_player.uniform_number:
-                        agent.logger.debug(f'Bhv_Block: True: I can block in {cycle} in {future_ball_pos=}')
+                        agent.logger.debug('Bhv_Block: True: I can block in %d in future_ball_pos=%s', cycle, future_ball_pos)
+                        agent.trace(TraceEvent.BLOCK, future_ball_pos.x(), future_ball_pos.y(), cycle)
                         agent.add_action(PlayerAction(body_go_to_point=Body_GoToPoint(target_point=Tools.convert_vector2d_to_rpc_vector2d(future_ball_pos),
                                                                                       max_dash_power=100.0,
                                                                                       distance_threshold=0.5)))
@@ -84,7 +88,8 @@ class Bhv_Block(IBehavior):
                         agent.add_log_circle(LoggerLevel.BLOCK, future_ball_pos.x(), future_ball_pos.y(), 0.5, 'red', True)
                         return True
                     else:
-                        agent.logger.debug(f'Bhv_Block: False: tm {our_player.uniform_number} can block in {block_cycles} in {future_ball_pos=}')
+                        agent.logger.debug('Bhv_Block: False: tm %d can block in %d in future_ball_pos=%s',
+                                           our_player.uniform_number, block_cycles, future_ball_pos)
                         return False
             
         return False
@@ -109,15 +114,16 @@ class Bhv_Block(IBehavior):
         """
         return 0.7
     
-    def _calculate_block_cycles(self, future_ball_pos: Vector2D, player: Player) -> int:
+    def _calculate_block_cycles(self, future_ball_pos: Vec2, player: Player) -> int:
         """
         Calculates the number of cycles required for a player to block the ball at a future position.
         Parameters:
-            future_ball_pos (Vector2D): The predicted future position of the ball.
+            future_ball_pos (Vec2): The predicted future position of the ball.
             player (Player): The player attempting to block the ball.
         Returns:
             int: The number of cycles required for the player to block the ball.
         """
-        player_pos = Tools.convert_rpc_vector2d_to_vector2d(player.position)
-        distance = future_ball_pos.dist(player_pos)
+        # Called for every player in every predicted cycle, so no vector is built for the player position
+        distance = math.sqrt((future_ball_pos.x() - player.position.x) ** 2
+                             + (future_ball_pos.y() - player.position.y) ** 2)
         return int(distance)
\ No newline at end of file
@@ -4,6 +4,7 @@ from pyrusgeom.soccer_math import *
 from pyrusgeom.geom_2d import *
 from src.utils.tools import Tools
 from service_pb2 import *
+from src.utils.trace_events import TraceEvent
 
 
 if TYPE_CHECKING:
@@ -47,7 +48,8 @@ class BhvStarterClearBall(IBehavior):
             "\033[31m",
         )
         agent.add_log_text(LoggerLevel.CLEAR, f": Clearing to {target}")
-        agent.logger.debug(f"Clearing to {target}")
+        agent.logger.debug("Clearing to %s", target)
+        agent.trace(TraceEvent.CLEAR, target.x(), target.y())
 
         # Add the clearing action to the agent's action list
         agent.add_action(
@@ -2,8 +2,8 @@ from typing import TYPE_CHECKING
 from src.interfaces.IBehavior import IBehavior
 from src.utils.tools import Tools
 from pyrusgeom.vector_2d import Vector2D
-from pyrusgeom.sector_2d import Sector2D
 from service_pb2 import *
+from src.utils.trace_events import TraceEvent
 
 
 if TYPE_CHECKING:
@@ -33,18 +33,20 @@ class BhvStarterDribble(IBehavior):
         dribble_speed = 0.8  # Set dribble speed
         dribble_threshold = 0.7  # Set dribble speed threshold
         dribble_radius = 3  # Set dribble radius
-        dribble_sector = Sector2D(
-            ball_pos, 0, dribble_radius, dribble_angle - 15, dribble_angle + 15  # Define dribble sector
-        )
         # Define dribble angles
         dribble_angles = [dribble_angle , dribble_angle - 30, dribble_angle + 30]
         # Calculate dribble targets base on the dribble angles
         targets = list(map(lambda angle: Vector2D.polar2vector(dribble_radius, angle) + ball_pos, dribble_angles))
-        for target in targets:
-            # Check if there are no opponents in the dribble sector
-            if Tools.exist_opponent_in(agent, dribble_sector):
-                targets.remove(target)
-                continue
+        # Check the dribble sectors of all angles at once, keep the targets without opponents in their sector
+        occupied = Tools.exist_opponents_in_sectors(
+            agent,
+            ball_pos,
+            0,
+            dribble_radius,
+            [angle - 15 for angle in dribble_angles],
+            [angle + 15 for angle in dribble_angles],
+        )
+        targets = [target for target, is_occupied in zip(targets, occupied) if not is_occupied]
         
         if len(targets) > 0:
             # Get the best target to dribble based on the nearest target to the opponent's goal
@@ -57,7 +59,8 @@ class BhvStarterDribble(IBehavior):
                 "\033[31m",
             )
             agent.add_log_text(LoggerLevel.DRIBBLE, f": Dribbling to {best_target}")
-            agent.logger.debug(f"Dribbling to {best_target}")
+            agent.logger.debug("Dribbling to %s", best_target)
+            agent.trace(TraceEvent.DRIBBLE, best_target.x(), best_target.y())
             agent.add_action(
                 PlayerAction(
                     body_smart_kick=Body_SmartKick(
@@ -4,6 +4,7 @@ from pyrusgeom.soccer_math import *
 from pyrusgeom.geom_2d import *
 from src.utils.tools import Tools
 from service_pb2 import *
+from src.utils.trace_events import TraceEvent
 
 
 if TYPE_CHECKING:
@@ -53,7 +54,8 @@ class BhvStarterPass(IBehavior):
                 "\033[31m",
             )
             agent.add_log_text(LoggerLevel.PASS, f": Passing to {best_target}")
-            agent.logger.debug(f"Passing to {best_target}")
+            agent.logger.debug("Passing to %s", best_target)
+            agent.trace(TraceEvent.PASS, best_target.x(), best_target.y(), first_speed)
             
             # Add the pass action to the agent's action list
             agent.add_action(
@@ -88,28 +90,17 @@ class BhvStarterPass(IBehavior):
         # Get the world model from the agent
         wm = agent.wm
         
-        # Initialize the list of potential pass targets
-        targets: list[Vector2D] = []
+        # Positions of the teammates to pass to
+        targets: list[Vector2D] = [
+            Vector2D(teammate.position.x, teammate.position.y) for teammate in wm.teammates
+            if teammate is not None and teammate.uniform_number != wm.self.uniform_number and teammate.uniform_number >= 0
+        ]
         
-        # Get the positions of the ball and the agent
-        ball_pos = Vector2D(wm.ball.position.x, wm.ball.position.y)
-        self_pos = Vector2D(wm.self.position.x, wm.self.position.y)
-        
-        # Iterate over teammates position and teammates around position to find valid pass targets
-        for teammate in wm.teammates:
-
-            if teammate == None or teammate.uniform_number == wm.self.uniform_number or teammate.uniform_number < 0:
-                continue
-            #teammate positon to pass
-            tm_pos = Vector2D(teammate.position.x, teammate.position.y)
-            
-            if self.target_point_validation(agent, tm_pos):
-                targets.append(tm_pos)
-
-    
+        # Validate all the targets at once
+        valid = self.targets_validation(agent, targets)
     
         # Return the list of valid pass targets
-        return targets
+        return [target for target, is_valid in zip(targets, valid) if is_valid]
 
     def get_best_candidate(self, agent: "SamplePlayerAgent", targets: list[Vector2D]) -> Union[Vector2D, None]:
         """
@@ -144,28 +135,37 @@ class BhvStarterPass(IBehavior):
         Returns:
             bool: True if the pass point is valid, False otherwise.
         """
+        return self.targets_validation(agent, [target])[0]
+
+    def targets_validation(self, agent: "SamplePlayerAgent", targets: list[Vector2D]) -> list[bool]:
+        """
+        Check for each target if the pass point is valid for the agent to pass the ball to it.
+        The passing paths of all targets are checked against all opponents in one vectorized call.
+        Args:
+            agent (SamplePlayerAgent): The agent that will execute the
+                behavior.
+            targets (list[Vector2D]): The target positions to pass the ball to.
+        Returns:
+            list[bool]: True for the valid pass points, False for the others.
+        """
         wm = agent.wm
         
         # Get the positions of the ball and the agent
         ball_pos = Vector2D(wm.ball.position.x, wm.ball.position.y)
-
-        # Check if the teammate is too far from the ball
-        if target.dist(ball_pos) > 30.0:
-            return False
         
+        dists = [target.dist(ball_pos) for target in targets]
+        angles = [(target - ball_pos).th().degree() for target in targets]
         
-        # Define a sector to check for opponents
-        check_root = Sector2D(
+        # Define a sector for each target to check for opponents. Sector2D clamps its min radius to 0, so like
+        # before an opponent next to the ball blocks the pass.
+        occupied = Tools.exist_opponents_in_sectors(
+            agent,
             ball_pos,
-            1.0,
-            target.dist(ball_pos) + 3.0,
-            (target - ball_pos).th() - 15.0,
-            (target - ball_pos).th() + 15.0,
-        )
+            0.0,
+            [dist + 3.0 for dist in dists],
+            [angle - 15.0 for angle in angles],
+            [angle + 15.0 for angle in angles],
+        ) if targets else []
         
-        # Check if there are no opponents in the sector
-        if Tools.exist_opponent_in(agent, check_root):
-            return False
-        
-
-        return True
\ No newline at end of file
+        # The teammate must not be too far from the ball and there must be no opponents in the sector
+        return [dist <= 30.0 and not is_occupied for dist, is_occupied in zip(dists, occupied)]
@@ -1,6 +1,6 @@
 from typing import TYPE_CHECKING
 from src.interfaces.IBehavior import IBehavior
-import numpy as np
+import math
 from src.interfaces.IAgent import IAgent
 from src.utils.tools import Tools
 from pyrusgeom.vector_2d import Vector2D
@@ -397,7 +397,7 @@ class BhvStarterPenalty(IBehavior):
         min_x = -SP.pitch_half_length + SP.catch_area_l * 0.9
 
         if ball_pos.x < -49.0:
-            return Vector2D(min_x, ball_pos.y()) if ball_pos.abs_y() < (SP.goal_width)/2 else Vector2D(min_x, np.sign(ball_pos.y()) * ((SP.goal_width)/2))
+            return Vector2D(min_x, ball_pos.y()) if ball_pos.abs_y() < (SP.goal_width)/2 else Vector2D(min_x, math.copysign(1.0, ball_pos.y()) * ((SP.goal_width)/2))
 
         goal_l = Vector2D(-SP.pitch_half_length, -((SP.goal_width)/2))
         goal_r = Vector2D(-SP.pitch_half_length, ((SP.goal_width)/2))
@@ -415,7 +415,7 @@ class BhvStarterPenalty(IBehavior):
             line_r = Line2D(ball_pos, goal_r)
 
             alpha = AngleDeg.atan2_deg(((SP.goal_width)/2), SP.penalty_area_length() - 2.5)
-            dist_from_goal = ((line_l.dist(intersection) + line_r.dist(intersection)) * 0.5) / np.sin(alpha)
+            dist_from_goal = ((line_l.dist(intersection) + line_r.dist(intersection)) * 0.5) / math.sin(alpha)
 
             if dist_from_goal <= ((SP.goal_width)/2):
                 dist_from_goal = ((SP.goal_width)/2)
@@ -3,6 +3,7 @@ from src.interfaces.IBehavior import IBehavior
 from pyrusgeom.vector_2d import Vector2D
 from service_pb2 import *
 from src.utils.tools import Tools
+from src.utils.trace_events import TraceEvent
 
 
 if TYPE_CHECKING:
@@ -47,7 +48,8 @@ class BhvStarterShoot(IBehavior):
                 "\033[31m",
             )
             agent.add_log_text(LoggerLevel.SHOOT, f": Shooting to {target}")
-            agent.logger.debug(f"Shooting to {target}")
+            agent.logger.debug("Shooting to %s", target)
+            agent.trace(TraceEvent.SHOOT, target.x(), target.y())
             agent.add_action(
                 PlayerAction(
                     body_smart_kick=Body_SmartKick(
@@ -2,6 +2,7 @@ from typing import TYPE_CHECKING
 from service_pb2 import *
 from pyrusgeom.vector_2d import Vector2D
 from src.utils.tools import Tools
+from src.utils.trace_events import TraceEvent
 
 
 if TYPE_CHECKING:
@@ -80,7 +81,8 @@ class BhvStarterSetPlayKickOff:
                 )
             )
         )
-        agent.logger.debug(f"BhvStarterSetPlayKickOff.do_kick: kick to {target_point}")
+        agent.logger.debug("BhvStarterSetPlayKickOff.do_kick: kick to %s", target_point)
+        agent.trace(TraceEvent.KICKOFF_KICK, target_point.x(), target_point.y(), ball_speed)
         
         return True
 
@@ -17,6 +17,7 @@ class DecisionMaker(IDecisionMaker):
         set_play_decision_maker (SetPlayDecisionMaker): Handles decisions during set plays.
         penalty_decision_maker (PenaltyDecisionMaker): Handles decisions during penalty kicks.
         goalie_decision_maker (GoalieDecisionMaker): Handles decisions for goalies.
+        current_decision_maker (IDecisionMaker): The decision maker selected for the current cycle.
     Methods:
         __init__():
             Initializes the DecisionMaker with specific decision makers for different game modes.
@@ -32,13 +33,15 @@ class DecisionMaker(IDecisionMaker):
         self.set_play_decision_maker = SetPlayDecisionMaker(agent)
         self.penalty_decision_maker = PenaltyDecisionMaker(agent)
         self.goalie_decision_maker = GoalieDecisionMaker(agent)
+        self.current_decision_maker: IDecisionMaker = None
     
     def make_decision(self, agent: "SamplePlayerAgent"):
         if agent.wm.self.is_goalie:
-            self.goalie_decision_maker.make_decision(agent)
+            self.current_decision_maker = self.goalie_decision_maker
         elif agent.wm.game_mode_type == GameModeType.PlayOn:
-            self.play_on_decision_maker.make_decision(agent)
+            self.current_decision_maker = self.play_on_decision_maker
         elif agent.wm.is_penalty_kick_mode:
-            self.penalty_decision_maker.make_decision(agent)
+            self.current_decision_maker = self.penalty_decision_maker
         else:
-            self.set_play_decision_maker.make_decision(agent)
\ No newline at end of file
+            self.current_decision_maker = self.set_play_decision_maker
+        self.current_decision_maker.make_decision(agent)
\ No newline at end of file
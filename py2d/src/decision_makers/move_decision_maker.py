@@ -7,6 +7,7 @@ from src.utils.tools import Tools
 from src.behaviors.bhv_block import Bhv_Block
 from src.behaviors.bhv_tackle import BhvTackle
 from src.behaviors.starter.bhv_starter_tackle import BhvStarterTackle
+from src.utils.trace_events import TraceEvent
 
 
 if TYPE_CHECKING:
@@ -54,7 +55,7 @@ class MoveDecisionMaker(IDecisionMaker):
         Logging:
             - Logs debug information about the decisions made.
         """
-        agent.logger.debug(f'------ NoBallDecisionMaker ------')
+        agent.logger.debug('------ NoBallDecisionMaker ------')
         wm: WorldModel = agent.wm
         self.bhv_tackle.execute(agent)
         self_min = wm.intercept_table.self_reach_steps
@@ -65,7 +66,8 @@ class MoveDecisionMaker(IDecisionMaker):
             agent.add_action(PlayerAction(body_intercept=Body_Intercept()))
             agent.add_action(PlayerAction(neck_offensive_intercept_neck=Neck_OffensiveInterceptNeck()))
             
-            agent.logger.debug(f'NoBallDecisionMaker: Body_Intercept')
+            agent.logger.debug('NoBallDecisionMaker: Body_Intercept')
+            agent.trace(TraceEvent.INTERCEPT, self_min, tm_min, opp_min)
             return
         
         if opp_min < min(self_min, tm_min):
@@ -93,7 +95,8 @@ class MoveDecisionMaker(IDecisionMaker):
         else:
             agent.add_action(PlayerAction(neck_turn_to_ball_or_scan=Neck_TurnToBallOrScan(count_threshold=0)))
             
-        agent.logger.debug(f'NoBallDecisionMaker: Body_GoToPoint {target_point} {dash_power} {dist_thr} or Body_TurnToBall')
+        agent.logger.debug('NoBallDecisionMaker: Body_GoToPoint %s %s %s or Body_TurnToBall', target_point, dash_power, dist_thr)
+        agent.trace(TraceEvent.GO_TO_POINT, target_point.x(), target_point.y(), dash_power, dist_thr)
         
     s_recover_mode = False
     
@@ -130,24 +133,24 @@ class MoveDecisionMaker(IDecisionMaker):
         my_inc = player_type.stamina_inc_max * wm.self.recovery
         
         if wm.our_defense_line_x > wm.self.position.x and wm.ball.position.x < wm.our_defense_line_x + 20.0:
-            agent.logger.debug(f'NoBallDecisionMaker: correct DF line. keep max power')
+            agent.logger.debug('NoBallDecisionMaker: correct DF line. keep max power')
             dash_power = sp.max_dash_power
         elif MoveDecisionMaker.s_recover_mode:
             dash_power = my_inc - 25.0
             if dash_power < 0.0:
                 dash_power = 0.0
-            agent.logger.debug(f'NoBallDecisionMaker: recovering')
+            agent.logger.debug('NoBallDecisionMaker: recovering')
         elif wm.kickable_teammate_existance and wm.ball.dist_from_self < 20.0:
             dash_power = min(my_inc * 1.1, sp.max_dash_power)
-            agent.logger.debug(f'NoBallDecisionMaker: exist kickable teammate. dash_power={dash_power}')
+            agent.logger.debug('NoBallDecisionMaker: exist kickable teammate. dash_power=%s', dash_power)
         elif wm.self.position.x > wm.offside_line_x:
             dash_power = sp.max_dash_power
-            agent.logger.debug(f'NoBallDecisionMaker: in offside area. dash_power={dash_power}')
+            agent.logger.debug('NoBallDecisionMaker: in offside area. dash_power=%s', dash_power)
         elif wm.ball.position.x > 25.0 and wm.ball.position.x > wm.self.position.x + 10.0 and self_min < opp_min - 6 and mate_min < opp_min - 6:
             dash_power = bound(sp.max_dash_power * 0.1, my_inc * 0.5, sp.max_dash_power)
-            agent.logger.debug(f'NoBallDecisionMaker: opponent ball dash_power={dash_power}')
+            agent.logger.debug('NoBallDecisionMaker: opponent ball dash_power=%s', dash_power)
         else:
             dash_power = min(my_inc * 1.7, sp.max_dash_power)
-            agent.logger.debug(f'NoBallDecisionMaker: normal mode dash_power={dash_power}')
+            agent.logger.debug('NoBallDecisionMaker: normal mode dash_power=%s', dash_power)
             
         return dash_power
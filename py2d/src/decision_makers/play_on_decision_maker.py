@@ -13,6 +13,7 @@ class PlayOnDecisionMaker(IDecisionMaker):
     Attributes:
         kick_decision_maker (KickDecisionMaker): The decision maker used when the agent can kick the ball.
         move_decision_maker (MoveDecisionMaker): The decision maker used when the agent cannot kick the ball.
+        current_decision_maker (IDecisionMaker): The decision maker selected for the current cycle.
     Methods:
         make_decision(agent: IAgent):
             Makes a decision based on the agent's ability to kick the ball.
@@ -21,10 +22,11 @@ class PlayOnDecisionMaker(IDecisionMaker):
     def __init__(self, agent: "SamplePlayerAgent"):
         self.kick_decision_maker = KickDecisionMaker(agent)
         self.move_decision_maker = MoveDecisionMaker(agent)
-        pass
+        self.current_decision_maker: IDecisionMaker = None
     
     def make_decision(self, agent: "SamplePlayerAgent"):
         if agent.wm.self.is_kickable:
-            self.kick_decision_maker.make_decision(agent)
+            self.current_decision_maker = self.kick_decision_maker
         else:
-            self.move_decision_maker.make_decision(agent)
\ No newline at end of file
+            self.current_decision_maker = self.move_decision_maker
+        self.current_decision_maker.make_decision(agent)
\ No newline at end of file
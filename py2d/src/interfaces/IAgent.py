@@ -5,10 +5,13 @@ from typing import Union
 from service_pb2 import *
 import logging
 from src.utils.memory import Memory
+from src.utils.query_cache import QueryCache
 
 
 if TYPE_CHECKING:
     from src.utils.tools import Tools
+    from src.utils.world_arrays import WorldArrays
+    from src.utils.spatial_index import SpatialIndex
 
 class IAgent(ABC):
     def __init__(self, logger) -> None:
@@ -21,6 +24,42 @@ class IAgent(ABC):
         self.debug_mode: bool = False
         self.memory: Memory = Memory()
         self.logger: logging.Logger = logger
+        # Writer of the structured trace, set by the rpc server when tracing is enabled
+        self.tracer = None
+        self._world_arrays: Union["WorldArrays", None] = None
+        self._world_arrays_key: tuple = None
+        # Results of the Tools queries of the current cycle, with the hit and miss counters of the game
+        self.query_cache: QueryCache = QueryCache()
+
+    @property
+    def world_arrays(self) -> "WorldArrays":
+        """
+        Numpy columns of the players and the ball of the current world model, see src.utils.world_arrays.
+        They are built on the first use in a cycle and shared by every behavior of the cycle.
+        """
+        # The rpc server can keep one materialized WorldModel object and update it every cycle
+        key = (id(self.wm), self.wm.cycle, self.wm.stoped_cycle)
+        if self._world_arrays_key != key:
+            from src.utils.world_arrays import WorldArrays
+            self._world_arrays = WorldArrays(self.wm)
+            self._world_arrays_key = key
+        return self._world_arrays
+
+    @property
+    def spatial_index(self) -> "SpatialIndex":
+        """
+        Index of the player positions of the current world model for nearest-player and region queries, see
+        src.utils.spatial_index. It is built on the first use in a cycle.
+        """
+        from src.utils.spatial_index import SpatialIndex
+        return self.cached_query('spatial_index', lambda: SpatialIndex(self.world_arrays, self.wm.self.uniform_number))
+
+    def cached_query(self, query, compute):
+        """
+        Result of a query of the current world model, computed once per cycle, see src.utils.query_cache.
+        """
+        self.query_cache.reset((id(self.wm), self.wm.cycle, self.wm.stoped_cycle))
+        return self.query_cache.get(query, compute)
 
     def set_server_params(self, server_param: ServerParam):
         self.server_params = server_param
@@ -106,9 +145,39 @@ class IAgent(ABC):
         )
         )
 
+    def trace(self, event: int, *values: float):
+        """
+        Add a structured trace record of the current cycle, see src.utils.trace_events.
+
+        Args:
+            event (TraceEvent): Id of the event
+            values (float): Up to 4 values of the event, in the order of TRACE_EVENT_FIELDS
+        """
+        if self.tracer is not None:
+            self.tracer.emit(self.wm.cycle, self.wm.stoped_cycle, event, values)
+
     def add_action(self, action: Union[PlayerAction, CoachAction, TrainerAction]):
         self.actions.append(action)
     
     @abstractmethod
     def get_actions(self) -> Union[PlayerActions, CoachActions, TrainerActions]:
-        pass
\ No newline at end of file
+        pass
+
+    def get_fallback_actions(self, wm: WorldModel) -> Union[PlayerActions, CoachActions, TrainerActions, None]:
+        """
+        Get cheap actions to send when the full decision misses the cycle deadline.
+        It can be called while update_actions of a previous cycle is still running, so it must not change the agent.
+
+        Args:
+            wm (WorldModel): World model of the cycle that needs actions
+
+        Returns:
+            Actions to be executed, or None to send no actions
+        """
+        return None
+
+    def get_running_decision_maker_name(self) -> str:
+        """
+        Get the name of the decision maker that is making the current decision, used to report deadline overruns.
+        """
+        return type(self).__name__
\ No newline at end of file
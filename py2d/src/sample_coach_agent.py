@@ -31,7 +31,7 @@ class SampleCoachAgent(IAgent, ABC):
         Returns:
             CoachActions: List of coach actions to be executed
         """
-        self.logger.debug(f'update_actions: {wm.cycle}')
+        self.logger.debug('update_actions: %d', wm.cycle)
         self.wm = wm
         
         self.actions.clear()
@@ -65,7 +65,7 @@ class SampleCoachAgent(IAgent, ABC):
         #     do_helios_substitute=DoHeliosSubstitute()
         # ))
         
-        self.logger.debug(f'actions: {self.actions}')
+        self.logger.debug('actions: %s', tuple(self.actions))
         
     def get_actions(self) -> CoachActions:
         """
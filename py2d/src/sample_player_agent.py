@@ -1,11 +1,17 @@
 from abc import ABC
+from typing import Union
 from src.decision_makers.decision_maker import DecisionMaker
 from src.interfaces.IAgent import IAgent
 from src.strategy.formation_strategy import FormationStrategy
 from src.strategy.starter_strategy import StarterStrategy
+from src.utils.tools import Tools
 from service_pb2 import *
 
 
+# max_dash_power of the rcssserver defaults, used by the fallback actions before SendServerParams arrived
+DEFAULT_MAX_DASH_POWER = 100.0
+
+
 class SamplePlayerAgent(IAgent, ABC):
     """
     A sample player agent implementation that handles decision making and strategy execution.
@@ -28,6 +34,9 @@ class SamplePlayerAgent(IAgent, ABC):
         self.decision_maker = DecisionMaker(self)
         self.strategy = self._initialize_strategy()
         self.wm: WorldModel = None
+        
+        # Home position of the last finished decision, used by the fallback actions
+        self.fallback_home_position: Union[RpcVector2D, None] = None
     
     def _initialize_strategy(self):
         """
@@ -47,12 +56,14 @@ class SamplePlayerAgent(IAgent, ABC):
         Args:
             wm (WorldModel): Current world model containing game state
         """
-        self.logger.debug(f'update_actions: {wm.cycle}')
+        self.logger.debug('update_actions: %d', wm.cycle)
         self.wm = wm
         self.actions.clear()
         self.strategy.update(self)
         self.decision_maker.make_decision(self)
-        self.logger.debug(f'actions: {self.actions}')
+        self.fallback_home_position = Tools.convert_vector2d_to_rpc_vector2d(
+            self.strategy.get_position(wm.self.uniform_number, self))
+        self.logger.debug('actions: %s', tuple(self.actions))
     
     def get_strategy(self):
         """
@@ -70,7 +81,13 @@ class SamplePlayerAgent(IAgent, ABC):
         
         res = PlayerActions()
         res.actions.extend(self.actions)
-        
+        self._set_ignore_flags(res)
+        return res
+    
+    def _set_ignore_flags(self, res: PlayerActions):
+        """
+        Set the proxy preprocessing flags of the actions based on the use_starter_code flag.
+        """
         if self.use_starter_code:
             res.ignore_doHeardPassRecieve = True
             res.ignore_doIntention = True
@@ -78,4 +95,42 @@ class SamplePlayerAgent(IAgent, ABC):
         else:
             pass
             # res.ignore_shootInPreprocess = True
-        return res
\ No newline at end of file
+    
+    def get_fallback_actions(self, wm: WorldModel) -> PlayerActions:
+        """
+        Get cheap actions that only need the world model, used when the full decision misses the cycle deadline.
+        The goalie uses the proxy goalie behavior, a kickable player holds the ball, the fastest player to the ball
+        intercepts it and the others go to the home position of the last finished decision.
+        
+        Args:
+            wm (WorldModel): World model of the cycle that needs actions
+        """
+        res = PlayerActions()
+        if wm.self.is_goalie:
+            res.actions.append(PlayerAction(helios_goalie=HeliosGoalie()))
+        elif wm.self.is_kickable:
+            res.actions.append(PlayerAction(body_hold_ball=Body_HoldBall()))
+        elif wm.intercept_table.self_reach_steps <= min(wm.intercept_table.first_teammate_reach_steps,
+                                                        wm.intercept_table.first_opponent_reach_steps + 3):
+            res.actions.append(PlayerAction(body_intercept=Body_Intercept()))
+            res.actions.append(PlayerAction(neck_offensive_intercept_neck=Neck_OffensiveInterceptNeck()))
+        else:
+            home = self.fallback_home_position
+            if home is None:
+                home = wm.helios_home_positions.get(wm.self.uniform_number, wm.self.position)
+            max_dash_power = DEFAULT_MAX_DASH_POWER if self.server_params is None else self.server_params.max_dash_power
+            res.actions.append(PlayerAction(body_go_to_point=Body_GoToPoint(target_point=home,
+                                                                            max_dash_power=max_dash_power,
+                                                                            distance_threshold=1.0)))
+            res.actions.append(PlayerAction(neck_turn_to_ball_or_scan=Neck_TurnToBallOrScan(count_threshold=0)))
+        self._set_ignore_flags(res)
+        return res
+    
+    def get_running_decision_maker_name(self) -> str:
+        """
+        Get the name of the innermost decision maker selected in the current cycle.
+        """
+        decision_maker = self.decision_maker
+        while getattr(decision_maker, 'current_decision_maker', None) is not None:
+            decision_maker = decision_maker.current_decision_maker
+        return type(decision_maker).__name__
\ No newline at end of file
@@ -28,7 +28,7 @@ class SampleTrainerAgent(IAgent, ABC):
         Args:
             wm (WorldModel): Current world model containing game state
         """
-        self.logger.debug(f'update_actions: {wm.cycle}')
+        self.logger.debug('update_actions: %d', wm.cycle)
         self.wm = wm
         
         actions = TrainerActions()
@@ -49,7 +49,7 @@ class SampleTrainerAgent(IAgent, ABC):
                     )
                 )
             )
-        self.logger.debug(f'actions: {self.actions}')
+        self.logger.debug('actions: %s', tuple(self.actions))
     
     def set_params(self, params):
         """
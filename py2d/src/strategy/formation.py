@@ -1,4 +1,5 @@
 import logging
+import os
 from src.strategy.formation_file import FormationFile
 
 class Formation:
@@ -48,3 +49,17 @@ class Formation:
             FormationFile: The created FormationFile instance.
         """
         return FormationFile(f'{self.path}/{filename}', self.logger)
+
+
+def preload_formations(directory: str, logger: logging.Logger):
+    """
+    Parse every formation directory in `directory` into the cache of formation_file, so the processes forked
+    afterwards share the parsed formations instead of each reading and triangulating them again.
+
+    Args:
+        directory (str): The directory containing one directory per formation, e.g. 'src/formations'.
+        logger (logging.Logger): Logger instance for logging formation-related information.
+    """
+    for name in sorted(os.listdir(directory)):
+        if os.path.isdir(f'{directory}/{name}'):
+            Formation(f'{directory}/{name}', logger)
@@ -1,9 +1,15 @@
-from scipy.spatial import Delaunay
 from pyrusgeom.geom_2d import *
 from pyrusgeom.soccer_math import min_max
 import logging
 from src.strategy.formation_file_reader import FormationFileReaderFactory, FormationType
 from src.strategy.player_role import PlayerRole
+from src.utils.geom import Vec2
+import threading
+
+# Parsed formation files shared by every agent of the process, keyed by path. The parsed data is never changed
+# after calculate, only the target players are per agent.
+_parsed_files: dict[str, tuple] = {}
+_parsed_files_lock = threading.Lock()
 
 class FormationFile:
     def __init__(self, path, logger: logging.Logger):
@@ -11,12 +17,24 @@ class FormationFile:
         self._balls = []
         self._players = []
         self._triangles = []
+        # Corners a, b and c of the triangles, float64 arrays of shape (triangles, 2)
+        self._corners = None
         self._formation_type = FormationType.Static
         self._target_players = {}
         self._path = path
         self._roles: dict[int, PlayerRole] = {}
-        self.read_file(path)
-        self.calculate()
+        with _parsed_files_lock:
+            parsed = _parsed_files.get(path)
+            if parsed is None:
+                self.read_file(path)
+                self.calculate()
+                _parsed_files[path] = (self._balls, self._players, self._triangles, self._corners,
+                                       self._formation_type, self._roles, self._target_players)
+                self._target_players = {unum: pos.copy() for unum, pos in self._target_players.items()}
+                return
+        (self._balls, self._players, self._triangles, self._corners, self._formation_type,
+         self._roles, target_players) = parsed
+        self._target_players = {unum: pos.copy() for unum, pos in target_players.items()}
 
     def read_file(self, path):
         """Reads the formation file and initializes the formation data."""
@@ -36,12 +54,18 @@ class FormationFile:
         """Calculates the Delaunay triangulation for dynamic formations."""
         if self._formation_type == FormationType.Static:
             return
+        # scipy takes most of the import time of the server, it is only imported when a formation is triangulated
+        from scipy.spatial import Delaunay
         self._tri = Delaunay(self._balls).simplices
         for tri in self._tri:
             tmp = [Triangle2D(Vector2D(self._balls[tri[0]][0], self._balls[tri[0]][1]),
                                     Vector2D(self._balls[tri[1]][0], self._balls[tri[1]][1]),
                                     Vector2D(self._balls[tri[2]][0], self._balls[tri[2]][1])), tri[0], tri[1], tri[2]]
             self._triangles.append(tmp)
+        # scipy has imported numpy already
+        import numpy as np
+        balls = np.array(self._balls, dtype=np.float64)
+        self._corners = (balls[self._tri[:, 0]], balls[self._tri[:, 1]], balls[self._tri[:, 2]])
 
     def update(self, B: Vector2D):
         """Updates the target player positions based on the ball position B."""
@@ -55,10 +79,12 @@ class FormationFile:
         if point.abs_y() > 34.0:
             point._y = min_max(-34.0, point.y(), 34.0)
         
-        for tri in self._triangles:
-            if tri[0].contains(point):
-                ids = [tri[1], tri[2], tri[3]]
-                break
+        # All triangles are checked in one vectorized pass, the first one that contains the point is used
+        from src.utils.geom_arrays import triangle_contains
+        inside = triangle_contains((point.x(), point.y()), *self._corners)
+        if inside.any():
+            tri = self._triangles[int(inside.argmax())]
+            ids = [tri[1], tri[2], tri[3]]
         
         Pa = Vector2D(self._balls[ids[0]][0], self._balls[ids[0]][1])
         Pb = Vector2D(self._balls[ids[1]][0], self._balls[ids[1]][1])
@@ -70,17 +96,18 @@ class FormationFile:
         n2 = lineProj.dist(B)
 
         self._target_players.clear()
+        # Called every cycle, the interpolation uses the slotted vectors and only the results are Vector2Ds
         for p in range(1, 12):
-            OPa = Vector2D(self._players[ids[0]][p][0], self._players[ids[0]][p][1])
-            OPb = Vector2D(self._players[ids[1]][p][0], self._players[ids[1]][p][1])
-            OPc = Vector2D(self._players[ids[2]][p][0], self._players[ids[2]][p][1])
+            OPa = Vec2(self._players[ids[0]][p][0], self._players[ids[0]][p][1])
+            OPb = Vec2(self._players[ids[1]][p][0], self._players[ids[1]][p][1])
+            OPc = Vec2(self._players[ids[2]][p][0], self._players[ids[2]][p][1])
             OI = (OPc - OPb)
             OI *= (m1 / (m1 + n1))
             OI += OPb
             OB = (OI - OPa)
             OB *= (m2 / (m2 + n2))
             OB += OPa
-            self._target_players[p] = OB
+            self._target_players[p] = Vector2D(OB.x(), OB.y())
 
     def get_pos(self, unum):
         """Returns the position of the player with the given uniform number."""
@@ -84,7 +84,7 @@ class FormationStrategy(IPositionStrategy):
         self._update_formation_file(ball_pos)
         self._adjust_positions(wm)
                 
-        logger.debug(f'{self._poses=}')
+        logger.debug('self._poses=%s', dict(self._poses))
         
     def _determine_situation(self, wm: WorldModel, ball_pos: Vector2D, tm_min: int, opp_min: int, self_min: int):
         """
@@ -0,0 +1,299 @@
+import math
+from typing import Union
+
+
+EPSILON = 1.0e-6
+DEG2RAD = math.pi / 180.0
+RAD2DEG = 180.0 / math.pi
+
+
+def normalize_angle(degree: float) -> float:
+    """
+    Angle in degrees normalized to [-180, 180] like AngleDeg.
+    """
+    if degree < -360.0 or degree > 360.0:
+        degree = degree % 360.0
+    if degree < -180.0:
+        degree += 360.0
+    if degree > 180.0:
+        degree -= 360.0
+    return degree
+
+
+def atan2_deg(y: float, x: float) -> float:
+    """
+    Direction of (x, y) in degrees, 0 for an (almost) zero vector like AngleDeg.atan2_deg.
+    """
+    if math.fabs(x) < EPSILON and math.fabs(y) < EPSILON:
+        return 0.0
+    return math.atan2(y, x) * RAD2DEG
+
+
+def _degree(angle) -> float:
+    # A float, an Angle or a pyrusgeom AngleDeg
+    return angle if isinstance(angle, (int, float)) else angle.degree()
+
+
+class Angle:
+    """
+    Slotted replacement of pyrusgeom AngleDeg for hot paths. The degree is normalized once and the sine and cosine
+    are computed on first use and cached, so an angle can be used in many rotations for the cost of one.
+
+    It has the methods of AngleDeg that this tree uses, and accepts floats, Angles and AngleDegs as arguments.
+    """
+    __slots__ = ('_degree', '_cos', '_sin')
+
+    def __init__(self, degree: Union[float, 'Angle'] = 0.0) -> None:
+        self._degree = normalize_angle(_degree(degree))
+        self._cos = None
+        self._sin = None
+
+    def degree(self) -> float:
+        return self._degree
+
+    def radian(self) -> float:
+        return self._degree * DEG2RAD
+
+    def abs(self) -> float:
+        return math.fabs(self._degree)
+
+    def cos(self) -> float:
+        if self._cos is None:
+            self._cos = math.cos(self._degree * DEG2RAD)
+        return self._cos
+
+    def sin(self) -> float:
+        if self._sin is None:
+            self._sin = math.sin(self._degree * DEG2RAD)
+        return self._sin
+
+    def tan(self) -> float:
+        return math.tan(self._degree * DEG2RAD)
+
+    def copy(self) -> 'Angle':
+        angle = Angle.__new__(Angle)
+        angle._degree, angle._cos, angle._sin = self._degree, self._cos, self._sin
+        return angle
+
+    def assign(self, degree) -> 'Angle':
+        """
+        Set the degree in place.
+        """
+        self._degree = normalize_angle(_degree(degree))
+        self._cos = None
+        self._sin = None
+        return self
+
+    def is_left_of(self, angle) -> bool:
+        diff = _degree(angle) - self._degree
+        return 0.0 < diff < 180.0 or diff < -180.0
+
+    def is_right_of(self, angle) -> bool:
+        diff = self._degree - _degree(angle)
+        return 0.0 < diff < 180.0 or diff < -180.0
+
+    def is_left_equal_of(self, angle) -> bool:
+        diff = _degree(angle) - self._degree
+        return 0.0 <= diff < 180.0 or diff < -180.0
+
+    def is_right_equal_of(self, angle) -> bool:
+        diff = self._degree - _degree(angle)
+        return 0.0 <= diff < 180.0 or diff < -180.0
+
+    def is_within(self, left, right) -> bool:
+        """
+        Whether this angle is within [left, right] turning clockwise.
+        """
+        left, right = Angle(left), Angle(right)
+        if left.is_left_equal_of(right):
+            return left.is_left_equal_of(self) and self.is_left_equal_of(right)
+        return self.is_left_equal_of(right) or left.is_left_equal_of(self)
+
+    def __add__(self, other) -> 'Angle':
+        return Angle(self._degree + _degree(other))
+
+    def __sub__(self, other) -> 'Angle':
+        return Angle(self._degree - _degree(other))
+
+    def __mul__(self, other: float) -> 'Angle':
+        return Angle(self._degree * other)
+
+    def __iadd__(self, other) -> 'Angle':
+        return self.assign(self._degree + _degree(other))
+
+    def __isub__(self, other) -> 'Angle':
+        return self.assign(self._degree - _degree(other))
+
+    def __neg__(self) -> 'Angle':
+        return Angle(-self._degree)
+
+    def __eq__(self, other) -> bool:
+        return math.fabs(self._degree - _degree(other)) < EPSILON
+
+    def __float__(self) -> float:
+        return float(self._degree)
+
+    def __repr__(self) -> str:
+        return str(self._degree)
+
+
+class Vec2:
+    """
+    Slotted replacement of pyrusgeom Vector2D for hot paths, without the validity flag and the argument parsing of
+    Vector2D. The in-place operators and methods (+=, -=, *=, /=, assign, rotate, set_length) reuse the object.
+
+    It has the methods of Vector2D that this tree uses and the same _x and _y attributes, so a Vec2 can be passed to
+    the pyrusgeom shapes, and Vector2Ds and RpcVector2Ds can be converted with from_vector2d and from_rpc.
+    """
+    __slots__ = ('_x', '_y')
+
+    def __init__(self, x: float = 0.0, y: float = 0.0) -> None:
+        self._x = x
+        self._y = y
+
+    @staticmethod
+    def from_vector2d(vector) -> 'Vec2':
+        return Vec2(vector.x(), vector.y())
+
+    @staticmethod
+    def from_rpc(vector) -> 'Vec2':
+        return Vec2(vector.x, vector.y)
+
+    @staticmethod
+    def polar2vector(radius: float, direction) -> 'Vec2':
+        if isinstance(direction, Angle):
+            return Vec2(radius * direction.cos(), radius * direction.sin())
+        direction = normalize_angle(_degree(direction)) * DEG2RAD
+        return Vec2(radius * math.cos(direction), radius * math.sin(direction))
+
+    from_polar = polar2vector
+
+    def to_vector2d(self):
+        from pyrusgeom.vector_2d import Vector2D
+        return Vector2D(self._x, self._y)
+
+    def x(self) -> float:
+        return self._x
+
+    def y(self) -> float:
+        return self._y
+
+    def copy(self) -> 'Vec2':
+        return Vec2(self._x, self._y)
+
+    def assign(self, x: float, y: float) -> 'Vec2':
+        self._x = x
+        self._y = y
+        return self
+
+    def abs_x(self) -> float:
+        return math.fabs(self._x)
+
+    def abs_y(self) -> float:
+        return math.fabs(self._y)
+
+    def r2(self) -> float:
+        return self._x * self._x + self._y * self._y
+
+    def r(self) -> float:
+        return math.sqrt(self._x * self._x + self._y * self._y)
+
+    length = r
+
+    def th(self) -> Angle:
+        return Angle(atan2_deg(self._y, self._x))
+
+    dir = th
+
+    def dist2(self, other) -> float:
+        # pow like Vector2D.dist2, which can differ from dx * dx in the last bit
+        return (self._x - other.x()) ** 2 + (self._y - other.y()) ** 2
+
+    def dist(self, other) -> float:
+        return math.sqrt(self.dist2(other))
+
+    def inner_product(self, other) -> float:
+        return self._x * other.x() + self._y * other.y()
+
+    def outer_product(self, other) -> float:
+        return self._x * other.y() - self._y * other.x()
+
+    def scale(self, scalar: float) -> 'Vec2':
+        self._x *= scalar
+        self._y *= scalar
+        return self
+
+    def set_length(self, length: float) -> 'Vec2':
+        mag = self.r()
+        if mag > EPSILON:
+            self.scale(length / mag)
+        return self
+
+    def set_length_vector(self, length: float) -> 'Vec2':
+        return self.copy().set_length(length)
+
+    def normalize(self) -> 'Vec2':
+        return self.set_length(1.0)
+
+    def normalize_vector(self) -> 'Vec2':
+        return self.copy().set_length(1.0)
+
+    def rotate(self, deg) -> 'Vec2':
+        """
+        Rotate in place by deg, a float, an Angle or an AngleDeg.
+        """
+        if isinstance(deg, Angle):
+            cos, sin = deg.cos(), deg.sin()
+        else:
+            rad = _degree(deg) * DEG2RAD
+            cos, sin = math.cos(rad), math.sin(rad)
+        return self.assign(self._x * cos - self._y * sin, self._x * sin + self._y * cos)
+
+    def rotated_vector(self, deg) -> 'Vec2':
+        return self.copy().rotate(deg)
+
+    def __add__(self, other) -> 'Vec2':
+        return Vec2(self._x + other.x(), self._y + other.y())
+
+    def __sub__(self, other) -> 'Vec2':
+        return Vec2(self._x - other.x(), self._y - other.y())
+
+    def __mul__(self, scalar: float) -> 'Vec2':
+        return Vec2(self._x * scalar, self._y * scalar)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, scalar: float) -> 'Vec2':
+        return Vec2(self._x / scalar, self._y / scalar)
+
+    def __neg__(self) -> 'Vec2':
+        return Vec2(-self._x, -self._y)
+
+    def __iadd__(self, other) -> 'Vec2':
+        self._x += other.x()
+        self._y += other.y()
+        return self
+
+    def __isub__(self, other) -> 'Vec2':
+        self._x -= other.x()
+        self._y -= other.y()
+        return self
+
+    def __imul__(self, scalar: float) -> 'Vec2':
+        self._x *= scalar
+        self._y *= scalar
+        return self
+
+    def __itruediv__(self, scalar: float) -> 'Vec2':
+        self._x /= scalar
+        self._y /= scalar
+        return self
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Vec2) and self._x == other._x and self._y == other._y
+
+    # Mutable and compared by value, so it must not be hashed
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"({self._x},{self._y})"
@@ -0,0 +1,165 @@
+import numpy as np
+from src.utils.geom import EPSILON, DEG2RAD, RAD2DEG
+
+
+# Batch variants of the geometry of src.utils.geom. Points and vectors are float64 arrays of shape (..., 2), angles
+# are in degrees, and all arguments are broadcast against each other, so one call answers many queries.
+
+
+def _xy(points) -> tuple[np.ndarray, np.ndarray]:
+    points = np.asarray(points, dtype=np.float64)
+    return points[..., 0], points[..., 1]
+
+
+def dist2(a, b) -> np.ndarray:
+    """
+    Squared distances between the points a and b.
+    """
+    ax, ay = _xy(a)
+    bx, by = _xy(b)
+    dx, dy = ax - bx, ay - by
+    return dx * dx + dy * dy
+
+
+def dist(a, b) -> np.ndarray:
+    """
+    Distances between the points a and b.
+    """
+    return np.sqrt(dist2(a, b))
+
+
+def directions(dx: np.ndarray, dy: np.ndarray) -> np.ndarray:
+    """
+    Directions in degrees of the vectors (dx, dy), 0 for (almost) zero vectors like Vector2D.th().
+    """
+    th = np.arctan2(dy, dx) * RAD2DEG
+    if np.min(dx * dx + dy * dy, initial=np.inf) < 2.0 * EPSILON * EPSILON:
+        th = np.where((np.abs(dx) < EPSILON) & (np.abs(dy) < EPSILON), 0.0, th)
+    return th
+
+
+def th(vectors) -> np.ndarray:
+    """
+    Directions of the vectors in degrees.
+    """
+    return directions(*_xy(vectors))
+
+
+def polar2vectors(radius, direction) -> np.ndarray:
+    """
+    Vectors of the radii and directions in degrees, shape (..., 2).
+    """
+    rad = np.asarray(direction, dtype=np.float64) * DEG2RAD
+    radius = np.asarray(radius, dtype=np.float64)
+    return np.stack(np.broadcast_arrays(radius * np.cos(rad), radius * np.sin(rad)), axis=-1)
+
+
+def rotated_vectors(vectors, degree) -> np.ndarray:
+    """
+    The vectors rotated by degree.
+    """
+    x, y = _xy(vectors)
+    rad = np.asarray(degree, dtype=np.float64) * DEG2RAD
+    cos, sin = np.cos(rad), np.sin(rad)
+    return np.stack(np.broadcast_arrays(x * cos - y * sin, x * sin + y * cos), axis=-1)
+
+
+def normalize_angles(degree) -> np.ndarray:
+    """
+    Angles in degrees normalized to [-180, 180] like AngleDeg.
+    """
+    degree = np.asarray(degree, dtype=np.float64)
+    degree = np.where((degree < -360.0) | (degree > 360.0), np.fmod(degree, 360.0), degree)
+    degree = np.where(degree < -180.0, degree + 360.0, degree)
+    return np.where(degree > 180.0, degree - 360.0, degree)
+
+
+def _left_equal_of(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    # AngleDeg.is_left_equal_of of normalized angles
+    diff = b - a
+    return ((0.0 <= diff) & (diff < 180.0)) | (diff < -180.0)
+
+
+def angles_within(angle, left, right) -> np.ndarray:
+    """
+    Whether the angles are within [left, right] turning clockwise, the vectorized AngleDeg.is_within with the same
+    results, also for spans of 180 degrees or more. The angles do not need to be normalized.
+    """
+    angle, left, right = normalize_angles(angle), normalize_angles(left), normalize_angles(right)
+    after_left = _left_equal_of(left, angle)
+    before_right = _left_equal_of(angle, right)
+    return np.where(_left_equal_of(left, right), after_left & before_right, after_left | before_right)
+
+
+def _cross(ax, ay, bx, by):
+    return ax * by - ay * bx
+
+
+def _intersections(origin, direction, start, end, max_t) -> tuple[np.ndarray, np.ndarray]:
+    ox, oy = _xy(origin)
+    rx, ry = _xy(direction)
+    sx, sy = _xy(start)
+    ex, ey = _xy(end)
+    qx, qy = ex - sx, ey - sy
+    denom = _cross(rx, ry, qx, qy)
+    parallel = np.abs(denom) < EPSILON
+    denom = np.where(parallel, 1.0, denom)
+    wx, wy = sx - ox, sy - oy
+    t = _cross(wx, wy, qx, qy) / denom
+    u = _cross(wx, wy, rx, ry) / denom
+    hit = ~parallel & (t >= 0.0) & (t <= max_t) & (u >= 0.0) & (u <= 1.0)
+    return np.stack(np.broadcast_arrays(ox + t * rx, oy + t * ry), axis=-1), hit
+
+
+def segment_intersections(a_start, a_end, b_start, b_end) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Intersection points of the segments a and b, shape (..., 2), and whether they intersect, bool of shape (...).
+    The points of parallel or disjoint segments are meaningless. End points are included.
+    """
+    a_start = np.asarray(a_start, dtype=np.float64)
+    return _intersections(a_start, np.asarray(a_end, dtype=np.float64) - a_start, b_start, b_end, 1.0)
+
+
+def ray_intersections(origin, direction, start, end) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Intersection points of the rays from origin in direction (degrees) with the segments from start to end, and
+    whether they intersect, like segment_intersections.
+    """
+    return _intersections(origin, polar2vectors(1.0, direction), start, end, np.inf)
+
+
+def sector_contains(points, center, min_r, max_r, left, right) -> np.ndarray:
+    """
+    Whether the points are in the sectors around center between the radii and from the left to the right angle
+    turning clockwise, inclusive like Sector2D.contains.
+    """
+    px, py = _xy(points)
+    cx, cy = _xy(center)
+    dx, dy = px - cx, py - cy
+    d2 = dx * dx + dy * dy
+    min_r, max_r = np.asarray(min_r), np.asarray(max_r)
+    return (min_r * min_r <= d2) & (d2 <= max_r * max_r) & angles_within(directions(dx, dy), left, right)
+
+
+def rect_contains(points, left, top, right, bottom) -> np.ndarray:
+    """
+    Whether the points are in the rectangles, inclusive like Rect2D.contains.
+    """
+    x, y = _xy(points)
+    return (left <= x) & (x <= right) & (top <= y) & (y <= bottom)
+
+
+def triangle_contains(points, a, b, c) -> np.ndarray:
+    """
+    Whether the points are in the triangles abc, inclusive like Triangle2D.contains.
+    """
+    px, py = _xy(points)
+    ax, ay = _xy(a)
+    bx, by = _xy(b)
+    cx, cy = _xy(c)
+    ax, ay, bx, by, cx, cy = ax - px, ay - py, bx - px, by - py, cx - px, cy - py
+    outer1 = _cross(ax, ay, bx, by)
+    outer2 = _cross(bx, by, cx, cy)
+    outer3 = _cross(cx, cy, ax, ay)
+    return (((outer1 >= 0.0) & (outer2 >= 0.0) & (outer3 >= 0.0))
+            | ((outer1 <= 0.0) & (outer2 <= 0.0) & (outer3 <= 0.0)))
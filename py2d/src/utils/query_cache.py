@@ -0,0 +1,46 @@
+from typing import Any, Callable, Hashable
+
+
+class QueryCache:
+    """
+    Results of the world model queries of one agent in one cycle, see IAgent.cached_query.
+
+    A result is computed on the first query of the cycle and every later query of the same cycle gets the same
+    object, so cached results are shared and must not be modified by the callers. The results are dropped when
+    the cycle of the world model changes, the hit and miss counters run over the whole game.
+
+    Attributes:
+        hits (int): Queries answered from the cache.
+        misses (int): Queries that computed their result.
+    """
+    def __init__(self) -> None:
+        self.hits: int = 0
+        self.misses: int = 0
+        self._key: tuple = None
+        self._results: dict[Hashable, Any] = {}
+
+    def reset(self, key: tuple) -> None:
+        """
+        Drop the results if key, the identity and cycle of the world model, is not the one of the cached results.
+        """
+        if self._key != key:
+            self._results.clear()
+            self._key = key
+
+    def get(self, query: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Result of query in the current cycle, compute() is only called on the first query of the cycle.
+        """
+        try:
+            result = self._results[query]
+        except KeyError:
+            self.misses += 1
+            result = self._results[query] = compute()
+            return result
+        self.hits += 1
+        return result
+
+    def report(self) -> str:
+        total = self.hits + self.misses
+        hit_rate = self.hits / total if total else 0.0
+        return f"{self.hits} hits, {self.misses} misses ({hit_rate:.0%} hit rate)"
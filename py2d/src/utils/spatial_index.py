@@ -0,0 +1,184 @@
+import numpy as np
+from service_pb2 import Player
+from src.utils.world_arrays import WorldArrays
+from src.utils.geom_arrays import directions, angles_within
+
+
+TEAMMATES = 'teammates'
+OPPONENTS = 'opponents'
+BOTH = 'both'
+
+
+def _column(values) -> np.ndarray:
+    """
+    One value or one value per query as a float64 column of shape (m, 1) that broadcasts against the players.
+    """
+    return np.asarray(values, dtype=np.float64).reshape(-1, 1)
+
+
+class SpatialIndex:
+    """
+    Positions of the teammates and the opponents of one cycle for nearest-player and region queries, built once per
+    cycle by IAgent.spatial_index.
+
+    There are at most 22 players on the pitch, so a query is one vectorized pass over all positions, which is
+    faster than walking a grid or a tree. The batched queries answer many points in a single pass, and the
+    occupancy queries test many circles, sectors or rectangles against all players at once, so a behavior can
+    check all its candidates with one call.
+
+    The players are the messages of the world model. A query selects teammates, opponents or both of them and can
+    exclude the agent itself from the teammates. Players are returned nearest first where a query has a center,
+    the first of equally near players in world model order.
+
+    Attributes:
+        players (list[Player]): The teammates followed by the opponents, in the order of the world model.
+        pos (np.ndarray): Positions of the players, float64 of shape (n, 2).
+        x (np.ndarray): X coordinates of the players, float64 of shape (n,).
+        y (np.ndarray): Y coordinates of the players, float64 of shape (n,).
+    """
+    def __init__(self, arrays: WorldArrays, self_unum: int) -> None:
+        teammates, opponents = arrays.teammates, arrays.opponents
+        self.players: list[Player] = teammates.players + opponents.players
+        self.pos = np.concatenate((teammates.pos, opponents.pos)).reshape(-1, 2)
+        # Contiguous columns, cheaper than the strided views of pos in the single point queries
+        self.x = self.pos[:, 0].copy()
+        self.y = self.pos[:, 1].copy()
+        n_teammates = len(teammates)
+        is_teammate = np.arange(len(self.players)) < n_teammates
+        not_self = np.concatenate((teammates.unum != self_unum, np.ones(len(opponents), dtype=bool)))
+        self._masks = {
+            (TEAMMATES, False): is_teammate,
+            (TEAMMATES, True): is_teammate & not_self,
+            (OPPONENTS, False): ~is_teammate,
+            (OPPONENTS, True): ~is_teammate,
+            (BOTH, False): np.ones(len(self.players), dtype=bool),
+            (BOTH, True): not_self,
+        }
+
+    def __len__(self) -> int:
+        return len(self.players)
+
+    def mask(self, side: str = OPPONENTS, exclude_self: bool = False) -> np.ndarray:
+        """
+        Rows of the players of side, bool of shape (n,).
+        """
+        return self._masks[(side, exclude_self)]
+
+    def _select(self, rows: np.ndarray) -> list[Player]:
+        players = self.players
+        return [players[i] for i in rows]
+
+    def dist2_many(self, points) -> np.ndarray:
+        """
+        Squared distances of the points to all players, float64 of shape (m, n).
+        """
+        d = self.pos[np.newaxis, :, :] - np.asarray(points, dtype=np.float64).reshape(-1, 1, 2)
+        return np.einsum('mnk,mnk->mn', d, d)
+
+    def nearest_many(self, points, k: int = 1, side: str = OPPONENTS, exclude_self: bool = False,
+                     max_dist: float = np.inf) -> np.ndarray:
+        """
+        Rows of the k nearest players of side to each point, nearest first, int64 of shape (m, k).
+        A row is -1 where fewer than k players are nearer than max_dist.
+        """
+        dists = self.dist2_many(points)
+        dists[:, ~self.mask(side, exclude_self)] = np.inf
+        k = min(k, dists.shape[1])
+        rows = np.argsort(dists, axis=1, kind='stable')[:, :k]
+        rows[np.take_along_axis(dists, rows, axis=1) >= max_dist * max_dist] = -1
+        return rows
+
+    def circles_occupancy(self, centers, radius, side: str = OPPONENTS, exclude_self: bool = False) -> np.ndarray:
+        """
+        Whether each player of side is in each circle, bool of shape (m, n). The players of the other side are
+        never in. centers are m points of shape (m, 2) or one point shared by all circles, radius is one radius or
+        one per circle.
+        """
+        centers = np.asarray(centers, dtype=np.float64).reshape(-1, 2)
+        dx, dy = self.x - centers[:, 0:1], self.y - centers[:, 1:2]
+        radius = _column(radius)
+        return (dx * dx + dy * dy <= radius * radius) & self.mask(side, exclude_self)
+
+    def sectors_occupancy(self, centers, min_r, max_r, left, right, side: str = OPPONENTS,
+                          exclude_self: bool = False) -> np.ndarray:
+        """
+        Whether each player of side is in each sector, bool of shape (m, n), see sector_mask. centers are m points of
+        shape (m, 2) or one point shared by all sectors, the radii and the angles in degrees are one value or one
+        per sector.
+        """
+        centers = np.asarray(centers, dtype=np.float64).reshape(-1, 2)
+        dx, dy = self.x - centers[:, 0:1], self.y - centers[:, 1:2]
+        dists = dx * dx + dy * dy
+        min_r, max_r = _column(min_r), _column(max_r)
+        inside = (min_r * min_r <= dists) & (dists <= max_r * max_r) & self.mask(side, exclude_self)
+        return inside & angles_within(directions(dx, dy), _column(left), _column(right))
+
+    def rects_occupancy(self, left, top, right, bottom, side: str = OPPONENTS, exclude_self: bool = False) -> np.ndarray:
+        """
+        Whether each player of side is in each rectangle, bool of shape (m, n), see rect_mask. The bounds are one
+        value or one per rectangle.
+        """
+        x, y = self.x, self.y
+        return ((_column(left) <= x) & (x <= _column(right)) & (_column(top) <= y) & (y <= _column(bottom))
+                & self.mask(side, exclude_self))
+
+    def nearest(self, x: float, y: float, k: int = 1, side: str = OPPONENTS, exclude_self: bool = False,
+                max_dist: float = np.inf) -> list[Player]:
+        """
+        The at most k nearest players of side to (x, y) that are nearer than max_dist, nearest first.
+        """
+        dx, dy = self.x - x, self.y - y
+        dists = np.where(self.mask(side, exclude_self), dx * dx + dy * dy, np.inf)
+        if k == 1 and len(dists):
+            i = int(dists.argmin())
+            return [self.players[i]] if dists[i] < max_dist * max_dist else []
+        rows = np.argsort(dists, kind='stable')[:k]
+        return self._select(rows[dists[rows] < max_dist * max_dist])
+
+    def within_radius(self, x: float, y: float, radius: float, side: str = OPPONENTS,
+                      exclude_self: bool = False) -> list[Player]:
+        """
+        The players of side within radius of (x, y), nearest first.
+        """
+        dx, dy = self.x - x, self.y - y
+        dists = dx * dx + dy * dy
+        rows = np.flatnonzero((dists <= radius * radius) & self.mask(side, exclude_self))
+        return self._select(rows[np.argsort(dists[rows], kind='stable')])
+
+    def sector_mask(self, x: float, y: float, min_r: float, max_r: float, left: float, right: float,
+                    side: str = OPPONENTS, exclude_self: bool = False) -> np.ndarray:
+        """
+        Whether each player of side is in the sector around (x, y) between the radii and from the left to the right
+        angle in degrees turning clockwise, bool of shape (n,). The bounds are inclusive like Sector2D.contains.
+        """
+        dx, dy = self.x - x, self.y - y
+        dists = dx * dx + dy * dy
+        inside = (min_r * min_r <= dists) & (dists <= max_r * max_r) & self.mask(side, exclude_self)
+        if inside.any():
+            inside &= angles_within(directions(dx, dy), left, right)
+        return inside
+
+    def in_sector(self, x: float, y: float, min_r: float, max_r: float, left: float, right: float,
+                  side: str = OPPONENTS, exclude_self: bool = False) -> list[Player]:
+        """
+        The players of side in the sector, see sector_mask, nearest first.
+        """
+        rows = np.flatnonzero(self.sector_mask(x, y, min_r, max_r, left, right, side, exclude_self))
+        dists = np.hypot(self.x[rows] - x, self.y[rows] - y)
+        return self._select(rows[np.argsort(dists, kind='stable')])
+
+    def rect_mask(self, left: float, top: float, right: float, bottom: float, side: str = OPPONENTS,
+                  exclude_self: bool = False) -> np.ndarray:
+        """
+        Whether each player of side is in the rectangle, bool of shape (n,). The bounds are inclusive like
+        Rect2D.contains.
+        """
+        x, y = self.x, self.y
+        return (left <= x) & (x <= right) & (top <= y) & (y <= bottom) & self.mask(side, exclude_self)
+
+    def in_rect(self, left: float, top: float, right: float, bottom: float, side: str = OPPONENTS,
+                exclude_self: bool = False) -> list[Player]:
+        """
+        The players of side in the rectangle, see rect_mask, in world model order.
+        """
+        return self._select(np.flatnonzero(self.rect_mask(left, top, right, bottom, side, exclude_self)))
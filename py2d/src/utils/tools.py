@@ -5,6 +5,7 @@ from pyrusgeom.vector_2d import Vector2D
 from pyrusgeom.angle_deg import AngleDeg
 from src.interfaces.IAgent import IAgent
 import math
+from operator import attrgetter
 from service_pb2 import PlayerType, Player, GameModeType, ServerParam, RpcVector2D
 from copy import deepcopy as copy
 
@@ -217,17 +218,9 @@ class Tools:
     
     @staticmethod
     def get_nearest_teammate(agent: IAgent, position: Vector2D):
-        players = agent.wm.teammates
-        best_player = None
-        min_dist2 = 1000
-        for player in players:
-            player_position = Tools.convert_rpc_vector2d_to_vector2d(player.position)
-            d2 = player_position.dist2( position )
-            if d2 < min_dist2:
-                min_dist2 = d2
-                best_player = player
-
-        return best_player
+        from src.utils.spatial_index import TEAMMATES
+        nearest = agent.spatial_index.nearest(position.x(), position.y(), side=TEAMMATES, max_dist=math.sqrt(1000))
+        return nearest[0] if nearest else None
     
     @staticmethod
     def predict_opponent_reach_step(agent: IAgent, opponent: Player, first_ball_pos: Vector2D, first_ball_vel: Vector2D,
@@ -321,61 +314,89 @@ class Tools:
         Returns:
             bool: True if any opponent is within the region, False otherwise
         """
+        from src.utils.spatial_index import OPPONENTS
+        if isinstance(region, Sector2D):
+            # Sector2D.radius_max() of pyrusgeom returns the min radius, so the members are read directly
+            return bool(agent.spatial_index.sector_mask(region._center.x(), region._center.y(), region._min_r,
+                                                        region._max_r, region._start.degree(), region._end.degree(),
+                                                        side=OPPONENTS).any())
+        if isinstance(region, Rect2D):
+            return bool(agent.spatial_index.rect_mask(region.left(), region.top(), region.right(), region.bottom(),
+                                                      side=OPPONENTS).any())
         return any(region.contains(Vector2D(opp.position.x, opp.position.y)) for opp in agent.wm.opponents)
     
+    @staticmethod
+    def exist_opponents_in_sectors(agent: IAgent, center: Vector2D, min_r, max_r, left, right):
+        """Check for each of many sectors if any opponent is within it, in one vectorized pass
+        
+        Args:
+            agent: Agent instance
+            center: Center shared by all sectors
+            min_r: Min radius, one value or one per sector
+            max_r: Max radius, one value or one per sector
+            left: Left start angle in degrees turning clockwise, one value or one per sector
+            right: Right end angle in degrees, one value or one per sector
+        Returns:
+            np.ndarray: True for the sectors with an opponent in them, bool of shape (m,)
+        """
+        from src.utils.spatial_index import OPPONENTS
+        occupancy = agent.spatial_index.sectors_occupancy((center.x(), center.y()), min_r, max_r, left, right,
+                                                          side=OPPONENTS)
+        return occupancy.any(axis=1)
+    
     def swap(x, y):
         return (copy(y), copy(x))
     
     @staticmethod
-    def get_opponents_from_self(agent: IAgent) -> list[Player]:
-        """Get list of opponents sorted by distance from self
+    def get_opponents_from_self(agent: IAgent) -> tuple[Player, ...]:
+        """Get opponents sorted by distance from self
+        
+        The result is cached for the cycle and shared by all callers, it must not be modified.
         
         Args:
             agent: Agent instance
         Returns:
-            list[Player]: Sorted list of opponent players
+            tuple[Player, ...]: Sorted opponent players
         """
-        # Copy the list of opponents, excluding invalid entries
-        opponents = [copy(opp) for opp in agent.wm.opponents if opp and opp.uniform_number >= 0]
-        
-        # Sort the copied list by distance from self
-        opponents.sort(key=lambda opp: opp.dist_from_self)
-        
-        return opponents
+        return agent.cached_query('opponents_from_self', lambda: Tools._sorted_players(
+            agent.wm.opponents, -1, 'dist_from_self'))
     
     @staticmethod
-    def get_teammates_from_self(agent: IAgent) -> list[Player]:
-        """Get list of teammates sorted by distance from self
+    def get_teammates_from_self(agent: IAgent) -> tuple[Player, ...]:
+        """Get teammates sorted by distance from self
+        
+        The result is cached for the cycle and shared by all callers, it must not be modified.
         
         Args:
             agent: Agent instance
         Returns:
-            list[Player]: Sorted list of teammate players
+            tuple[Player, ...]: Sorted teammate players
         """
-        # Copy the list of teammates, excluding invalid entries
-        teammates = [copy(tm) for tm in agent.wm.teammates if tm and tm.uniform_number != agent.wm.self.uniform_number and tm.uniform_number >= 0]
-        
-        # Sort the copied list by distance from self
-        teammates.sort(key=lambda tm: tm.dist_from_self)
-        
-        return teammates
+        return agent.cached_query('teammates_from_self', lambda: Tools._sorted_players(
+            agent.wm.teammates, agent.wm.self.uniform_number, 'dist_from_self'))
     
     @staticmethod
-    def get_opponents_from_ball(agent: IAgent) -> list[Player]:
-        """Get list of opponents sorted by distance from ball
+    def get_opponents_from_ball(agent: IAgent) -> tuple[Player, ...]:
+        """Get opponents sorted by distance from ball
+        
+        The result is cached for the cycle and shared by all callers, it must not be modified.
         
         Args:
             agent: Agent instance
         Returns:
-            list[Player]: Sorted list of opponent players
+            tuple[Player, ...]: Sorted opponent players
         """
-        # Copy the list of opponents, excluding invalid entries
-        opponents = [copy(opp) for opp in agent.wm.opponents if opp and opp.uniform_number != agent.wm.self.uniform_number and opp.uniform_number >= 0]
-        
-        # Sort the copied list by distance from the ball
-        opponents.sort(key=lambda opp: opp.dist_from_ball)
+        return agent.cached_query('opponents_from_ball', lambda: Tools._sorted_players(
+            agent.wm.opponents, agent.wm.self.uniform_number, 'dist_from_ball'))
+    
+    @staticmethod
+    def _sorted_players(players, excluded_unum: int, distance: str) -> tuple[Player, ...]:
+        """Players with a known uniform number other than excluded_unum, sorted by the distance attribute
         
-        return opponents
+        The players are the messages of the world model, not copies.
+        """
+        return tuple(sorted((p for p in players if p and p.uniform_number >= 0 and p.uniform_number != excluded_unum),
+                            key=attrgetter(distance)))
     
     @staticmethod
     def get_dash_power_to_keep_speed(agent: IAgent, speed: float, effort: float) -> float:
@@ -425,10 +446,10 @@ class Tools:
         Returns:
             Player: Teammate player nearest to the given point
         """
-        point_vec = Vector2D(point.x, point.y) if isinstance(point, RpcVector2D) else point
-        teammates = [tm for tm in agent.wm.teammates if tm and tm.uniform_number != agent.wm.self.uniform_number]
-        nearest_tm = min(teammates, key=lambda i: Vector2D(i.position.x, i.position.y).dist(point_vec), default=None)
-        return nearest_tm
+        from src.utils.spatial_index import TEAMMATES
+        x, y = (point.x, point.y) if isinstance(point, RpcVector2D) else (point.x(), point.y())
+        nearest = agent.spatial_index.nearest(x, y, side=TEAMMATES, exclude_self=True)
+        return nearest[0] if nearest else None
     
     @staticmethod
     def get_opponent_nearest_to(agent: IAgent, point: Vector2D) -> Player:
@@ -440,10 +461,10 @@ class Tools:
         Returns:
             Player: Opponent player nearest to the given point
         """
-        point_vec = Vector2D(point.x, point.y)
-        opponents = [opponent for opponent in agent.wm.opponents if opponent]
-        nearest_opp = min(opponents, key=lambda i: Vector2D(i.position.x, i.position.y).dist(point_vec), default=None)
-        return nearest_opp
+        from src.utils.spatial_index import OPPONENTS
+        x, y = (point.x, point.y) if isinstance(point, RpcVector2D) else (point.x(), point.y())
+        nearest = agent.spatial_index.nearest(x, y, side=OPPONENTS)
+        return nearest[0] if nearest else None
     
     @staticmethod
     def get_inertia_final_point(initial_pos: Vector2D, initial_vel: Vector2D, decay: float) -> Vector2D:
@@ -493,17 +514,18 @@ class Tools:
         return last_term * pow(inverse_ratio, math.log(tmp) / math.log(inverse_ratio))
     
     @staticmethod
-    def get_teammates_from_ball(agent: IAgent) -> list[Player]:
-        """Get list of teammates sorted by distance from ball
+    def get_teammates_from_ball(agent: IAgent) -> tuple[Player, ...]:
+        """Get teammates sorted by distance from ball
+        
+        The result is cached for the cycle and shared by all callers, it must not be modified.
         
         Args:
             agent: Agent instance
         Returns:
-            list[Player]: Sorted list of teammate players
+            tuple[Player, ...]: Sorted teammate players
         """
-        tms = [copy(tm) for tm in agent.wm.teammates if tm and tm.uniform_number != agent.wm.self.uniform_number and tm.uniform_number >= 0]
-        tms.sort(key=lambda tm: tm.dist_from_ball)
-        return tms
+        return agent.cached_query('teammates_from_ball', lambda: Tools._sorted_players(
+            agent.wm.teammates, agent.wm.self.uniform_number, 'dist_from_ball'))
     
     @staticmethod
     def calculate_ball_inertia_final_point(initial_pos: Vector2D, initial_vel: Vector2D, ball_decay: float) -> Vector2D:
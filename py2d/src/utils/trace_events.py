@@ -0,0 +1,29 @@
+from enum import IntEnum
+
+
+class TraceEvent(IntEnum):
+    """
+    Ids of the structured trace events of the behaviors, see IAgent.trace.
+    The ids are written to the trace files, so never change or reuse the id of an event.
+    """
+    INTERCEPT = 1
+    GO_TO_POINT = 2
+    BLOCK = 3
+    PASS = 4
+    DRIBBLE = 5
+    SHOOT = 6
+    CLEAR = 7
+    KICKOFF_KICK = 8
+
+
+# Meaning of the float values of every event, unused values are 0
+TRACE_EVENT_FIELDS: dict[TraceEvent, tuple[str, ...]] = {
+    TraceEvent.INTERCEPT: ('self_reach_steps', 'teammate_reach_steps', 'opponent_reach_steps'),
+    TraceEvent.GO_TO_POINT: ('target_x', 'target_y', 'dash_power', 'dist_thr'),
+    TraceEvent.BLOCK: ('ball_x', 'ball_y', 'block_cycle'),
+    TraceEvent.PASS: ('target_x', 'target_y', 'first_speed'),
+    TraceEvent.DRIBBLE: ('target_x', 'target_y'),
+    TraceEvent.SHOOT: ('target_x', 'target_y'),
+    TraceEvent.CLEAR: ('target_x', 'target_y'),
+    TraceEvent.KICKOFF_KICK: ('target_x', 'target_y', 'ball_speed'),
+}
@@ -0,0 +1,81 @@
+import numpy as np
+from service_pb2 import WorldModel, Player
+
+
+class TeamArrays:
+    """
+    Columns of the players of one team, row i belongs to players[i].
+
+    Attributes:
+        players (list[Player]): The players of the rows, in the order of the world model.
+        pos (np.ndarray): Positions, float64 of shape (n, 2).
+        vel (np.ndarray): Velocities, float64 of shape (n, 2).
+        body (np.ndarray): Body directions in degrees, float64 of shape (n,).
+        pos_count (np.ndarray): Cycles since each position was seen or heard, int32 of shape (n,).
+        dist_from_self (np.ndarray): Distances from the agent, float64 of shape (n,).
+        dist_from_ball (np.ndarray): Distances from the ball, float64 of shape (n,).
+        is_goalie (np.ndarray): Goalie flags, bool of shape (n,).
+        unum (np.ndarray): Uniform numbers, -1 if unknown, int32 of shape (n,).
+    """
+    def __init__(self, players) -> None:
+        self.players: list[Player] = list(players)
+        # One pass over the protobuf players, then one copy per column
+        table = np.array([(player.position.x, player.position.y, player.velocity.x, player.velocity.y,
+                           player.body_direction, player.pos_count, player.dist_from_self, player.dist_from_ball,
+                           player.is_goalie, player.uniform_number) for player in self.players],
+                         dtype=np.float64).reshape(-1, 10)
+        self.pos = np.ascontiguousarray(table[:, 0:2])
+        self.vel = np.ascontiguousarray(table[:, 2:4])
+        self.body = table[:, 4].copy()
+        self.pos_count = table[:, 5].astype(np.int32)
+        self.dist_from_self = table[:, 6].copy()
+        self.dist_from_ball = table[:, 7].copy()
+        self.is_goalie = table[:, 8].astype(bool)
+        self.unum = table[:, 9].astype(np.int32)
+
+    def __len__(self) -> int:
+        return len(self.players)
+
+    def dist_to(self, x: float, y: float) -> np.ndarray:
+        """
+        Distances of all players to the point (x, y).
+        """
+        return np.hypot(self.pos[:, 0] - x, self.pos[:, 1] - y)
+
+    def nearest_to(self, x: float, y: float, mask: np.ndarray = None) -> int:
+        """
+        Row of the player nearest to the point (x, y) among the rows of mask, -1 if there is none.
+        Like min() the first of equally near players is returned.
+        """
+        d = self.pos - (x, y)
+        dists = np.einsum('ij,ij->i', d, d)
+        if mask is not None:
+            dists[~mask] = np.inf
+            if not mask.any():
+                return -1
+        elif len(dists) == 0:
+            return -1
+        return int(dists.argmin())
+
+
+class WorldArrays:
+    """
+    Contiguous numpy columns of one WorldModel, built once per cycle by IAgent.world_arrays, so hot paths can use
+    vectorized math instead of walking the protobuf players and wrapping every position in a Vector2D.
+
+    Attributes:
+        teammates (TeamArrays): Columns of wm.teammates.
+        opponents (TeamArrays): Columns of wm.opponents.
+        self_pos (np.ndarray): Position of the agent, float64 of shape (2,).
+        ball_pos (np.ndarray): Position of the ball, float64 of shape (2,).
+        ball_vel (np.ndarray): Velocity of the ball, float64 of shape (2,).
+        ball_pos_count (int): Cycles since the ball position was seen or heard.
+    """
+    def __init__(self, wm: WorldModel) -> None:
+        self.cycle = (wm.cycle, wm.stoped_cycle)
+        self.teammates = TeamArrays(wm.teammates)
+        self.opponents = TeamArrays(wm.opponents)
+        self.self_pos = np.array((wm.self.position.x, wm.self.position.y), dtype=np.float64)
+        self.ball_pos = np.array((wm.ball.position.x, wm.ball.position.y), dtype=np.float64)
+        self.ball_vel = np.array((wm.ball.velocity.x, wm.ball.velocity.y), dtype=np.float64)
+        self.ball_pos_count = wm.ball.pos_count
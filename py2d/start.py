@@ -1,47 +1,100 @@
 import subprocess
 import os
 import signal
-import threading
 import logging
 import argparse
 from utils.logger_utils import setup_logger
+from utils.output_multiplexer import OutputMultiplexer
+from utils.transport import is_unix_endpoint, remove_unix_socket
 import datetime
 import multiprocessing
-from server import main
+from server import main, preload
 import random
 import select
+import socket
+import tempfile
 import time
+import itertools
 
 
 # Set up logging
 log_dir = None
 start_team_logger = None
+unix_socket_numbers = itertools.count()
 
 def run_server_script(args):
     rpc_port = args.rpc_port
     if args.use_random_rpc_port or args.use_different_rpc_port:
-        import socket
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
             s.bind(('localhost', 0))
             rpc_port = str(s.getsockname()[1])
         start_team_logger.debug(f"Using random port: {rpc_port}")
+    if args.use_unix_socket:
+        rpc_port = f'unix:{tempfile.gettempdir()}/py2d_{os.getpid()}_{next(unix_socket_numbers)}.sock'
+        start_team_logger.debug(f"Using unix domain socket: {rpc_port}")
+    # server.py writes its readiness lines to this pipe, see ServerReadiness
+    ready_read_fd, ready_write_fd = os.pipe()
     # Define a wrapper function to pass the arguments to the main function
     def server_main():
         import sys
         # Reset signal handlers to default in the child process
         signal.signal(signal.SIGINT, signal.SIG_DFL)
         signal.signal(signal.SIGTERM, signal.SIG_DFL)
-        sys.argv = ['server.py', '--rpc-port', str(rpc_port), '--log-dir', log_dir]
+        os.close(ready_read_fd)
+        sys.argv = ['server.py', '--rpc-port', str(rpc_port), '--log-dir', log_dir, '--ready-fd', str(ready_write_fd)]
         if args.disable_log_file:
             sys.argv += ['--disable-log-file']
         if args.debug:
             sys.argv += ['--debug']
+        if args.cycle_deadline_ratio:
+            sys.argv += ['--cycle-deadline-ratio', str(args.cycle_deadline_ratio)]
+        if args.metrics_interval:
+            sys.argv += ['--metrics-interval', str(args.metrics_interval)]
+        if args.record:
+            sys.argv += ['--record', '--record-compression', args.record_compression,
+                         '--record-max-file-size', str(args.record_max_file_size),
+                         '--record-max-files', str(args.record_max_files)]
+        if args.flight_recorder:
+            sys.argv += ['--flight-recorder', str(args.flight_recorder)]
+        if args.trace:
+            sys.argv += ['--trace']
         main()
 
-    # Start the main function as a new process
-    process = multiprocessing.Process(target=server_main)
+    # Start the main function as a new process. It is forked from this process, which already imported the
+    # server modules and preloaded the formations, so it starts without importing or loading them again.
+    process = multiprocessing.get_context('fork').Process(target=server_main)
     process.start()
-    return process, rpc_port
+    os.close(ready_write_fd)
+    return process, rpc_port, ServerReadiness(ready_read_fd)
+
+
+class ServerReadiness:
+    """
+    Readiness lines of one server.py process, read from the pipe of its --ready-fd argument.
+    """
+    def __init__(self, fd: int) -> None:
+        self.fd = fd
+        self.seen: set[str] = set()
+        self.buffer = b''
+
+    def wait(self, message: str, timeout: float) -> bool:
+        """
+        Wait until server.py wrote the line `message` ('listening' or 'registered').
+
+        :return: False if the timeout expired.
+        """
+        deadline = time.monotonic() + timeout
+        while message not in self.seen:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([self.fd], [], [], remaining)[0]:
+                return False
+            data = os.read(self.fd, 4096)
+            if not data:
+                raise Exception("server.py exited before it was ready.")
+            self.buffer += data
+            *lines, self.buffer = self.buffer.split(b'\n')
+            self.seen.update(line.decode() for line in lines)
+        return True
 
 def run_start_script(args, rpc_port):
     # Start the start.sh script in its own directory as a new process group
@@ -54,9 +107,13 @@ def run_start_script(args, rpc_port):
     else:
         arguments += ['start.sh' if not args.debug else 'start-debug.sh']
         
-    arguments += ['-t', args.team_name, 
-         '--rpc-port', rpc_port, '--rpc-type', 'grpc', 
+    arguments += ['-t', args.team_name, '--rpc-type', 'grpc', 
          '-p', args.server_port, '-h', args.server_host]
+    if is_unix_endpoint(rpc_port):
+        # The proxy uses a unix: rpc host as the whole target
+        arguments += ['--rpc-host', rpc_port, '--rpc-port', '0']
+    else:
+        arguments += ['--rpc-port', rpc_port]
         
     process = subprocess.Popen(
         arguments,
@@ -67,26 +124,6 @@ def run_start_script(args, rpc_port):
     )
     return process
 
-stop_thread = threading.Event()
-
-def stream_output_to_file(process, name, args):
-    # Stream output from the process and log it to a file with the given name
-    f = None if args.disable_log_file else open(f"{log_dir}/{name}.log", "a")
-    while not stop_thread.is_set():
-        if select.select([process.stdout], [], [], 1)[0]:
-            output = process.stdout.readline()
-            if output:
-                if f:
-                    f.write(output.decode())
-                    f.flush()
-                else:
-                    print(output.decode())
-            else:
-                break
-    process.stdout.close()
-    if f:
-        f.close()
-    
 def kill_process_group(processes):
     for process in processes:
         try:
@@ -103,15 +140,30 @@ def kill_rpc_server_process(processes):
         except ProcessLookupError:
             pass  # The process might have already exited
 
-def check_rcssserver_process(args):
-    import psutil 
-    for conn in psutil.net_connections(kind='inet'):
-        server_host_ip = args.server_host if args.server_host != 'localhost' else '0.0.0.0'
-        # start_team_logger.debug(f"Checking connection: {conn.laddr.ip=}, {conn.laddr.port=}, {args.server_host=}, {server_host_ip=}")
-        if conn.laddr.port == int(args.server_port) and conn.laddr.ip == server_host_ip:
-            # start_team_logger.debug(f"Found rcssserver process with PID: {conn.pid}")
-            return True
-    return False
+def probe_rcssserver(args, timeout=0.1):
+    """
+    Send one UDP datagram to the rcssserver player port. If nothing listens on the port, the kernel answers with
+    ICMP port unreachable and recv raises ConnectionRefusedError. A reply or no answer at all means rcssserver
+    is running (rcssserver does not have to reply to an unknown command).
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        s.settimeout(timeout)
+        try:
+            s.connect((args.server_host, int(args.server_port)))
+            s.send(b'(ping)\0')
+            s.recv(4096)
+        except socket.timeout:
+            pass
+        except OSError:
+            return False
+    return True
+
+def wait_for_rcssserver(args, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not probe_rcssserver(args):
+        if time.monotonic() > deadline:
+            raise Exception("rcssserver process not found.")
+        time.sleep(0.05)
 
 def check_args(args):
     if args.team_name != 'CLS' and args.use_random_name:
@@ -130,6 +182,8 @@ def check_args(args):
         raise ValueError("Cannot use both --coach and --goalie")
     if (args.player or args.coach or args.goalie) and args.use_different_rpc_port:
         raise ValueError("Cannot use --player, --coach, or --goalie with --use-different-rpc-port")
+    if args.use_unix_socket and (args.rpc_port != '50051' or args.use_random_rpc_port):
+        raise ValueError("Cannot use --use-unix-socket with --rpc-port or --use-random-rpc-port")
     if args.disable_log_file and args.log_dir:
         raise ValueError("Cannot use both --disable-log-file and --log-dir")
         
@@ -143,13 +197,24 @@ if __name__ == "__main__":
     parser.add_argument('--use-random-rpc-port', required=False, help='Use a random port for the rpc server', default=False, action='store_true')
     parser.add_argument('--use-random-name', required=False, help='Use a random team name', default=False, action='store_true')
     parser.add_argument('--use-different-rpc-port', required=False, help='Use a different port for the rpc server', default=False, action='store_true')
+    parser.add_argument('--use-unix-socket', required=False, help='Connect the proxies to the rpc servers over unix domain sockets instead of TCP', default=False, action='store_true')
     parser.add_argument('--server-host', required=False, help='The host of the robocup soccer server', default='localhost')
     parser.add_argument('--server-port', required=False, help='The port of the robocup soccer server', default='6000')
+    parser.add_argument('--cycle-deadline-ratio', required=False, type=float, help='Send fallback actions if a decision takes longer than this ratio of the simulator step', default=0.0)
+    parser.add_argument('--metrics-interval', required=False, type=float, help='Write a snapshot of the rpc server latency metrics to the log directory every this many seconds', default=0.0)
+    parser.add_argument('--record', required=False, help='Record the states, actions and params of every agent to the records directory of the log directory', default=False, action='store_true')
+    parser.add_argument('--record-compression', required=False, choices=['none', 'zlib', 'zstd'], help='Compression of the record blocks', default='none')
+    parser.add_argument('--record-max-file-size', required=False, type=int, help='Start a new record file of an agent after this many megabytes', default=64)
+    parser.add_argument('--record-max-files', required=False, type=int, help='Keep only this number of record files per agent (0 keeps all of them)', default=4)
+    parser.add_argument('--flight-recorder', required=False, type=int, help='Keep the last this many cycles of every agent in memory and write them to the flight directory of the log directory on a failure', default=0)
+    parser.add_argument('--trace', required=False, help='Write the structured trace of the behaviors of every agent to the traces directory of the log directory', default=False, action='store_true')
+    parser.add_argument('--no-preload', required=False, help='Do not load the formations before forking the rpc servers, every server loads them itself', default=False, action='store_true')
     parser.add_argument('--auto-close-rpc-server', required=False, help='Close the server after finished agent processing', default=False, action='store_true')
     parser.add_argument('--player', required=False, help='Run one agent proxy as player', default=False, action='store_true')
     parser.add_argument('--coach', required=False, help='Run one agent proxy as coach', default=False, action='store_true')
     parser.add_argument('--goalie', required=False, help='Run one agent proxy as goalie', default=False, action='store_true')
     parser.add_argument('--disable-log-file', required=False, help='Disable logging to a file', default=False, action='store_true')
+    parser.add_argument('--proxy-output-tail', required=False, type=int, help='Keep the last lines of the proxy output in memory and log them if a proxy fails', default=0)
     parser.add_argument('--log-dir', required=False, help='The directory to store logs', default=None)
     args = parser.parse_args()
     
@@ -170,36 +235,43 @@ if __name__ == "__main__":
     signal.signal(signal.SIGTERM, signal_handler)
     signal.signal(signal.SIGINT, signal_handler)
     
+    all_server_processes = []
+    all_rpc_ports = []
+    all_readiness: list[ServerReadiness] = []
+    all_start_processes = []
+    output = OutputMultiplexer(tail_lines=args.proxy_output_tail)
     try:
         if args.use_random_name:
             import random
             import string
             args.team_name = ''.join(random.choices(string.ascii_uppercase + string.digits, k=5))
         
-        #Check that rcssserver is running for 10 seconds 
-        start_time = time.time()
+        # Start every rpc server at once, they do not need rcssserver and start while it is probed
+        bring_up_start = time.monotonic()
+        server_count = 4 if args.use_different_rpc_port else 1
+        if not args.no_preload:
+            start_team_logger.debug(f"Preloaded the shared server data in {preload():.2f}s.")
+        for i in range(server_count):
+            server_process, rpc_port, readiness = run_server_script(args)
+            all_server_processes.append(server_process)
+            all_rpc_ports.append(rpc_port)
+            all_readiness.append(readiness)
+            start_team_logger.debug(f"Started server.py process with PID: {all_server_processes[-1].pid}")
+
         start_team_logger.debug("Checking for rcssserver process...")
-        time_th = 10
-        while not check_rcssserver_process(args):
-            if time.time() - start_time > time_th:
-                raise Exception("rcssserver process not found.")
-            time.sleep(1)
-        start_team_logger.debug("rcssserver process found.")
+        wait_for_rcssserver(args)
+        start_team_logger.debug(f"rcssserver process found after {time.monotonic() - bring_up_start:.2f}s.")
 
+        for readiness in all_readiness:
+            if not readiness.wait('listening', 10.0):
+                raise Exception("server.py did not start listening.")
+        start_team_logger.debug(f"server.py processes listening after {time.monotonic() - bring_up_start:.2f}s.")
 
-        # Run the server.py script first
-        all_server_processes = []
-        all_start_processes = []
         if args.use_different_rpc_port:
-            for i in range(4):
-                server_process, rpc_port = run_server_script(args)
-                all_server_processes.append(server_process)
-                start_team_logger.debug(f"Started server.py process with PID: {all_server_processes[-1].pid}")
+            for i, (rpc_port, readiness) in enumerate(zip(all_rpc_ports, all_readiness)):
                 args.goalie, args.coach, args.player = False, False, False
-                args.player = False
                 if i == 0:
                     args.goalie = True
-                    time.sleep(1)
                 elif i == 4:
                     args.coach = True
                 else:
@@ -208,27 +280,32 @@ if __name__ == "__main__":
                 # Run the start.sh script after server.py with the given arguments
                 all_start_processes.append(run_start_script(args, rpc_port))
                 start_team_logger.debug(f"Started start.sh process with PID: {all_start_processes[-1].pid} with team name {args=} and rpc port {rpc_port}")
+                if i == 0:
+                    # The goalie has to connect to rcssserver first, the others are started together when it registered
+                    if not readiness.wait('registered', 10.0):
+                        start_team_logger.warning("The goalie did not register in 10s, starting the other agents.")
         else:
-            server_process, rpc_port = run_server_script(args)
-            all_server_processes.append(server_process)
-            start_team_logger.debug(f"Started server.py process with PID: {all_server_processes[-1].pid}")
-            
             # Run the start.sh script after server.py with the given arguments
-            all_start_processes.append(run_start_script(args, rpc_port))
-            start_team_logger.debug(f"Started start.sh process with PID: {all_start_processes[-1].pid} with team name {args=} and rpc port {rpc_port}")
+            all_start_processes.append(run_start_script(args, all_rpc_ports[0]))
+            start_team_logger.debug(f"Started start.sh process with PID: {all_start_processes[-1].pid} with team name {args=} and rpc port {all_rpc_ports[0]}")
+        start_team_logger.debug(f"Team started in {time.monotonic() - bring_up_start:.2f}s.")
 
         # Monitor both processes and log their outputs
         start_team_logger.debug("Monitoring processes...")
     
         
-        start_threads: list[threading.Thread] = []
+        # One thread copies the output of every proxy to its log file
         for i, start_process in enumerate(all_start_processes):
-            start_threads.append(threading.Thread(target=stream_output_to_file, args=(start_process, 'proxy' if len(all_start_processes) == 1 else f'porxy_{i}', args)))
-            start_threads[-1].start()
+            name = 'proxy' if len(all_start_processes) == 1 else f'porxy_{i}'
+            output.add(name, start_process.stdout, None if args.disable_log_file else f"{log_dir}/{name}.log")
+        output.start()
         
-        # Wait for both threads to finish
-        for start_thread in start_threads:
-            start_thread.join()
+        # Wait until every proxy closed its output
+        output.join()
+        for name, start_process in zip(output.streams, all_start_processes):
+            if start_process.wait() != 0 and output.tail_lines:
+                start_team_logger.warning(f"{name} exited with code {start_process.returncode}, its last output:\n"
+                                          + '\n'.join(output.tail(name)))
         start_team_logger.debug("agents has been exited.")
         
         if args.auto_close_rpc_server:
@@ -259,13 +336,12 @@ if __name__ == "__main__":
         
         start_team_logger.debug("All start processes have finished.")
         
-        stop_thread.set()
+        output.stop()
     
-        start_team_logger.debug("Waiting for start threads to finish...")
-        for start_thread in start_threads:
-            start_thread.join()
+        start_team_logger.debug("Waiting for the output thread to finish...")
+        output.join()
         
-        start_team_logger.debug("Start threads have finished.")
+        start_team_logger.debug("The output thread has finished.")
         
         start_team_logger.info('All processes have been killed.')
     finally:
@@ -273,3 +349,5 @@ if __name__ == "__main__":
         start_team_logger.debug("Final cleanup...")
         kill_rpc_server_process(all_server_processes)
         kill_process_group(all_start_processes)
+        for rpc_port in all_rpc_ports:
+            remove_unix_socket(rpc_port)
@@ -0,0 +1,294 @@
+"""
+Play many matches between two team directories of this base code on one machine.
+
+Every match gets its own rcssserver on its own block of ports, and both teams are started with start.py like
+by hand. The matches run in parallel, each one on its own set of cores: the rcssserver is pinned to the first
+core of the set and the two teams share the others, so --jobs matches never use more cores than the machine
+has. The teams change sides every match. rcssserver puts the first team that connects on the left, so the right
+team is started when an agent of the left team registered at its rpc server, which the proxy does after it
+connected to rcssserver. The score of a match is read from the name of its game log
+(<date>-<left>_<score>-vs-<right>_<score>.rcg), with the sides the teams really played on, and the win rates are
+printed and written to results.csv.
+
+Examples:
+    # 20 matches of the current code against itself
+    python3 tournament.py --matches 20
+    # a change against a baseline checkout, 4 cores per match
+    python3 tournament.py --matches 40 --team-b ../baseline/py2d --cores-per-match 4
+"""
+import argparse
+import csv
+import datetime
+import logging
+import os
+import queue
+import re
+import signal
+import subprocess
+import sys
+import time
+from concurrent import futures
+from dataclasses import dataclass
+from typing import Union
+from utils.logger_utils import setup_logger
+
+
+# rcssserver uses port, port + 1 (trainer) and port + 2 (online coach), the proxies port + 32 for debugging
+PORTS_PER_MATCH = 100
+# Log file of an agent, created by server.py when the agent registers
+AGENT_LOG_NAME = re.compile(r'^agent\d+_\d+\.log$')
+# Seconds to wait for the left team before the right team is started anyway
+LEFT_TEAM_TIMEOUT = 60.0
+GAME_LOG_NAME = re.compile(r'^\d+-(?P<left>.+?)_(?P<left_score>\d+)(?:_\d+)?-vs-(?P<right>.+?)_(?P<right_score>\d+)(?:_\d+)?\.rcg(?:\.gz)?$')
+
+logger: logging.Logger = None
+
+
+@dataclass
+class Team:
+    name: str
+    directory: str
+
+
+@dataclass
+class MatchResult:
+    index: int
+    left: str
+    right: str
+    left_score: int = -1
+    right_score: int = -1
+    game_log: str = ''
+    error: str = ''
+
+    def score_of(self, name: str) -> tuple[int, int]:
+        """
+        Goals for and against the team `name`.
+        """
+        if name == self.left:
+            return self.left_score, self.right_score
+        return self.right_score, self.left_score
+
+
+def parse_game_log_name(file_name: str) -> Union[tuple[str, int, str, int], None]:
+    """
+    Team names and scores of a game log name, None if it does not have the rcssserver format.
+    """
+    match = GAME_LOG_NAME.match(file_name)
+    if match is None:
+        return None
+    return match['left'], int(match['left_score']), match['right'], int(match['right_score'])
+
+
+def split_cores(cores: list[int]) -> tuple[set[int], set[int], set[int]]:
+    """
+    Cores of rcssserver, the left team and the right team in the core set of one match.
+    """
+    if len(cores) == 1:
+        return {cores[0]}, {cores[0]}, {cores[0]}
+    if len(cores) == 2:
+        return {cores[0]}, {cores[1]}, {cores[1]}
+    teams = cores[1:]
+    half = len(teams) // 2
+    return {cores[0]}, set(teams[:half]), set(teams[half:])
+
+
+def _pinned(cores: set[int]):
+    def preexec():
+        os.sched_setaffinity(0, cores)
+    return preexec
+
+
+def _stop(process: subprocess.Popen, timeout: float = 10.0):
+    """
+    Stop a process started in its own session, first with SIGTERM so start.py stops its servers and proxies.
+    """
+    if process.poll() is not None:
+        return
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+    except ProcessLookupError:
+        pass
+
+
+def _agent_registered(log_dir: str) -> bool:
+    """
+    Whether an agent of the team that logs to log_dir registered at its rpc server.
+    """
+    for _, _, file_names in os.walk(log_dir):
+        if any(AGENT_LOG_NAME.match(file_name) for file_name in file_names):
+            return True
+    return False
+
+
+def _wait_for_team(log_dir: str, process: subprocess.Popen, timeout: float) -> bool:
+    """
+    Wait until an agent of the team started by process registered, False if it did not within timeout.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and process.poll() is None:
+        if _agent_registered(log_dir):
+            return True
+        time.sleep(0.1)
+    return False
+
+
+def run_match(index: int, left: Team, right: Team, port: int, cores: list[int], args) -> MatchResult:
+    result = MatchResult(index, left.name, right.name)
+    match_dir = os.path.join(args.output, f'match_{index:04d}')
+    os.makedirs(match_dir, exist_ok=True)
+    server_cores, left_cores, right_cores = split_cores(cores)
+    server_command = [args.rcssserver,
+                      f'server::port={port}', f'server::coach_port={port + 1}', f'server::olcoach_port={port + 2}',
+                      'server::auto_mode=true', f'server::synch_mode={str(not args.no_synch).lower()}',
+                      f'server::game_log_dir={match_dir}', f'server::text_log_dir={match_dir}',
+                      'server::game_log_compression=0', 'server::game_log_fixed=false',
+                      'server::game_log_dated=true'] + args.server_option
+    processes: list[subprocess.Popen] = []
+    try:
+        with open(os.path.join(match_dir, 'rcssserver.log'), 'wb') as server_log:
+            server = subprocess.Popen(server_command, cwd=match_dir, stdout=server_log, stderr=subprocess.STDOUT,
+                                      start_new_session=True, preexec_fn=_pinned(server_cores))
+        processes.append(server)
+        for team, team_cores in ((left, left_cores), (right, right_cores)):
+            with open(os.path.join(match_dir, f'{team.name}.log'), 'wb') as team_log:
+                processes.append(subprocess.Popen(
+                    [sys.executable, 'start.py', '-t', team.name, '--server-port', str(port),
+                     '--use-random-rpc-port', '--auto-close-rpc-server', '--log-dir', os.path.join(match_dir, team.name)]
+                    + args.team_option,
+                    cwd=team.directory, stdout=team_log, stderr=subprocess.STDOUT, start_new_session=True,
+                    preexec_fn=_pinned(team_cores)))
+            if team is left and not _wait_for_team(os.path.join(match_dir, left.name), processes[-1], LEFT_TEAM_TIMEOUT):
+                logger.warning(f"match {index}: {left.name} did not connect in {LEFT_TEAM_TIMEOUT:.0f}s, "
+                               f"starting {right.name}, the sides may be swapped")
+        logger.debug(f"match {index}: {left.name} vs {right.name} on port {port}, cores {cores}")
+        try:
+            server.wait(timeout=args.match_timeout)
+        except subprocess.TimeoutExpired:
+            result.error = f'no result after {args.match_timeout:.0f}s'
+            return result
+        for file_name in sorted(os.listdir(match_dir)):
+            parsed = parse_game_log_name(file_name)
+            # The game log has the sides the teams really played on
+            if parsed is not None and {parsed[0], parsed[2]} == {left.name, right.name}:
+                result.left, result.left_score, result.right, result.right_score = parsed
+                result.game_log = os.path.join(match_dir, file_name)
+        if not result.game_log:
+            result.error = f'rcssserver exited with code {server.returncode} without a game log'
+        return result
+    except OSError as e:
+        result.error = str(e)
+        return result
+    finally:
+        for process in reversed(processes):
+            _stop(process)
+
+
+def run_tournament(teams: tuple[Team, Team], args) -> list[MatchResult]:
+    cores = sorted(os.sched_getaffinity(0))
+    jobs = args.jobs or max(1, len(cores) // args.cores_per_match)
+    jobs = min(jobs, args.matches)
+    # Every parallel match has a slot with its own ports and cores, a match takes a free slot and returns it
+    slots: queue.Queue = queue.Queue()
+    for slot in range(jobs):
+        slot_cores = [cores[(slot * args.cores_per_match + i) % len(cores)] for i in range(args.cores_per_match)]
+        slots.put((args.first_port + slot * PORTS_PER_MATCH, slot_cores))
+    logger.info(f"Playing {args.matches} matches, {jobs} at a time on {len(cores)} cores")
+
+    def play(index: int) -> MatchResult:
+        port, slot_cores = slots.get()
+        try:
+            left, right = teams if index % 2 == 0 else teams[::-1]
+            result = run_match(index, left, right, port, slot_cores, args)
+        finally:
+            slots.put((port, slot_cores))
+        if result.error:
+            logger.warning(f"match {index}: {result.left} vs {result.right} failed: {result.error}")
+        else:
+            logger.info(f"match {index}: {result.left} {result.left_score} - {result.right_score} {result.right}")
+        return result
+
+    with futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(play, range(args.matches)))
+
+
+def summarize_results(results: list[MatchResult], teams: tuple[Team, Team]) -> list[dict]:
+    rows = []
+    played = [result for result in results if not result.error]
+    for team in teams:
+        wins = draws = losses = goals_for = goals_against = 0
+        for result in played:
+            scored, conceded = result.score_of(team.name)
+            goals_for += scored
+            goals_against += conceded
+            if scored > conceded:
+                wins += 1
+            elif scored == conceded:
+                draws += 1
+            else:
+                losses += 1
+        rows.append(dict(team=team.name, played=len(played), wins=wins, draws=draws, losses=losses,
+                         goals_for=goals_for, goals_against=goals_against,
+                         win_rate=wins / len(played) if played else 0.0,
+                         points_rate=(wins + 0.5 * draws) / len(played) if played else 0.0))
+    return rows
+
+
+def write_results(results: list[MatchResult], path: str):
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['match', 'left', 'right', 'left_score', 'right_score', 'game_log', 'error'])
+        for result in results:
+            writer.writerow([result.index, result.left, result.right, result.left_score, result.right_score,
+                             result.game_log, result.error])
+
+
+def main():
+    global logger
+    parser = argparse.ArgumentParser(description='Play matches between two teams in parallel')
+    parser.add_argument('-m', '--matches', type=int, default=10, help='Number of matches')
+    parser.add_argument('--team-a', default='.', help='py2d directory of the first team')
+    parser.add_argument('--team-b', default='.', help='py2d directory of the second team')
+    parser.add_argument('--name-a', default='TeamA', help='Name of the first team')
+    parser.add_argument('--name-b', default='TeamB', help='Name of the second team')
+    parser.add_argument('-j', '--jobs', type=int, default=0, help='Matches played at the same time (default: cores / --cores-per-match)')
+    parser.add_argument('--cores-per-match', type=int, default=3, help='Cores of one match: one for rcssserver, the others are shared by the teams')
+    parser.add_argument('--rcssserver', default='rcssserver', help='rcssserver executable')
+    parser.add_argument('--server-option', action='append', default=[], help='Extra rcssserver option, e.g. server::half_time=300 (can be repeated)')
+    parser.add_argument('--team-option', action='append', default=[], help='Extra start.py argument of both teams, e.g. --record (can be repeated)')
+    parser.add_argument('--no-synch', default=False, action='store_true', help='Play in real time instead of the rcssserver synch mode')
+    parser.add_argument('--first-port', type=int, default=6000, help='rcssserver port of the first parallel match, the next ones use +100')
+    parser.add_argument('--match-timeout', type=float, default=1800.0, help='Stop a match without a result after this many seconds')
+    parser.add_argument('-o', '--output', default=None, help='Directory of the logs and results (default: logs/tournament_<date>)')
+    args = parser.parse_args()
+
+    if args.name_a == args.name_b:
+        parser.error("The team names must be different")
+    if args.matches < 1 or args.cores_per_match < 1:
+        parser.error("--matches and --cores-per-match must be positive")
+    if args.output is None:
+        args.output = os.path.join('logs', f"tournament_{datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}")
+    args.output = os.path.abspath(args.output)
+    os.makedirs(args.output, exist_ok=True)
+    logger = setup_logger('tournament', args.output, console_level=logging.INFO, file_level=logging.DEBUG,
+                          console_format_str='%(message)s')
+    teams = (Team(args.name_a, os.path.abspath(args.team_a)), Team(args.name_b, os.path.abspath(args.team_b)))
+
+    start = time.monotonic()
+    results = run_tournament(teams, args)
+    write_results(results, os.path.join(args.output, 'results.csv'))
+
+    failed = sum(1 for result in results if result.error)
+    print(f"\n{len(results) - failed} matches played in {time.monotonic() - start:.0f}s, {failed} failed")
+    print(f"{'team':<16}{'W':>5}{'D':>5}{'L':>5}{'GF':>6}{'GA':>6}{'win rate':>10}{'points':>8}")
+    for row in summarize_results(results, teams):
+        print(f"{row['team']:<16}{row['wins']:>5}{row['draws']:>5}{row['losses']:>5}{row['goals_for']:>6}"
+              f"{row['goals_against']:>6}{row['win_rate']:>10.1%}{row['points_rate']:>8.1%}")
+    print(f"results: {os.path.join(args.output, 'results.csv')}")
+
+
+if __name__ == '__main__':
+    main()
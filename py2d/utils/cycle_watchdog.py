@@ -0,0 +1,77 @@
+import logging
+from collections import defaultdict
+from concurrent import futures
+from typing import Callable, TypeVar
+from utils.metrics import registry as metrics
+
+
+T = TypeVar('T')
+
+
+class CycleWatchdog:
+    """
+    Give the decision of every cycle a time budget.
+
+    The decision runs on a dedicated thread of the agent and the RPC thread waits for it until the deadline.
+    If the deadline expires, the fallback actions are returned to the proxy, so it never misses the
+    rcssserver step. The late decision keeps running and its result is discarded. While it is still running,
+    the next cycles are answered with the fallback directly instead of being queued behind it.
+
+    The deadline is a ratio of the simulator step of the ServerParam message, or of 100ms before it arrived. The
+    RPC thread waits with future.result(timeout) on the single-thread executor of the agent. To return, it needs
+    the GIL back from the decision thread, so it can wake up to one interpreter switch interval (5ms by default)
+    after the deadline.
+    """
+    def __init__(self, deadline_ratio: float, logger: logging.Logger, simulator_step_ms: int = 100) -> None:
+        self.deadline_ratio = deadline_ratio
+        self.logger = logger
+        self.deadline: float = simulator_step_ms * deadline_ratio / 1000.0
+        self.executor = futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='decision')
+        self.running: futures.Future = None
+        self.overruns: dict[str, int] = defaultdict(int)
+        self.skipped: dict[str, int] = defaultdict(int)
+        # True if the last run answered with the fallback actions
+        self.expired = False
+
+    def set_simulator_step(self, simulator_step_ms: int):
+        if simulator_step_ms > 0:
+            self.deadline = simulator_step_ms * self.deadline_ratio / 1000.0
+            self.logger.debug(f"cycle deadline set to {self.deadline * 1000.0:.1f}ms")
+
+    def run(self, decide: Callable[[], T], fallback: Callable[[], T], running_decision_maker: Callable[[], str]) -> T:
+        """
+        Run one decision with the deadline.
+
+        :param decide: Function that makes the full decision.
+        :param fallback: Function that builds the cheap fallback actions.
+        :param running_decision_maker: Function that returns the name of the decision maker that is running.
+        :return: Result of decide, or of fallback if the deadline expired.
+        """
+        self.expired = False
+        if self.running is not None and not self.running.done():
+            self.expired = True
+            name = running_decision_maker()
+            self.skipped[name] += 1
+            if metrics.enabled:
+                metrics.inc('deadline_skipped_total', name)
+            self.logger.warning(f"previous decision of {name} is still running, fallback actions are used")
+            return fallback()
+        future = self.executor.submit(decide)
+        try:
+            return future.result(timeout=self.deadline)
+        except futures.TimeoutError:
+            name = running_decision_maker()
+            self.overruns[name] += 1
+            self.running = future
+            self.expired = True
+            if metrics.enabled:
+                metrics.inc('deadline_overruns_total', name)
+            self.logger.warning(f"decision of {name} exceeded the {self.deadline * 1000.0:.1f}ms deadline "
+                                f"(overruns: {dict(self.overruns)}), fallback actions are used")
+            return fallback()
+
+    def report(self) -> str:
+        return f"overruns per decision maker: {dict(self.overruns)}, skipped cycles: {dict(self.skipped)}"
+
+    def close(self):
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,100 @@
+import logging
+import threading
+import time
+from utils import recorder as rec
+
+
+class FlightRecorder:
+    """
+    Keep the last cycles of one agent in memory and write them to disk only when something goes wrong.
+
+    Every cycle the serialized State, the produced actions and the timing are packed with the record format of
+    utils.recorder into a preallocated slot of a ring of `capacity` slots. A slot only grows if a cycle does not
+    fit in it. dump writes the register and params records followed by the cycles in the ring to a new record
+    file, so the cycles that led to a failure can be read or replayed with replay.py like a --record file.
+
+    Dumps of exceptions and deadline overruns are skipped until the ring has been refilled since the previous
+    dump, so an error in every cycle does not write a file per cycle.
+    """
+    def __init__(self, directory: str, name: str, capacity: int = 200, slot_size: int = 16 << 10,
+                 logger: logging.Logger = None) -> None:
+        self.directory = directory
+        self.name = name
+        self.capacity = capacity
+        self.logger = logger or logging.getLogger('pmservice')
+        self.slots = [bytearray(slot_size) for _ in range(capacity)]
+        self.sizes = [0] * capacity
+        self.cycles = [(0, 0)] * capacity
+        self.count = 0
+        self.last_dump_count = 0
+        self.header = bytearray()
+        self.received = 0.0
+
+    def record_header(self, kind: int, message):
+        payload = message.SerializeToString()
+        self.header += rec.RECORD.pack(kind, 0, 0, len(payload)) + payload
+
+    def _write(self, kind: int, cycle: int, stoped_cycle: int, payload: bytes):
+        index = (self.count - 1) % self.capacity
+        slot = self.slots[index]
+        offset = self.sizes[index]
+        end = offset + rec.RECORD.size + len(payload)
+        if end > len(slot):
+            slot.extend(bytes(end - len(slot)))
+        rec.RECORD.pack_into(slot, offset, kind, cycle, stoped_cycle, len(payload))
+        slot[offset + rec.RECORD.size:end] = payload
+        self.sizes[index] = end
+
+    def record_state(self, state):
+        """
+        Start the slot of a new cycle with its state.
+        """
+        self.count += 1
+        self.received = time.time()
+        cycle, stoped_cycle = state.world_model.cycle, state.world_model.stoped_cycle
+        index = (self.count - 1) % self.capacity
+        self.sizes[index] = 0
+        self.cycles[index] = (cycle, stoped_cycle)
+        self._write(rec.STATE, cycle, stoped_cycle, state.SerializeToString())
+
+    def record_result(self, kind: int, actions, latency_ms: float):
+        """
+        Add the actions, if there are any, and the timing to the slot of the current cycle.
+        """
+        if self.count == 0:
+            return
+        cycle, stoped_cycle = self.cycles[(self.count - 1) % self.capacity]
+        if actions is not None:
+            self._write(kind, cycle, stoped_cycle, actions.SerializeToString())
+        self._write(rec.CYCLE_TIMING, cycle, stoped_cycle, rec.TIMING.pack(self.received, latency_ms))
+
+    def dump(self, reason: str, force: bool = False):
+        """
+        Write the ring to <directory>/<name>.flight-<cycle>-<stoped cycle>-<reason>.0001.rec on a background thread.
+
+        :param reason: Why the ring is dumped, it is part of the file name.
+        :param force: Dump even if the ring was dumped within the last `capacity` cycles.
+        """
+        if self.count == self.last_dump_count:
+            return
+        if not force and self.last_dump_count and self.count - self.last_dump_count < self.capacity:
+            return
+        first = max(self.count - self.capacity, 0)
+        cycles = []
+        for i in range(first, self.count):
+            index = i % self.capacity
+            cycle, stoped_cycle = self.cycles[index]
+            cycles.append((cycle, stoped_cycle, bytes(self.slots[index][:self.sizes[index]])))
+        self.last_dump_count = self.count
+        cycle, stoped_cycle = cycles[-1][:2]
+        name = f'{self.name}.flight-{cycle}-{stoped_cycle}-{reason}'
+        threading.Thread(target=self._write_dump, args=(name, bytes(self.header), cycles),
+                         name='flight-recorder').start()
+
+    def _write_dump(self, name: str, header: bytes, cycles: list[tuple[int, int, bytes]]):
+        try:
+            path = rec.write_packed(self.directory, name, header, cycles)
+            level = logging.INFO if name.endswith('-bye') else logging.WARNING
+            self.logger.log(level, f"flight recorder wrote the last {len(cycles)} cycles to {path}")
+        except Exception as e:
+            self.logger.error(f"flight recorder failed to write {name}: {e}")
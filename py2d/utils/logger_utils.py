@@ -1,30 +1,232 @@
+import atexit
 import logging
 import os
+import queue
+import threading
+import time
+import weakref
 
 
-def setup_logger(name, log_dir, console_level=logging.INFO, file_level=logging.DEBUG, console_format_str=None, file_format_str=None):
+class _LogWriter:
+    """
+    The background thread that formats and writes the log records of every logger of the process.
+
+    The logging threads only put (handler, record) pairs in the queue. The writer takes all queued records at
+    once, passes them to their handlers and flushes every touched handler once per batch, so a slow disk delays
+    only this thread.
+    """
+    def __init__(self, max_batch: int = 1024) -> None:
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.max_batch = max_batch
+        self.pid = os.getpid()
+        self.thread = threading.Thread(target=self._run, name='log-writer', daemon=True)
+        self.thread.start()
+
+    def put(self, handler: logging.Handler, record: logging.LogRecord):
+        self.queue.put((handler, record))
+
+    def _run(self):
+        item = self.queue.get()
+        while item is not None:
+            touched = set()
+            for _ in range(self.max_batch):
+                handler, record = item
+                try:
+                    handler.handle(record)
+                    touched.add(handler)
+                except Exception:
+                    handler.handleError(record)
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    item = ()
+                    break
+                if item is None:
+                    break
+            for handler in touched:
+                handler.flush()
+            if item == ():
+                item = self.queue.get()
+
+    def stop(self, timeout: float = 5.0):
+        self.queue.put(None)
+        self.thread.join(timeout)
+
+
+_writer: _LogWriter = None
+_writer_lock = threading.Lock()
+_batched_handlers: 'weakref.WeakSet[BatchedRotatingFileHandler]' = weakref.WeakSet()
+
+
+def _get_writer() -> _LogWriter:
+    global _writer
+    writer = _writer
+    # The thread of a forked parent does not exist in the child, so every process starts its own writer
+    if writer is None or writer.pid != os.getpid():
+        with _writer_lock:
+            if _writer is None or _writer.pid != os.getpid():
+                _writer = _LogWriter()
+            writer = _writer
+    return writer
+
+
+def _after_fork_in_child():
+    # Lines buffered by the parent are written by the parent
+    for handler in list(_batched_handlers):
+        handler.buffer.clear()
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+@atexit.register
+def flush_logs():
+    """
+    Wait until the writer thread has written every queued record.
+    """
+    writer = _writer
+    if writer is not None and writer.pid == os.getpid() and writer.thread.is_alive():
+        writer.stop()
+
+
+class BatchedRotatingFileHandler(logging.Handler):
+    """
+    File handler for the writer thread: emit only formats the record into a buffer and flush writes the buffer
+    with one write call. The file is rotated like logging.handlers.RotatingFileHandler when it reaches max_bytes.
+    """
+    def __init__(self, filename: str, max_bytes: int = 0, backup_count: int = 3) -> None:
+        super().__init__()
+        self.filename = os.path.abspath(filename)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.buffer: list[str] = []
+        self.stream = None
+        _batched_handlers.add(self)
+
+    def emit(self, record: logging.LogRecord):
+        self.buffer.append(self.format(record))
+
+    def flush(self):
+        if not self.buffer:
+            return
+        data = '\n'.join(self.buffer) + '\n'
+        self.buffer.clear()
+        if self.stream is None:
+            self.stream = open(self.filename, 'a', encoding='utf-8')
+        self.stream.write(data)
+        self.stream.flush()
+        if self.max_bytes > 0 and self.stream.tell() >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        self.stream.close()
+        self.stream = None
+        if self.backup_count <= 0:
+            os.remove(self.filename)
+            return
+        for i in range(self.backup_count - 1, 0, -1):
+            source = f'{self.filename}.{i}'
+            if os.path.exists(source):
+                os.replace(source, f'{self.filename}.{i + 1}')
+        os.replace(self.filename, f'{self.filename}.1')
+
+    def close(self):
+        self.flush()
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+        super().close()
+
+
+class AsyncHandler(logging.Handler):
+    """
+    Handler of a logger that hands its records to the writer thread without formatting them.
+
+    The message is formatted with its arguments on the writer thread, so `logger.debug('x %s', value)` costs only
+    a queue put on the calling thread. Arguments must not be changed after the logging call, pass a copy of
+    containers that are reused.
+
+    With rate_limit, at most rate_limit records per second (with bursts of the same size) below WARNING are
+    passed, the number of dropped records is written with the next passed record.
+
+    :param handlers: Handlers that run on the writer thread.
+    :param rate_limit: Maximum records per second below WARNING, 0 is unlimited.
+    """
+    def __init__(self, handlers: list[logging.Handler], rate_limit: float = 0.0) -> None:
+        super().__init__(min(handler.level for handler in handlers))
+        self.handlers = handlers
+        self.rate_limit = rate_limit
+        self.tokens = rate_limit
+        self.last_refill = time.monotonic()
+        self.dropped = 0
+
+    def _allow(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        now = time.monotonic()
+        self.tokens = min(self.rate_limit, self.tokens + (now - self.last_refill) * self.rate_limit)
+        self.last_refill = now
+        if self.tokens < 1.0:
+            self.dropped += 1
+            return False
+        self.tokens -= 1.0
+        return True
+
+    def emit(self, record: logging.LogRecord):
+        if self.rate_limit > 0 and not self._allow(record):
+            return
+        writer = _get_writer()
+        if self.dropped:
+            dropped = logging.LogRecord(record.name, logging.WARNING, record.pathname, record.lineno,
+                                        'rate limit dropped %d log records', (self.dropped,), None)
+            self.dropped = 0
+            for handler in self.handlers:
+                writer.put(handler, dropped)
+        for handler in self.handlers:
+            if record.levelno >= handler.level:
+                writer.put(handler, record)
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        # No handler lock: the caller only appends to the writer queue, which is thread safe
+        rv = self.filter(record)
+        if rv:
+            self.emit(record)
+        return rv
+
+    def close(self):
+        for handler in self.handlers:
+            handler.close()
+        super().close()
+
+
+def setup_logger(name, log_dir, console_level=logging.INFO, file_level=logging.DEBUG, console_format_str=None, file_format_str=None,
+                 asynchronous=True, rate_limit=0.0, max_bytes=0, backup_count=3):
     """
     Set up a logger that writes to both a file and the console, with different formats and levels.
-    
+
     :param name: Name of the logger.
     :param log_file: Path to the log file.
     :param console_level: Logging level for the console output.
     :param file_level: Logging level for the file output.
+    :param asynchronous: Format and write the records on the writer thread instead of the logging thread.
+    :param rate_limit: Maximum records per second below WARNING (asynchronous only), 0 is unlimited.
+    :param max_bytes: Rotate the log file when it reaches this size (asynchronous only), 0 never rotates.
+    :param backup_count: Number of rotated log files to keep.
     :return: Configured logger.
     """
     have_console_handler = console_level is not None
     have_file_handler = file_level is not None
-    
+
     if have_file_handler and not os.path.exists(log_dir):
-        os.makedirs(log_dir)
-        
+        os.makedirs(log_dir, exist_ok=True)
+
     log_file = os.path.join(log_dir, f'{name}.log')
-        
+
     # Create a custom logger
     logger = logging.getLogger(name)
-    
+
     if not logger.hasHandlers():
-        logger.setLevel(logging.DEBUG)  # Set the overall logger level to the lowest level you want to capture
+        handlers = []
         # Console handler
         if have_console_handler:
             console_handler = logging.StreamHandler()  # For console output
@@ -33,16 +235,31 @@ def setup_logger(name, log_dir, console_level=logging.INFO, file_level=logging.D
                 console_format_str = '%(name)s - %(levelname)s - %(message)s'
             console_format = logging.Formatter(console_format_str)
             console_handler.setFormatter(console_format)
-            logger.addHandler(console_handler)
-        
+            handlers.append(console_handler)
+
         # File handler
         if have_file_handler:
-            file_handler = logging.FileHandler(log_file)  # For file output
+            if asynchronous:
+                file_handler = BatchedRotatingFileHandler(log_file, max_bytes, backup_count)
+            else:
+                file_handler = logging.FileHandler(log_file)  # For file output
             file_handler.setLevel(file_level)
             if not file_format_str:
                 file_format_str = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
             file_format = logging.Formatter(file_format_str)
             file_handler.setFormatter(file_format)
-            logger.addHandler(file_handler)
-    
+            handlers.append(file_handler)
+
+        if not handlers:
+            # Like a logger without handlers, only warnings reach the last resort handler of logging
+            logger.setLevel(logging.WARNING)
+            return logger
+        # Records below every handler level are dropped by the logger before they are created
+        logger.setLevel(min(handler.level for handler in handlers))
+        if asynchronous:
+            logger.addHandler(AsyncHandler(handlers, rate_limit))
+        else:
+            for handler in handlers:
+                logger.addHandler(handler)
+
     return logger
@@ -0,0 +1,115 @@
+import logging
+import time
+from typing import Union
+import service_pb2 as pb2
+
+
+class MatchQuotaError(Exception):
+    pass
+
+
+class Match:
+    """
+    The agents of one match, grouped by team name.
+    """
+    def __init__(self, match_id: str) -> None:
+        self.match_id = match_id
+        self.teams: dict[str, dict[int, object]] = {}
+        self.slots: set[tuple[str, int, int]] = set()
+        self.client_slots: dict[int, tuple[str, int, int]] = {}
+        self.start_time = time.time()
+
+    @property
+    def size(self) -> int:
+        return len(self.client_slots)
+
+    def add(self, client_id: int, team_name: str, uniform_number: int, agent_type: int, agent):
+        slot = (team_name, uniform_number, agent_type)
+        self.teams.setdefault(team_name, {})[client_id] = agent
+        self.slots.add(slot)
+        self.client_slots[client_id] = slot
+
+    def remove(self, client_id: int):
+        slot = self.client_slots.pop(client_id)
+        self.slots.discard(slot)
+        team = self.teams[slot[0]]
+        team.pop(client_id, None)
+        if not team:
+            del self.teams[slot[0]]
+
+    def __repr__(self) -> str:
+        teams = ', '.join(f'{name}: {len(agents)} agents' for name, agents in self.teams.items())
+        return f"match '{self.match_id}' ({teams})"
+
+
+class MatchRegistry:
+    """
+    Group the registered agents into matches, so one server process can host many matches at once.
+
+    A RegisterRequest with a match_id joins that match. Without a match_id the agent joins the latest automatic
+    match, unless the same team, uniform number and agent type is already registered there, then a new automatic
+    match is started. So unmodified proxies of consecutive matches are grouped correctly, concurrent matches need
+    a match_id.
+
+    A match ends when its last agent sends SendByeCommand.
+    """
+    def __init__(self, logger: logging.Logger, max_matches: int = 0, max_agents_per_match: int = 0) -> None:
+        self.logger = logger
+        self.max_matches = max_matches
+        self.max_agents_per_match = max_agents_per_match
+        self.matches: dict[str, Match] = {}
+        self.client_matches: dict[int, Match] = {}
+        self.auto_match: Union[Match, None] = None
+        self.auto_match_count = 0
+
+    def reserve(self, register_request: pb2.RegisterRequest) -> Match:
+        """
+        Find or create the match of a new agent.
+
+        :param register_request: Register request of the agent.
+        :return: Match the agent should be added to.
+        :raises MatchQuotaError: If the server hosts the maximum number of matches or the match is full.
+        """
+        match_id = register_request.match_id
+        if not match_id:
+            slot = (register_request.team_name, register_request.uniform_number, register_request.agent_type)
+            if self.auto_match is None or slot in self.auto_match.slots or self.auto_match.match_id not in self.matches:
+                self.auto_match_count += 1
+                match_id = f'auto-{self.auto_match_count}'
+            else:
+                match_id = self.auto_match.match_id
+        match = self.matches.get(match_id)
+        if match is None:
+            if self.max_matches and len(self.matches) >= self.max_matches:
+                raise MatchQuotaError(f"the server already hosts {len(self.matches)} matches")
+            match = Match(match_id)
+            if not register_request.match_id:
+                self.auto_match = match
+        elif self.max_agents_per_match and match.size >= self.max_agents_per_match:
+            raise MatchQuotaError(f"{match} already has {match.size} agents")
+        return match
+
+    def add(self, match: Match, client_id: int, register_request: pb2.RegisterRequest, agent):
+        if match.match_id not in self.matches:
+            self.matches[match.match_id] = match
+            self.logger.info(f"match '{match.match_id}' started")
+        match.add(client_id, register_request.team_name, register_request.uniform_number,
+                  register_request.agent_type, agent)
+        self.client_matches[client_id] = match
+
+    def remove(self, client_id: int) -> Union[Match, None]:
+        """
+        Remove an agent from its match.
+
+        :return: The match if it ended with this agent, otherwise None.
+        """
+        match = self.client_matches.pop(client_id, None)
+        if match is None:
+            return None
+        match.remove(client_id)
+        if match.size > 0:
+            return None
+        self.matches.pop(match.match_id, None)
+        self.logger.info(f"match '{match.match_id}' finished after {time.time() - match.start_time:.0f}s, "
+                         f"{len(self.matches)} matches running")
+        return match
@@ -0,0 +1,192 @@
+import bisect
+import os
+import threading
+import time
+from functools import wraps
+
+
+# Upper bounds of the latency buckets in milliseconds, the last bucket takes everything above 500ms
+LATENCY_BUCKETS_MS = (0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 50.0, 80.0, 100.0, 200.0, 500.0, float('inf'))
+
+
+class _ThreadShard:
+    """
+    Counters of one thread. Only the owning thread writes to it, so recording needs no lock.
+    Each histogram is a list of bucket counts followed by the total count and the sum.
+    """
+    def __init__(self) -> None:
+        self.histograms: dict[tuple[str, str], list] = {}
+        self.counters: dict[tuple[str, str], int] = {}
+
+
+class MetricsRegistry:
+    """
+    Low overhead metrics of the rpc server.
+
+    Latencies are recorded in fixed-bucket histograms and events in counters, both keyed by a metric name and one
+    label value (rpc method, client id, decision maker ...). Every thread records into its own shard and the
+    shards are only merged when the metrics are read, so recording is a dictionary lookup and two additions.
+    """
+    def __init__(self) -> None:
+        self.enabled = False
+        self._local = threading.local()
+        self._shards: list[_ThreadShard] = []
+        self._shards_lock = threading.Lock()
+        self._last_cycles: dict[int, int] = {}
+
+    def _shard(self) -> _ThreadShard:
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = _ThreadShard()
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def observe(self, name: str, label, value_ms: float):
+        """
+        Record one latency sample.
+
+        :param name: Metric name, e.g. rpc_latency_ms.
+        :param label: Label value, e.g. the rpc method name.
+        :param value_ms: Latency in milliseconds.
+        """
+        histograms = self._shard().histograms
+        key = (name, label)
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = [0] * (len(LATENCY_BUCKETS_MS) + 2)
+        histogram[bisect.bisect_left(LATENCY_BUCKETS_MS, value_ms)] += 1
+        histogram[-2] += 1
+        histogram[-1] += value_ms
+
+    def inc(self, name: str, label, value: int = 1):
+        counters = self._shard().counters
+        key = (name, label)
+        counters[key] = counters.get(key, 0) + value
+
+    def observe_cycle(self, client_id: int, cycle: int):
+        """
+        Count the cycles a client skipped, detected by a gap between the cycles of its consecutive states.
+        """
+        last_cycle = self._last_cycles.get(client_id)
+        self._last_cycles[client_id] = cycle
+        if last_cycle is not None and cycle > last_cycle + 1:
+            self.inc('skipped_cycles_total', client_id, cycle - last_cycle - 1)
+
+    def forget_client(self, client_id: int):
+        self._last_cycles.pop(client_id, None)
+
+    def snapshot(self) -> tuple[dict, dict]:
+        """
+        Merge the shards of all threads.
+
+        :return: Tuple of merged histograms and merged counters.
+        """
+        histograms: dict[tuple[str, str], list] = {}
+        counters: dict[tuple[str, str], int] = {}
+        with self._shards_lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for key, histogram in list(shard.histograms.items()):
+                merged = histograms.setdefault(key, [0] * len(histogram))
+                for i, value in enumerate(histogram):
+                    merged[i] += value
+            for key, value in list(shard.counters.items()):
+                counters[key] = counters.get(key, 0) + value
+        return histograms, counters
+
+    def render_text(self) -> str:
+        """
+        Render the metrics in the Prometheus text format, bucket counts are cumulative.
+        """
+        histograms, counters = self.snapshot()
+        lines = []
+        for (name, label), histogram in sorted(histograms.items(), key=lambda item: (item[0][0], str(item[0][1]))):
+            label_name = 'client_id' if isinstance(label, int) else 'name'
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS_MS, histogram):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else f'{bound:g}'
+                lines.append(f'{name}_bucket{{{label_name}="{label}",le="{le}"}} {cumulative}')
+            lines.append(f'{name}_count{{{label_name}="{label}"}} {histogram[-2]}')
+            lines.append(f'{name}_sum{{{label_name}="{label}"}} {histogram[-1]:.3f}')
+        for (name, label), value in sorted(counters.items(), key=lambda item: (item[0][0], str(item[0][1]))):
+            label_name = 'client_id' if isinstance(label, int) else 'name'
+            lines.append(f'{name}{{{label_name}="{label}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def start_snapshot_writer(self, path: str, interval: float):
+        """
+        Periodically replace the file at path with the rendered metrics from a daemon thread.
+        """
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+
+        def write_loop():
+            while True:
+                time.sleep(interval)
+                tmp_path = f'{path}.tmp'
+                with open(tmp_path, 'w') as f:
+                    f.write(self.render_text())
+                os.replace(tmp_path, path)
+
+        threading.Thread(target=write_loop, name='metrics-snapshot', daemon=True).start()
+
+    def start_http_endpoint(self, port: int, host: str = '127.0.0.1') -> 'http.server.HTTPServer':
+        """
+        Serve the rendered metrics over HTTP on a local port from a daemon thread.
+        """
+        # Imported here, http.server is only needed with --metrics-port
+        import http.server
+        registry = self
+
+        class MetricsRequestHandler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = registry.render_text().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = http.server.ThreadingHTTPServer((host, port), MetricsRequestHandler)
+        threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+        return server
+
+
+registry = MetricsRegistry()
+
+
+def _client_id(request) -> int:
+    if hasattr(request, 'register_response'):
+        return request.register_response.client_id
+    return getattr(request, 'client_id', None)
+
+
+def _observe_rpc(name: str, request, elapsed_ms: float):
+    registry.observe('rpc_latency_ms', name, elapsed_ms)
+    client_id = _client_id(request)
+    if client_id is not None:
+        registry.observe('client_rpc_latency_ms', client_id, elapsed_ms)
+
+
+def timed_rpc(method):
+    """
+    Decorator for GameHandler rpc methods, it records the latency per rpc method and per client id.
+    """
+    name = method.__name__
+
+    @wraps(method)
+    def wrapper(self, request, context):
+        if not registry.enabled:
+            return method(self, request, context)
+        start = time.perf_counter()
+        try:
+            return method(self, request, context)
+        finally:
+            _observe_rpc(name, request, (time.perf_counter() - start) * 1000.0)
+    return wrapper
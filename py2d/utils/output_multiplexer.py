@@ -0,0 +1,111 @@
+import os
+import selectors
+import sys
+import threading
+import time
+from collections import deque
+from typing import BinaryIO, Union
+
+
+class _Stream:
+    def __init__(self, name: str, pipe: BinaryIO, path: Union[str, None], tail_lines: int) -> None:
+        self.name = name
+        self.pipe = pipe
+        self.file: Union[BinaryIO, None] = open(path, 'ab', buffering=1 << 16) if path else None
+        self.tail: deque[bytes] = deque(maxlen=tail_lines) if tail_lines > 0 else None
+        self.partial = b''
+
+    def add_tail(self, data: bytes):
+        *lines, self.partial = (self.partial + data).split(b'\n')
+        self.tail.extend(lines)
+
+    def close(self):
+        if self.tail is not None and self.partial:
+            self.tail.append(self.partial)
+            self.partial = b''
+        self.pipe.close()
+        if self.file is not None:
+            self.file.close()
+
+
+class OutputMultiplexer:
+    """
+    Copy the output pipes of many processes to their log files (or stdout) on one thread.
+
+    The pipes are non-blocking and registered in one selector. Whatever a pipe holds is read in one chunk of up to
+    `chunk_size` bytes and written to a buffered file, the files are flushed every `flush_interval` seconds and
+    when a pipe is closed. With `tail_lines` the last lines of every stream are also kept in memory, see tail.
+    """
+    def __init__(self, flush_interval: float = 1.0, chunk_size: int = 1 << 16, tail_lines: int = 0) -> None:
+        self.flush_interval = flush_interval
+        self.chunk_size = chunk_size
+        self.tail_lines = tail_lines
+        self.selector = selectors.DefaultSelector()
+        self.streams: dict[str, _Stream] = {}
+        self.stop_event = threading.Event()
+        self.thread: Union[threading.Thread, None] = None
+
+    def add(self, name: str, pipe: BinaryIO, path: str = None):
+        """
+        Copy `pipe` to the file `path` until it is closed, or to stdout if there is no path.
+        Streams must be added before start.
+        """
+        os.set_blocking(pipe.fileno(), False)
+        stream = _Stream(name, pipe, path, self.tail_lines)
+        self.streams[name] = stream
+        self.selector.register(pipe, selectors.EVENT_READ, stream)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name='output-multiplexer')
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def join(self):
+        if self.thread is not None:
+            self.thread.join()
+
+    def tail(self, name: str) -> list[str]:
+        """
+        The last `tail_lines` lines of a stream.
+        """
+        stream = self.streams[name]
+        if stream.tail is None:
+            return []
+        return [line.decode(errors='replace') for line in stream.tail]
+
+    def run(self):
+        """
+        Copy the streams until all of them are closed or stop is called.
+        """
+        stdout = sys.stdout.buffer
+        last_flush = time.monotonic()
+        dirty: set[_Stream] = set()
+        while self.selector.get_map() and not self.stop_event.is_set():
+            for key, _ in self.selector.select(self.flush_interval):
+                stream: _Stream = key.data
+                try:
+                    data = os.read(key.fd, self.chunk_size)
+                except BlockingIOError:
+                    continue
+                if not data:
+                    self.selector.unregister(key.fileobj)
+                    dirty.discard(stream)
+                    stream.close()
+                    continue
+                (stream.file or stdout).write(data)
+                dirty.add(stream)
+                if stream.tail is not None:
+                    stream.add_tail(data)
+            now = time.monotonic()
+            if dirty and now - last_flush >= self.flush_interval:
+                for stream in dirty:
+                    (stream.file or stdout).flush()
+                dirty.clear()
+                last_flush = now
+        for key in list(self.selector.get_map().values()):
+            self.selector.unregister(key.fileobj)
+            key.data.close()
+        stdout.flush()
+        self.selector.close()
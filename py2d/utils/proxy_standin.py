@@ -0,0 +1,242 @@
+import math
+import queue
+import random
+import grpc
+import service_pb2 as pb2
+import service_pb2_grpc as pb2_grpc
+
+
+def default_server_param() -> pb2.ServerParam:
+    """
+    Build a ServerParam message with the rcssserver default values that the decision code reads.
+
+    :return: ServerParam message.
+    """
+    return pb2.ServerParam(
+        inertia_moment=5.0, player_size=0.3, player_decay=0.4, player_speed_max=1.05,
+        stamina_max=8000.0, stamina_inc_max=45.0, ball_size=0.085, ball_decay=0.94,
+        ball_speed_max=3.0, ball_accel_max=2.7, dash_power_rate=0.006, kick_power_rate=0.027,
+        kickable_margin=0.7, max_power=100.0, min_power=-100.0, max_moment=180.0, min_moment=-180.0,
+        kickable_area=1.085, catchable_area=1.3, simulator_step=100, use_offside=True,
+        kickoff_offside=True, tackle_dist=2.0, tackle_back_dist=0.0, tackle_width=1.25,
+        max_dash_power=100.0, min_dash_power=0.0, extra_stamina=50.0, stamina_capacity=130600.0,
+        real_speed_max=1.05, pitch_half_length=52.5, pitch_half_width=34.0,
+        our_penalty_area_line_x=-36.0, their_penalty_area_line_x=36.0, penalty_area_half_width=20.16,
+        penalty_area_length=16.5, goal_width=14.02, goal_area_width=18.32, goal_area_length=5.5,
+        center_circle_r=9.15, goal_post_radius=0.06, pitch_margin=5.0, half_time=300,
+    )
+
+
+def default_player_param() -> pb2.PlayerParam:
+    """
+    Build a PlayerParam message with the rcssserver default values.
+
+    :return: PlayerParam message.
+    """
+    return pb2.PlayerParam(player_types=18, subs_max=3, pt_max=1, allow_mult_default_type=False)
+
+
+def default_player_type(type_id: int) -> pb2.PlayerType:
+    """
+    Build a heterogeneous PlayerType message, the type id slightly changes the physical values.
+
+    :param type_id: Id of the player type.
+    :return: PlayerType message.
+    """
+    delta = type_id * 0.005
+    return pb2.PlayerType(
+        id=type_id, stamina_inc_max=45.0 - type_id, player_decay=0.4 + delta, inertia_moment=5.0 + delta * 10,
+        dash_power_rate=0.006, player_size=0.3, kickable_margin=0.7 + delta, kick_rand=0.1,
+        extra_stamina=50.0, effort_max=1.0, effort_min=0.6, kick_power_rate=0.027,
+        kickable_area=1.085 + delta, reliable_catchable_dist=1.3, max_catchable_dist=1.3,
+        real_speed_max=1.0 + delta, player_speed_max=1.05, cycles_to_reach_max_speed=15,
+    )
+
+
+class SyntheticStateGenerator:
+    """
+    Generate plausible State messages for one agent without rcssserver or the C++ proxy.
+    Players and ball take small random steps every cycle so the decision code visits different branches.
+    """
+    def __init__(self, uniform_number: int, team_size: int = 4, seed: int = None):
+        self.uniform_number = uniform_number
+        self.team_size = team_size
+        self.random = random.Random(seed if seed is not None else uniform_number)
+        self.ball = [0.0, 0.0, 0.0, 0.0]
+        self.teammates = {unum: self._random_position() for unum in range(1, team_size + 1)}
+        self.opponents = {unum: self._random_position() for unum in range(1, team_size + 1)}
+        # coach and trainer have no body on the field, use a point on the touch line for them
+        self.self_position = self.teammates.get(uniform_number, [0.0, -34.0])
+
+    def _random_position(self) -> list[float]:
+        return [self.random.uniform(-40.0, 40.0), self.random.uniform(-25.0, 25.0)]
+
+    def _step(self):
+        for players in (self.teammates, self.opponents):
+            for pos in players.values():
+                pos[0] = max(-52.0, min(52.0, pos[0] + self.random.uniform(-0.8, 0.8)))
+                pos[1] = max(-33.0, min(33.0, pos[1] + self.random.uniform(-0.8, 0.8)))
+        if self.random.random() < 0.05:
+            angle = self.random.uniform(-math.pi, math.pi)
+            speed = self.random.uniform(0.5, 2.5)
+            self.ball[2], self.ball[3] = speed * math.cos(angle), speed * math.sin(angle)
+        self.ball[0] = max(-52.0, min(52.0, self.ball[0] + self.ball[2]))
+        self.ball[1] = max(-33.0, min(33.0, self.ball[1] + self.ball[3]))
+        self.ball[2] *= 0.94
+        self.ball[3] *= 0.94
+
+    def _make_player(self, unum: int, pos: list[float], side: pb2.Side, object_id: int) -> pb2.Player:
+        me = self.self_position
+        return pb2.Player(
+            position=pb2.RpcVector2D(x=pos[0], y=pos[1]),
+            velocity=pb2.RpcVector2D(x=0.0, y=0.0),
+            pos_count=self.random.randint(0, 3), seen_pos_count=self.random.randint(0, 3),
+            dist_from_self=math.dist(pos, me), dist_from_ball=math.dist(pos, self.ball[:2]),
+            id=object_id, side=side, uniform_number=unum, is_goalie=unum == 1,
+            body_direction=self.random.uniform(-180.0, 180.0), body_direction_count=self.random.randint(0, 3),
+            type_id=0,
+        )
+
+    def make_state(self, cycle: int, register_response: pb2.RegisterResponse, stoped_cycle: int = 0) -> pb2.State:
+        """
+        Advance the synthetic game by one cycle and build the State message for it.
+
+        :param cycle: Game cycle of the state.
+        :param register_response: RegisterResponse the agent received from the playmaker server.
+        :param stoped_cycle: Stopped cycle counter of the state.
+        :return: State message.
+        """
+        self._step()
+        me = self.self_position
+        ball_dist = math.dist(me, self.ball[:2])
+        wm = pb2.WorldModel(
+            our_team_name=register_response.team_name, their_team_name='OPP', our_side=pb2.Side.LEFT,
+            cycle=cycle, stoped_cycle=stoped_cycle, game_mode_type=pb2.GameModeType.PlayOn,
+            our_goalie_uniform_number=1, their_goalie_uniform_number=1,
+            offside_line_x=max(pos[0] for pos in self.opponents.values()),
+            our_defense_line_x=min(pos[0] for pos in self.teammates.values()),
+            game_mode_side=pb2.Side.UNKNOWN,
+        )
+        wm.self.CopyFrom(pb2.Self(
+            position=pb2.RpcVector2D(x=me[0], y=me[1]), velocity=pb2.RpcVector2D(x=0.0, y=0.0),
+            id=self.uniform_number, side=pb2.Side.LEFT, uniform_number=self.uniform_number,
+            is_goalie=self.uniform_number == 1, body_direction=0.0, stamina=8000.0, recovery=1.0,
+            stamina_capacity=130600.0, effort=1.0, kick_rate=0.027, dist_from_ball=ball_dist,
+            is_kickable=ball_dist < 1.085, type_id=0,
+        ))
+        wm.ball.CopyFrom(pb2.Ball(
+            position=pb2.RpcVector2D(x=self.ball[0], y=self.ball[1]),
+            velocity=pb2.RpcVector2D(x=self.ball[2], y=self.ball[3]),
+            dist_from_self=ball_dist,
+        ))
+        for unum, pos in self.teammates.items():
+            player = self._make_player(unum, pos, pb2.Side.LEFT, unum)
+            if unum != self.uniform_number:
+                wm.teammates.append(player)
+            wm.our_players_dict[unum].CopyFrom(player)
+            wm.helios_home_positions[unum].CopyFrom(pb2.RpcVector2D(x=pos[0], y=pos[1]))
+        for unum, pos in self.opponents.items():
+            player = self._make_player(unum, pos, pb2.Side.RIGHT, self.team_size + unum)
+            wm.opponents.append(player)
+            wm.their_players_dict[unum].CopyFrom(player)
+        reach = {unum: int(math.dist(pos, self.ball[:2])) for unum, pos in self.teammates.items()}
+        wm.intercept_table.self_reach_steps = reach.get(self.uniform_number, 1000)
+        wm.intercept_table.first_teammate_reach_steps = min(
+            (steps for unum, steps in reach.items() if unum != self.uniform_number), default=1000)
+        wm.intercept_table.first_opponent_reach_steps = min(
+            int(math.dist(pos, self.ball[:2])) for pos in self.opponents.values())
+        wm.kickable_teammate_existance = any(
+            steps == 0 for unum, steps in reach.items() if unum != self.uniform_number)
+        return pb2.State(register_response=register_response, world_model=wm)
+
+
+class PlayerSessionClient:
+    """
+    Client side of one PlayerSession stream. States are handed to the gRPC request iterator through a queue and
+    each call waits for the PlayerActions of its State.
+    """
+    def __init__(self, stub: pb2_grpc.GameStub) -> None:
+        self.states: queue.SimpleQueue = queue.SimpleQueue()
+        self.responses = stub.PlayerSession(iter(self.states.get, None))
+
+    def get_actions(self, state: pb2.State) -> pb2.PlayerActions:
+        self.states.put(state)
+        return next(self.responses)
+
+    def close(self):
+        self.states.put(None)
+        for _ in self.responses:
+            pass
+
+
+class StandInProxy:
+    """
+    A Python stand-in for one C++ proxy agent. It talks to the playmaker server exactly like the proxy does
+    (Register, params messages, one action request per cycle and SendByeCommand), so the server can be tested
+    and benchmarked locally without rcssserver or the proxy build.
+    """
+    def __init__(self, target: str, team_name: str, uniform_number: int,
+                 agent_type: pb2.AgentType = pb2.AgentType.PlayerT, channel_options: list = None, match_id: str = ''):
+        self.channel = grpc.insecure_channel(target, options=channel_options)
+        self.stub = pb2_grpc.GameStub(self.channel)
+        self.team_name = team_name
+        self.uniform_number = uniform_number
+        self.agent_type = agent_type
+        self.match_id = match_id
+        self.register_response: pb2.RegisterResponse = None
+        self.generator = SyntheticStateGenerator(uniform_number)
+        self.session: PlayerSessionClient = None
+
+    def wait_for_server(self, timeout: float = 10.0):
+        grpc.channel_ready_future(self.channel).result(timeout=timeout)
+
+    def register(self) -> pb2.RegisterResponse:
+        self.register_response = self.stub.Register(pb2.RegisterRequest(
+            agent_type=self.agent_type, team_name=self.team_name, uniform_number=self.uniform_number,
+            match_id=self.match_id))
+        return self.register_response
+
+    def send_params(self, player_types: int = 18):
+        """
+        Send InitMessage, ServerParam, PlayerParam and all PlayerType messages, in the same order as the proxy.
+        """
+        self.stub.SendInitMessage(pb2.InitMessage(register_response=self.register_response, debug_mode=False))
+        server_param = default_server_param()
+        server_param.register_response.CopyFrom(self.register_response)
+        self.stub.SendServerParams(server_param)
+        player_param = default_player_param()
+        player_param.register_response.CopyFrom(self.register_response)
+        self.stub.SendPlayerParams(player_param)
+        for type_id in range(player_types):
+            player_type = default_player_type(type_id)
+            player_type.register_response.CopyFrom(self.register_response)
+            self.stub.SendPlayerType(player_type)
+
+    def make_state(self, cycle: int) -> pb2.State:
+        return self.generator.make_state(cycle, self.register_response)
+
+    def open_session(self):
+        """
+        Send the States of the next cycles over one PlayerSession stream instead of unary GetPlayerActions calls.
+        Only players have a session, coach and trainer keep the unary calls.
+        """
+        if self.agent_type == pb2.AgentType.PlayerT:
+            self.session = PlayerSessionClient(self.stub)
+
+    def get_actions(self, state: pb2.State):
+        if self.session is not None:
+            return self.session.get_actions(state)
+        if self.agent_type == pb2.AgentType.PlayerT:
+            return self.stub.GetPlayerActions(state)
+        elif self.agent_type == pb2.AgentType.CoachT:
+            return self.stub.GetCoachActions(state)
+        return self.stub.GetTrainerActions(state)
+
+    def bye(self):
+        if self.session is not None:
+            self.session.close()
+            self.session = None
+        self.stub.SendByeCommand(self.register_response)
+
+    def close(self):
+        self.channel.close()
@@ -0,0 +1,398 @@
+import bisect
+import glob
+import logging
+import os
+import queue
+import re
+import struct
+import threading
+import zlib
+from dataclasses import dataclass
+from typing import Iterator, Union
+import service_pb2 as pb2
+
+
+# A record file starts with MAGIC and is a sequence of blocks. Each block is a BLOCK header (compression, raw size,
+# stored size) followed by the stored bytes, which are a sequence of RECORD headers (kind, cycle, stoped cycle,
+# size) each followed by a serialized message. The index file next to it has one INDEX entry per state
+# (cycle, stoped cycle, file offset of the block, offset of the record in the raw block).
+MAGIC = b'PY2DREC\x01'
+BLOCK = struct.Struct('<BII')
+RECORD = struct.Struct('<BiiI')
+INDEX = struct.Struct('<iiQI')
+
+REGISTER = 1
+INIT_MESSAGE = 2
+SERVER_PARAM = 3
+PLAYER_PARAM = 4
+PLAYER_TYPE = 5
+STATE = 6
+PLAYER_ACTIONS = 7
+COACH_ACTIONS = 8
+TRAINER_ACTIONS = 9
+CYCLE_TIMING = 10
+
+# Payload of CYCLE_TIMING records: unix time the state was received, decision latency in milliseconds
+TIMING = struct.Struct('<dd')
+
+RECORD_TYPES = {
+    REGISTER: pb2.RegisterResponse,
+    INIT_MESSAGE: pb2.InitMessage,
+    SERVER_PARAM: pb2.ServerParam,
+    PLAYER_PARAM: pb2.PlayerParam,
+    PLAYER_TYPE: pb2.PlayerType,
+    STATE: pb2.State,
+    PLAYER_ACTIONS: pb2.PlayerActions,
+    COACH_ACTIONS: pb2.CoachActions,
+    TRAINER_ACTIONS: pb2.TrainerActions,
+}
+ACTIONS_KINDS = {
+    pb2.AgentType.PlayerT: PLAYER_ACTIONS,
+    pb2.AgentType.CoachT: COACH_ACTIONS,
+    pb2.AgentType.TrainerT: TRAINER_ACTIONS,
+}
+
+# Kinds recorded every cycle, the others describe the agent and are kept for the start of every part
+CYCLE_KINDS = {STATE, PLAYER_ACTIONS, COACH_ACTIONS, TRAINER_ACTIONS, CYCLE_TIMING}
+
+COMPRESSIONS = {'none': 0, 'zlib': 1, 'zstd': 2}
+
+
+def _compressor(compression: str):
+    if compression == 'zlib':
+        return lambda data: zlib.compress(data, 1)
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("zstd compression of the records requires the zstandard package (pip install zstandard)")
+        return zstandard.ZstdCompressor(level=3).compress
+    return None
+
+
+def _decompressor(compression_id: int):
+    if compression_id == COMPRESSIONS['zlib']:
+        return zlib.decompress
+    if compression_id == COMPRESSIONS['zstd']:
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress
+    return None
+
+
+class _RecordFile:
+    """
+    Record files of one client. Only the writer thread uses it.
+    """
+    def __init__(self, directory: str, name: str, compression: str, max_file_size: int, max_files: int) -> None:
+        self.directory = directory
+        self.name = name
+        self.compression_id = COMPRESSIONS[compression]
+        self.compress = _compressor(compression)
+        self.max_file_size = max_file_size
+        self.max_files = max_files
+        self.part = 0
+        self.file = None
+        self.index_file = None
+        self.block = bytearray()
+        self.block_index: list[tuple[int, int, int]] = []
+        # Register and params records, repeated at the start of every part so each part can be replayed alone
+        self.header = bytearray()
+
+    def _open_part(self):
+        self.part += 1
+        path = os.path.join(self.directory, f'{self.name}.{self.part:04d}.rec')
+        self.file = open(path, 'wb')
+        self.file.write(MAGIC)
+        self.index_file = open(f'{path}.idx', 'wb')
+        if self.part > 1 and self.header:
+            self._write_block(self.header)
+        if self.max_files > 0 and self.part > self.max_files:
+            old_path = os.path.join(self.directory, f'{self.name}.{self.part - self.max_files:04d}.rec')
+            for old in (old_path, f'{old_path}.idx'):
+                if os.path.exists(old):
+                    os.remove(old)
+
+    def append(self, kind: int, cycle: int, stoped_cycle: int, payload: bytes, block_size: int):
+        if kind == STATE:
+            self.block_index.append((cycle, stoped_cycle, len(self.block)))
+        record = RECORD.pack(kind, cycle, stoped_cycle, len(payload)) + payload
+        if kind not in CYCLE_KINDS:
+            self.header += record
+        self.block += record
+        if len(self.block) >= block_size:
+            self.flush()
+
+    def flush(self):
+        if not self.block:
+            return
+        if self.file is None or (self.max_file_size > 0 and self.file.tell() >= self.max_file_size):
+            self.close()
+            self._open_part()
+        block_offset = self._write_block(self.block)
+        for cycle, stoped_cycle, offset in self.block_index:
+            self.index_file.write(INDEX.pack(cycle, stoped_cycle, block_offset, offset))
+        self.index_file.flush()
+        self.block = bytearray()
+        self.block_index = []
+
+    def _write_block(self, block: bytearray) -> int:
+        stored = self.compress(bytes(block)) if self.compress is not None else block
+        block_offset = self.file.tell()
+        self.file.write(BLOCK.pack(self.compression_id, len(block), len(stored)))
+        self.file.write(stored)
+        self.file.flush()
+        return block_offset
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.index_file.close()
+            self.file = None
+            self.index_file = None
+
+
+def write_packed(directory: str, name: str, header: bytes, cycles: list[tuple[int, int, bytes]],
+                 compression: str = 'none') -> str:
+    """
+    Write records that are already packed with RECORD headers to a new single part record file.
+
+    :param directory: Directory of the file.
+    :param name: Name of the records, the file is <name>.0001.rec.
+    :param header: Packed register and params records.
+    :param cycles: (cycle, stoped cycle, packed records) of every cycle, each starting with its STATE record.
+    :param compression: Compression of the block.
+    :return: Path of the record file.
+    """
+    os.makedirs(directory, exist_ok=True)
+    record_file = _RecordFile(directory, name, compression, 0, 0)
+    record_file.block += header
+    for cycle, stoped_cycle, packed in cycles:
+        record_file.block_index.append((cycle, stoped_cycle, len(record_file.block)))
+        record_file.block += packed
+    record_file.flush()
+    record_file.close()
+    return os.path.join(directory, f'{name}.{record_file.part:04d}.rec')
+
+
+class Recorder:
+    """
+    Record the traffic of every agent into length-prefixed protobuf log files, one set of files per client.
+
+    The RPC threads only serialize the message and put it in a queue, a background thread packs the records into
+    blocks, compresses them and writes them. If the writer falls behind and the queue is full, records are dropped
+    instead of blocking the RPC thread. Blocks are also written when the writer is idle for flush_interval seconds,
+    so a killed server loses at most the records of that interval.
+
+    Files are named <name>.<part>.rec and a new part starts when the current one is larger than max_file_size bytes.
+    Only the last max_files parts of each client are kept (0 keeps all of them).
+    """
+    def __init__(self, directory: str, compression: str = 'none', block_size: int = 1 << 16,
+                 max_file_size: int = 64 << 20, max_files: int = 4, queue_size: int = 10000,
+                 flush_interval: float = 1.0, logger: logging.Logger = None) -> None:
+        _compressor(compression)  # fail early if the compression is not available
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.compression = compression
+        self.block_size = block_size
+        self.max_file_size = max_file_size
+        self.max_files = max_files
+        self.flush_interval = flush_interval
+        self.logger = logger or logging.getLogger('pmservice')
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self.thread = threading.Thread(target=self._write_loop, name='recorder', daemon=True)
+        self.thread.start()
+
+    def _put(self, item: tuple):
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                self.logger.warning(f"recorder queue is full, {self.dropped} records dropped")
+
+    def open(self, client_id: int, name: str) -> 'ClientRecorder':
+        self.queue.put(('open', client_id, name))
+        return ClientRecorder(self, client_id)
+
+    def record(self, client_id: int, kind: int, message, cycle: int = 0, stoped_cycle: int = 0):
+        self._put(('record', client_id, kind, cycle, stoped_cycle, message.SerializeToString()))
+
+    def close_client(self, client_id: int):
+        self.queue.put(('close', client_id))
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+
+    def _write_loop(self):
+        files: dict[int, _RecordFile] = {}
+        while True:
+            try:
+                item = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                for record_file in files.values():
+                    record_file.flush()
+                continue
+            if item is None:
+                break
+            try:
+                if item[0] == 'record':
+                    _, client_id, kind, cycle, stoped_cycle, payload = item
+                    files[client_id].append(kind, cycle, stoped_cycle, payload, self.block_size)
+                elif item[0] == 'open':
+                    _, client_id, name = item
+                    files[client_id] = _RecordFile(self.directory, name, self.compression,
+                                                   self.max_file_size, self.max_files)
+                elif item[0] == 'close':
+                    record_file = files.pop(item[1], None)
+                    if record_file is not None:
+                        record_file.flush()
+                        record_file.close()
+            except Exception as e:
+                self.logger.error(f"recorder failed to write {item[0]}: {e}")
+        for record_file in files.values():
+            record_file.flush()
+            record_file.close()
+
+
+class ClientRecorder:
+    """
+    Recorder handle of one client, used by GrpcAgent.
+    """
+    def __init__(self, recorder: Recorder, client_id: int) -> None:
+        self.recorder = recorder
+        self.client_id = client_id
+
+    def record(self, kind: int, message, cycle: int = 0, stoped_cycle: int = 0):
+        self.recorder.record(self.client_id, kind, message, cycle, stoped_cycle)
+
+    def close(self):
+        self.recorder.close_client(self.client_id)
+
+
+@dataclass
+class Record:
+    kind: int
+    cycle: int
+    stoped_cycle: int
+    data: bytes
+
+    @property
+    def message(self):
+        if self.kind == CYCLE_TIMING:
+            return TIMING.unpack(self.data)
+        return RECORD_TYPES[self.kind].FromString(self.data)
+
+
+class RecordReader:
+    """
+    Read one record file, or all parts of one client with read_client.
+    """
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._index: Union[list[tuple[int, int, int, int]], None] = None
+
+    def _blocks(self, start: int = len(MAGIC)) -> Iterator[tuple[int, bytes]]:
+        with open(self.path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{self.path} is not a record file")
+            f.seek(start)
+            while True:
+                offset = f.tell()
+                header = f.read(BLOCK.size)
+                if len(header) < BLOCK.size:
+                    return
+                compression_id, raw_size, stored_size = BLOCK.unpack(header)
+                stored = f.read(stored_size)
+                if len(stored) < stored_size:
+                    return  # the last block was cut by a killed writer
+                decompress = _decompressor(compression_id)
+                yield offset, decompress(stored) if decompress is not None else stored
+
+    @staticmethod
+    def _records(block: bytes, offset: int = 0) -> Iterator[Record]:
+        view = memoryview(block)
+        while offset < len(view):
+            kind, cycle, stoped_cycle, size = RECORD.unpack_from(view, offset)
+            offset += RECORD.size
+            yield Record(kind, cycle, stoped_cycle, bytes(view[offset:offset + size]))
+            offset += size
+
+    def __iter__(self) -> Iterator[Record]:
+        for _, block in self._blocks():
+            yield from self._records(block)
+
+    @property
+    def index(self) -> list[tuple[int, int, int, int]]:
+        """
+        Sorted (cycle, stoped cycle, block offset, record offset) entries of the states in the file.
+        """
+        if self._index is None:
+            with open(f'{self.path}.idx', 'rb') as f:
+                data = f.read()
+            self._index = sorted(INDEX.iter_unpack(data[:len(data) - len(data) % INDEX.size]))
+        return self._index
+
+    def read_from(self, cycle: int, stoped_cycle: int = 0) -> Iterator[Record]:
+        """
+        Read the records from the state of a cycle on, with the index instead of scanning the file.
+        """
+        index = self.index
+        position = bisect.bisect_left(index, (cycle, stoped_cycle, 0, 0))
+        if position == len(index):
+            return
+        _, _, block_offset, record_offset = index[position]
+        first = True
+        for _, block in self._blocks(block_offset):
+            yield from self._records(block, record_offset if first else 0)
+            first = False
+
+
+def client_record_files(directory: str, name: str) -> list[str]:
+    return sorted(glob.glob(os.path.join(directory, f'{glob.escape(name)}.[0-9][0-9][0-9][0-9].rec')))
+
+
+def read_client(directory: str, name: str) -> Iterator[Record]:
+    """
+    Read the records of one client from all its parts in order, see iter_parts.
+    """
+    return iter_parts(client_record_files(directory, name))
+
+
+def find_record_files(paths: list[str], agents: list[str]) -> dict[str, list[str]]:
+    """
+    Group the record files of the given files and directories by agent name, the parts of each agent in order.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += glob.glob(os.path.join(path, '*.rec'))
+        else:
+            files.append(path)
+    grouped: dict[str, list[str]] = {}
+    for path in sorted(files):
+        name = re.sub(r'\.\d{4}\.rec$', '', os.path.basename(path))
+        if not agents or name in agents:
+            grouped.setdefault(name, []).append(path)
+    return grouped
+
+
+def iter_parts(paths: list[str]) -> Iterator[Record]:
+    """
+    Read the records of all parts of one client in order, without the register and params records repeated by
+    later parts.
+    """
+    for i, path in enumerate(paths):
+        for record in RecordReader(path):
+            # every part after the first repeats the register and params records
+            if i > 0 and record.kind not in CYCLE_KINDS:
+                continue
+            yield record
+
+
+def read_parts(paths: list[str]) -> list[Record]:
+    """
+    Read the records of all parts of one client into a list, see iter_parts.
+    """
+    return list(iter_parts(paths))
@@ -0,0 +1,310 @@
+import logging
+import multiprocessing
+import multiprocessing.connection
+import threading
+import traceback
+import grpc
+import service_pb2 as pb2
+from utils.tracing import flush_tracers
+
+
+GAME_SERVICE = pb2.DESCRIPTOR.services_by_name['Game']
+# Every unary request carries `RegisterResponse register_response = 1`, except Register, which has no client id
+# yet, and SendByeCommand, which takes the RegisterResponse itself.
+UNARY_METHODS = {method.name: (getattr(pb2, method.input_type.name), getattr(pb2, method.output_type.name))
+                 for method in GAME_SERVICE.methods
+                 if not method.client_streaming and not method.server_streaming}
+
+
+def _read_varint(data: memoryview, pos: int) -> tuple[int, int]:
+    result = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _find_field(data: memoryview, field_number: int):
+    """
+    Scan the top level of a serialized protobuf message for a field.
+
+    :param data: Serialized message.
+    :param field_number: Number of the field to find.
+    :return: The value for varint fields, a memoryview of the payload for length-delimited fields, or None.
+    """
+    pos = 0
+    end = len(data)
+    while pos < end:
+        tag, pos = _read_varint(data, pos)
+        number, wire_type = tag >> 3, tag & 0x7
+        if wire_type == 0:
+            value, pos = _read_varint(data, pos)
+            if number == field_number:
+                return value
+        elif wire_type == 2:
+            length, pos = _read_varint(data, pos)
+            if number == field_number:
+                return data[pos:pos + length]
+            pos += length
+        elif wire_type == 1:
+            pos += 8
+        elif wire_type == 5:
+            pos += 4
+        else:
+            return None
+    return None
+
+
+def peek_client_id(data: bytes, nested: bool = True) -> int:
+    """
+    Read the client id of a serialized request without parsing the whole message.
+    Only the tags of the top level are walked, the world model bytes are skipped by their length.
+
+    :param data: Serialized request.
+    :param nested: True if the request has a `register_response` field 1, False if it is a RegisterResponse.
+    :return: Client id, 0 if it is not set.
+    """
+    view = memoryview(data)
+    if nested:
+        view = _find_field(view, 1)
+        if view is None:
+            return 0
+    client_id = _find_field(view, 1)
+    return client_id or 0
+
+
+# First byte of every response of a worker: the serialized response follows _OK, the status code name and the
+# details of a gRPC error follow _ERROR, separated by a zero byte
+_OK = b'\x00'
+_ERROR = b'\x01'
+
+
+class ShardError(Exception):
+    """
+    gRPC error of a request handled by a worker, the front end aborts the call with it.
+    """
+    def __init__(self, code: grpc.StatusCode, details: str) -> None:
+        super().__init__(details)
+        self.code = code
+        self.details = details
+
+    def encode(self) -> bytes:
+        return _ERROR + self.code.name.encode() + b'\x00' + self.details.encode()
+
+    @classmethod
+    def decode(cls, data: bytes) -> 'ShardError':
+        code, _, details = data[1:].partition(b'\x00')
+        return cls(grpc.StatusCode[code.decode()], details.decode())
+
+
+class _WorkerContext:
+    """
+    Stand-in for the gRPC context of the GameHandler methods in a worker, context.abort raises a ShardError that
+    is sent to the front end.
+    """
+    def abort(self, code: grpc.StatusCode, details: str):
+        raise ShardError(code, details)
+
+
+def _shard_worker_main(conn, handler_factory):
+    """
+    Loop of one shard process. It receives (method name, serialized request) tuples, runs the method on its own
+    GameHandler and sends the serialized response, or the gRPC error of the method, back.
+    """
+    handler = handler_factory()
+    context = _WorkerContext()
+    # Later shards inherit the parent ends of earlier pipes, so EOF alone does not tell that the parent is gone
+    parent_sentinel = multiprocessing.parent_process().sentinel
+    while True:
+        try:
+            ready = multiprocessing.connection.wait([conn, parent_sentinel])
+            if conn not in ready:
+                break
+            method_name, payload = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        request_type, _ = UNARY_METHODS[method_name]
+        try:
+            response = getattr(handler, method_name)(request_type.FromString(payload), context)
+            conn.send_bytes(_OK + response.SerializeToString())
+        except ShardError as e:
+            conn.send_bytes(e.encode())
+        except Exception as e:
+            logging.getLogger('pmservice').error(traceback.format_exc())
+            conn.send_bytes(ShardError(grpc.StatusCode.INTERNAL, f"{method_name} failed: {e!r}").encode())
+    # The process ends with os._exit, which skips the atexit hooks
+    flush_tracers()
+
+
+class Shard:
+    """
+    One worker process with its pipe. The lock keeps request/response pairs of concurrent RPC threads together.
+    """
+    def __init__(self, index: int, context, handler_factory) -> None:
+        self.index = index
+        self.conn, child_conn = context.Pipe()
+        self.lock = threading.Lock()
+        self.client_ids: set[int] = set()
+        self.alive = True
+        self.process = context.Process(target=_shard_worker_main, args=(child_conn, handler_factory),
+                                       name=f'shard-{index}', daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def call(self, method_name: str, payload: bytes) -> bytes:
+        """
+        :raises ShardError: The method failed in the worker, UNAVAILABLE if the worker is gone.
+        """
+        with self.lock:
+            try:
+                self.conn.send((method_name, payload))
+                response = self.conn.recv_bytes()
+            except (EOFError, OSError) as e:
+                self.alive = False
+                raise ShardError(grpc.StatusCode.UNAVAILABLE, f"shard {self.index} is gone: {e!r}")
+        if response[:1] != _OK:
+            raise ShardError.decode(response)
+        return response[1:]
+
+    def close(self):
+        self.conn.close()
+        self.process.join(timeout=1)
+
+
+class ShardPool:
+    """
+    Worker processes that each own a GameHandler. Register assigns every new client to the shard with the
+    fewest clients, or to the shard of its match if the request has a match_id, and later requests of that client
+    are forwarded to the same shard as raw bytes.
+
+    The workers are forked, so they must be created before the gRPC server starts. The handler factory is
+    called inside each worker.
+    """
+    def __init__(self, shards: int, handler_factory, logger: logging.Logger) -> None:
+        context = multiprocessing.get_context('fork')
+        self.logger = logger
+        self.shards = [Shard(i, context, handler_factory) for i in range(shards)]
+        self.owners: dict[int, Shard] = {}
+        # Reentrant, a shard that died during Register is removed while the lock is held
+        self.owners_lock = threading.RLock()
+        self.match_shards: dict[str, Shard] = {}
+        self.client_matches: dict[int, str] = {}
+
+    def register(self, payload: bytes) -> bytes:
+        # Agents of one match share a shard, so the match quotas and grouping of the workers stay correct
+        match_id = pb2.RegisterRequest.FromString(payload).match_id
+        with self.owners_lock:
+            shard = self.match_shards.get(match_id) if match_id else None
+            if shard is None:
+                if not self.shards:
+                    raise ShardError(grpc.StatusCode.UNAVAILABLE, "no shard worker is running")
+                shard = min(self.shards, key=lambda s: len(s.client_ids))
+            response = self.call(shard, 'Register', payload)
+            client_id = pb2.RegisterResponse.FromString(response).client_id
+            if client_id == 0:
+                return response
+            shard.client_ids.add(client_id)
+            self.owners[client_id] = shard
+            if match_id:
+                self.match_shards[match_id] = shard
+                self.client_matches[client_id] = match_id
+        self.logger.info(f"client {client_id} assigned to shard {shard.index}")
+        return response
+
+    def call(self, shard: Shard, method_name: str, payload: bytes) -> bytes:
+        """
+        Call a method on a shard, and remove the shard with its clients if its worker is gone.
+        """
+        try:
+            return shard.call(method_name, payload)
+        except ShardError:
+            if not shard.alive:
+                self.remove(shard)
+            raise
+
+    def remove(self, shard: Shard):
+        """
+        Stop assigning clients to a shard whose worker is gone and forget its clients, their agents are lost.
+        """
+        with self.owners_lock:
+            if shard not in self.shards:
+                return
+            self.shards.remove(shard)
+            for client_id in shard.client_ids:
+                self.owners.pop(client_id, None)
+                self.client_matches.pop(client_id, None)
+            for match_id in [match_id for match_id, match_shard in self.match_shards.items() if match_shard is shard]:
+                del self.match_shards[match_id]
+        shard.close()
+        self.logger.error(f"shard {shard.index} is gone (exit code {shard.process.exitcode}), "
+                          f"dropped its clients {sorted(shard.client_ids)}")
+        shard.client_ids.clear()
+
+    def forward(self, method_name: str, payload: bytes, client_id: int) -> bytes:
+        shard = self.owners.get(client_id)
+        if shard is None:
+            raise KeyError(f"client {client_id} is not registered")
+        return self.call(shard, method_name, payload)
+
+    def bye(self, payload: bytes) -> bytes:
+        client_id = peek_client_id(payload, nested=False)
+        try:
+            return self.forward('SendByeCommand', payload, client_id)
+        finally:
+            # The worker has dropped the agent even if closing it failed
+            with self.owners_lock:
+                shard = self.owners.pop(client_id, None)
+                if shard is not None:
+                    shard.client_ids.discard(client_id)
+                match_id = self.client_matches.pop(client_id, None)
+                if match_id is not None and match_id not in self.client_matches.values():
+                    self.match_shards.pop(match_id, None)
+
+    def close(self):
+        for shard in self.shards:
+            shard.close()
+
+    def generic_handler(self) -> grpc.GenericRpcHandler:
+        """
+        Build a gRPC handler for every Game method that forwards the undecoded request bytes.
+        """
+        def make_behavior(method_name):
+            if method_name == 'Register':
+                call = self.register
+            elif method_name == 'SendByeCommand':
+                call = self.bye
+            else:
+                call = lambda payload: self.forward(method_name, payload, peek_client_id(payload))
+
+            def behavior(payload, context):
+                try:
+                    return call(payload)
+                except KeyError as e:
+                    context.abort(grpc.StatusCode.NOT_FOUND, str(e))
+                except ShardError as e:
+                    context.abort(e.code, e.details)
+            return behavior
+
+        def player_session(payload_iterator, context):
+            # The worker answers every State of the stream like a GetPlayerActions request
+            shard = None
+            for payload in payload_iterator:
+                if shard is None:
+                    client_id = peek_client_id(payload)
+                    shard = self.owners.get(client_id)
+                    if shard is None:
+                        context.abort(grpc.StatusCode.NOT_FOUND, f"client {client_id} is not registered")
+                try:
+                    response = self.call(shard, 'GetPlayerActions', payload)
+                except ShardError as e:
+                    context.abort(e.code, e.details)
+                yield response
+
+        handlers = {name: grpc.unary_unary_rpc_method_handler(make_behavior(name))
+                    for name in UNARY_METHODS}
+        handlers['PlayerSession'] = grpc.stream_stream_rpc_method_handler(player_session)
+        return grpc.method_handlers_generic_handler(GAME_SERVICE.full_name, handlers)
@@ -0,0 +1,174 @@
+import glob
+import mmap
+import os
+import struct
+import time
+import weakref
+from dataclasses import dataclass
+from typing import Iterator, Union
+from src.utils.trace_events import TraceEvent, TRACE_EVENT_FIELDS
+
+
+# A trace file starts with MAGIC and a HEADER (uniform number, team name) followed by fixed size RECORDs
+# (cycle, stoped cycle, event id, uniform number, 4 values). The records of one agent are written in cycle
+# order, so a cycle range is found with a binary search on the memory mapped file instead of a scan.
+MAGIC = b'PY2DTRC\x01'
+HEADER = struct.Struct('<H30s')
+RECORD = struct.Struct('<iiHHffff')
+CYCLE = struct.Struct('<ii')
+DATA_OFFSET = len(MAGIC) + HEADER.size
+VALUES = 4
+
+
+# Open tracers of this process, see flush_tracers
+_tracers: 'weakref.WeakSet[Tracer]' = weakref.WeakSet()
+
+
+class Tracer:
+    """
+    Trace writer of one agent. The records are packed into a buffer and written when it is full or, at the first
+    record of a cycle, when the last write is flush_interval seconds ago, so a killed agent loses at most that
+    much. IAgent.trace costs one struct pack.
+    """
+    def __init__(self, directory: str, name: str, uniform_number: int, team_name: str,
+                 buffer_size: int = 1 << 16, flush_interval: float = 1.0) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f'{name}.trace')
+        self.uniform_number = uniform_number
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self.buffer = bytearray()
+        self.cycle = None
+        self.next_flush = time.monotonic() + flush_interval
+        self.file = open(self.path, 'wb')
+        self.file.write(MAGIC)
+        self.file.write(HEADER.pack(uniform_number, team_name.encode()[:30]))
+        self.file.flush()
+        _tracers.add(self)
+
+    def emit(self, cycle: int, stoped_cycle: int, event: int, values: tuple):
+        if cycle != self.cycle:
+            self.cycle = cycle
+            if time.monotonic() >= self.next_flush:
+                self.flush()
+        if len(values) < VALUES:
+            values = values + (0.0,) * (VALUES - len(values))
+        self.buffer += RECORD.pack(cycle, stoped_cycle, event, self.uniform_number, *values[:VALUES])
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        self.next_flush = time.monotonic() + self.flush_interval
+        if self.buffer and not self.file.closed:
+            buffer, self.buffer = self.buffer, bytearray()
+            self.file.write(buffer)
+            self.file.flush()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+        _tracers.discard(self)
+
+
+def flush_tracers():
+    """
+    Write the buffered records of all open tracers of this process, for the exit of a process whose agents did
+    not send Bye.
+    """
+    for tracer in list(_tracers):
+        tracer.flush()
+
+
+@dataclass
+class TraceRecord:
+    cycle: int
+    stoped_cycle: int
+    event: int
+    uniform_number: int
+    values: tuple[float, ...]
+
+    @property
+    def event_name(self) -> str:
+        try:
+            return TraceEvent(self.event).name
+        except ValueError:
+            return str(self.event)
+
+    def fields(self) -> dict[str, float]:
+        """
+        Named values of the record, see TRACE_EVENT_FIELDS.
+        """
+        try:
+            names = TRACE_EVENT_FIELDS[TraceEvent(self.event)]
+        except ValueError:
+            names = ()
+        return {name: value for name, value in zip(names, self.values)}
+
+
+class TraceReader:
+    """
+    Memory mapped trace file of one agent.
+    """
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a trace file")
+            uniform_number, team_name = HEADER.unpack(f.read(HEADER.size))
+            self.uniform_number: int = uniform_number
+            self.team_name: str = team_name.rstrip(b'\0').decode()
+            size = os.fstat(f.fileno()).st_size
+            # A killed writer can leave a partial last record
+            self.count = (size - DATA_OFFSET) // RECORD.size
+            self.data: Union[mmap.mmap, bytes] = b''
+            if self.count > 0:
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def record(self, i: int) -> TraceRecord:
+        cycle, stoped_cycle, event, uniform_number, *values = RECORD.unpack_from(self.data, DATA_OFFSET + i * RECORD.size)
+        return TraceRecord(cycle, stoped_cycle, event, uniform_number, tuple(values))
+
+    def _cycle(self, i: int) -> tuple[int, int]:
+        return CYCLE.unpack_from(self.data, DATA_OFFSET + i * RECORD.size)
+
+    def _bisect(self, key: tuple[int, int]) -> int:
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._cycle(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def query(self, first_cycle: int = 0, last_cycle: int = None, events: set[int] = None) -> Iterator[TraceRecord]:
+        """
+        Records of the cycles first_cycle to last_cycle (inclusive), optionally only of the given event ids.
+        Only the records of the cycle range are read.
+        """
+        i = self._bisect((first_cycle, 0)) if first_cycle > 0 else 0
+        end = self._bisect((last_cycle + 1, 0)) if last_cycle is not None else self.count
+        event_offset = DATA_OFFSET + CYCLE.size
+        for i in range(i, end):
+            if events is not None:
+                event = struct.unpack_from('<H', self.data, event_offset + i * RECORD.size)[0]
+                if event not in events:
+                    continue
+            yield self.record(i)
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+
+
+def find_trace_files(paths: list[str]) -> list[str]:
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += glob.glob(os.path.join(path, '*.trace'))
+        else:
+            files.append(path)
+    return sorted(files)
@@ -0,0 +1,62 @@
+import os
+
+
+# The proxy and the rpc server run on the same host and exchange one small message pair per agent and cycle:
+# no compression, no limit on the rare large messages, big http2 write buffers so a State is sent in one write,
+# no bdp pings competing with the cycle messages and keepalive pings to detect a dead peer.
+MAX_MESSAGE_LENGTH = 64 << 20
+KEEPALIVE_TIME_MS = 10000
+KEEPALIVE_TIMEOUT_MS = 5000
+
+CHANNEL_OPTIONS = [
+    ('grpc.max_send_message_length', MAX_MESSAGE_LENGTH),
+    ('grpc.max_receive_message_length', MAX_MESSAGE_LENGTH),
+    ('grpc.default_compression_algorithm', 0),
+    ('grpc.http2.write_buffer_size', 1 << 20),
+    ('grpc.http2.bdp_probe', 0),
+    ('grpc.keepalive_time_ms', KEEPALIVE_TIME_MS),
+    ('grpc.keepalive_timeout_ms', KEEPALIVE_TIMEOUT_MS),
+    ('grpc.keepalive_permit_without_calls', 1),
+    ('grpc.http2.max_pings_without_data', 0),
+    ('grpc.optimization_target', 'latency'),
+]
+
+SERVER_OPTIONS = CHANNEL_OPTIONS + [
+    # Accept the keepalive pings of the clients
+    ('grpc.http2.min_ping_interval_without_data_ms', KEEPALIVE_TIME_MS // 2),
+    ('grpc.http2.min_recv_ping_interval_without_data_ms', KEEPALIVE_TIME_MS // 2),
+]
+
+
+def is_unix_endpoint(endpoint) -> bool:
+    return str(endpoint).startswith('unix:')
+
+
+def server_address(endpoint) -> str:
+    """
+    Address to bind for an rpc endpoint, which is a TCP port or a unix:<path> socket.
+    """
+    if is_unix_endpoint(endpoint):
+        return str(endpoint)
+    return f'[::]:{endpoint}'
+
+
+def client_target(endpoint, host: str = 'localhost') -> str:
+    """
+    gRPC target of an rpc endpoint, which is a TCP port or a unix:<path> socket.
+    """
+    if is_unix_endpoint(endpoint):
+        return str(endpoint)
+    return f'{host}:{endpoint}'
+
+
+def remove_unix_socket(endpoint):
+    """
+    Remove the socket file of a unix:<path> endpoint that was left behind by a killed server.
+    """
+    if is_unix_endpoint(endpoint):
+        path = str(endpoint)[len('unix:'):]
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass